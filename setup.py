@@ -51,6 +51,9 @@ setuptools.setup(
         "console_scripts": [
             "csv_cli=dck_problem1.csv_cli:main",
             "fwf_cli=dck_problem1.fwf_cli:main",
+            "benchmark_cli=dck_problem1.benchmark_cli:main",
+            "index_cli=dck_problem1.index_cli:main",
+            "fwf_encoder_cli=dck_problem1.fwf_encoder_cli:main",
         ]
     },
 )
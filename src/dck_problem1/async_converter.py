@@ -0,0 +1,175 @@
+import asyncio
+import codecs
+import concurrent.futures
+import io
+import pathlib
+from typing import Any, BinaryIO, List, Optional, Tuple, Union
+
+from dck_problem1.compression_helper import open_input, open_output
+from dck_problem1.converter import Where, convert_fwf_lines
+from dck_problem1.csv_file_writer import create_csv_writer
+from dck_problem1.encoding_helper import encoding_signature
+from dck_problem1.fixed_width_file_helper import DEFAULT_BLOCK_SIZE
+from dck_problem1.models import CSVSpec, FWFSpec
+from dck_problem1.stream_helper import DEFAULT_QUEUE_SIZE
+
+# chunk of whole lines, decoded unless widths are counted in bytes,
+# None at the end of the file or the exception of the reader
+Chunk = Union[str, bytes, None, BaseException]
+
+
+def __read_text(
+    f: BinaryIO, decoder: Optional[codecs.IncrementalDecoder], block_size: int
+) -> Tuple[bool, Any]:
+    data = f.read(block_size)
+    return not data, data if decoder is None else decoder.decode(data, final=not data)
+
+
+async def __read_chunks(
+    f: BinaryIO,
+    encoding: Optional[str],
+    block_size: int,
+    chunks: "asyncio.Queue[Chunk]",
+    input_io: concurrent.futures.Executor,
+) -> None:
+    # byte chunks are read if encoding is None
+    loop = asyncio.get_running_loop()
+    decoder = None if encoding is None else codecs.getincrementaldecoder(encoding)()
+    rest: Any = "" if decoder is not None else b""
+    newline = "\n" if decoder is not None else b"\n"
+    try:
+        while True:
+            eof, text = await loop.run_in_executor(input_io, __read_text, f, decoder, block_size)
+            text = rest + text
+            end = len(text) if eof else text.rfind(newline) + 1
+            rest = text[end:]
+            if end:
+                # waits while the queue is full, so a slow consumer slows down reading
+                await chunks.put(text[:end])
+            if eof:
+                break
+        await chunks.put(None)
+    except asyncio.CancelledError:
+        raise
+    except BaseException as e:
+        await chunks.put(e)
+
+
+def __convert_chunk(
+    fwf_spec: FWFSpec,
+    csv_spec: CSVSpec,
+    chunk: Union[str, bytes],
+    columns: Optional[List[str]],
+    where: Optional[Where],
+) -> bytes:
+    if isinstance(chunk, bytes):
+        return convert_fwf_lines(fwf_spec, csv_spec, io.BytesIO(chunk), columns, where)
+    # universal newlines, like a fixed width file opened in text mode
+    return convert_fwf_lines(fwf_spec, csv_spec, io.StringIO(chunk, newline=None), columns, where)
+
+
+def __csv_header(csv_spec: CSVSpec) -> bytes:
+    header = io.StringIO(newline="")
+    create_csv_writer(csv_spec, header).writerow(csv_spec.column_names)
+    return header.getvalue().encode(csv_spec.encoding)
+
+
+async def convert_fwf_to_csv(
+    fwf_spec: FWFSpec,
+    csv_spec: CSVSpec,
+    input_file: pathlib.Path,
+    csv_output_file: pathlib.Path,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    columns: Optional[List[str]] = None,
+    where: Optional[Where] = None,
+    executor: Optional[concurrent.futures.Executor] = None,
+) -> None:
+    """Converts fixed width file into CSV file without blocking the event loop.
+       Compressed files are supported like by csv_cli.
+       The file is read and decoded in blocks of whole lines, blocks wait for conversion
+       in a bounded queue, so reading stops while conversion or writing is behind.
+       Reading and writing run in a thread per file, conversion of blocks runs in executor.
+       The conversion can be cancelled, the output file is left incomplete then.
+
+    Parameters
+    ----------
+    fwf_spec : FWFSpec
+        Fixed width file spec
+    csv_spec : CSVSpec
+        CSV file spec
+    input_file : pathlib.Path
+        path to input file
+    csv_output_file : pathlib.Path
+        CSV file output path
+    block_size : int, optional
+        approximate size of a converted block in bytes, by default DEFAULT_BLOCK_SIZE
+    queue_size : int, optional
+        max number of read blocks waiting for conversion, by default DEFAULT_QUEUE_SIZE
+    columns : Optional[List[str]], optional
+        names of projected columns, see parse_fwf_file, by default all columns
+    where : Optional[Dict[str, Callable[[str], bool]]], optional
+        predicates of raw column values, must be picklable for a process pool executor,
+        see parse_fwf_file, by default None
+    executor : Optional[concurrent.futures.Executor], optional
+        executor of CPU bound conversion, e.g. a process pool, by default the default
+        executor of the loop
+
+    Raises
+    ------
+    ValueError
+        if a projected or filtered column is not found
+    """
+    loop = asyncio.get_running_loop()
+    chunks: "asyncio.Queue[Chunk]" = asyncio.Queue(queue_size)
+    # blocking calls of a stream run in its own thread, one after another
+    input_io = concurrent.futures.ThreadPoolExecutor(1)
+    output_io = concurrent.futures.ThreadPoolExecutor(1)
+    reader: Optional["asyncio.Task[None]"] = None
+    try:
+        input_stream = await loop.run_in_executor(input_io, open_input, input_file)
+        try:
+            output_stream = await loop.run_in_executor(output_io, open_output, csv_output_file)
+            try:
+                # values of byte widths are decoded on their own
+                encoding = None if fwf_spec.byte_widths else fwf_spec.encoding
+                reader = loop.create_task(
+                    __read_chunks(input_stream, encoding, block_size, chunks, input_io)
+                )
+                # the header starts with the signature of the encoding, chunks are
+                # converted without it
+                signed = csv_spec.header
+                if csv_spec.header:
+                    await loop.run_in_executor(
+                        output_io, output_stream.write, __csv_header(csv_spec)
+                    )
+                skip_header = fwf_spec.header
+                while True:
+                    chunk = await chunks.get()
+                    if chunk is None:
+                        break
+                    if isinstance(chunk, BaseException):
+                        raise chunk
+                    if skip_header:
+                        newline: Any = b"\n" if isinstance(chunk, bytes) else "\n"
+                        chunk = chunk[chunk.find(newline) + 1 :] if newline in chunk else chunk[:0]
+                        skip_header = False
+                    data = await loop.run_in_executor(
+                        executor, __convert_chunk, fwf_spec, csv_spec, chunk, columns, where
+                    )
+                    if data and not signed:
+                        data = encoding_signature(csv_spec.encoding) + data
+                        signed = True
+                    await loop.run_in_executor(output_io, output_stream.write, data)
+            finally:
+                # flushing buffered data is blocking too
+                await loop.run_in_executor(output_io, output_stream.close)
+        finally:
+            if reader is not None and not reader.done():
+                reader.cancel()
+                await asyncio.gather(reader, return_exceptions=True)
+            # runs after a pending read of the cancelled reader
+            await loop.run_in_executor(input_io, input_stream.close)
+    finally:
+        input_io.shutdown(wait=False)
+        output_io.shutdown(wait=False)
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+
+import argparse
+import dataclasses
+import datetime
+import gc
+import json
+from multiprocessing import Pool
+import os
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from exitstatus import ExitStatus
+
+from dck_problem1.csv_file_writer import write_csv_batches, write_csv_file, write_csv_file_fast
+from dck_problem1.fixed_width_file_helper import (
+    generate_fwf_file,
+    generate_fwf_file_bulk,
+    generate_fwf_lines,
+    parse_fwf_batches,
+    parse_fwf_file,
+    parse_fwf_file_mmap,
+)
+from dck_problem1.models import CSVSpec, FWFColumnSpec, FWFSpec
+from dck_problem1.random_values_generator import rnd_fwf_value
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None  # type: ignore
+
+
+@dataclasses.dataclass
+class BenchmarkResult:
+    """Result of a single benchmark case"""
+
+    case: str
+    columns: int
+    column_length: int
+    rows: int
+    seconds: float
+    rows_per_second: float
+    mb_per_second: float
+    peak_rss_bytes: Optional[int]
+
+
+@dataclasses.dataclass
+class StartupResult:
+    """Import time of a module measured with python -X importtime"""
+
+    module: str
+    import_seconds: float
+    # self import time of the slowest imported modules
+    slowest_imports: Dict[str, float]
+
+
+STARTUP_MODULES = ("dck_problem1.csv_cli", "dck_problem1.fwf_cli", "dck_problem1.index_cli")
+
+
+def synthetic_fwf_spec(
+    number_of_columns: int, column_length: int, encoding: str = "windows-1252"
+) -> FWFSpec:
+    """Creates fixed width file spec with columns of the same length
+
+    Args:
+        number_of_columns (int): number of columns
+        column_length (int): length of every column
+        encoding (str, optional): encoding. Defaults to "windows-1252".
+
+    Returns:
+        FWFSpec: Fixed width file spec with a header
+    """
+    columns = [
+        FWFColumnSpec(f"f{i}", i * column_length, column_length) for i in range(number_of_columns)
+    ]
+    return FWFSpec(columns, True, encoding)
+
+
+def __csv_spec(spec: FWFSpec) -> CSVSpec:
+    return CSVSpec([col.name for col in spec.columns], True, "utf-8")
+
+
+def __bench_rnd_fwf_value(spec: FWFSpec, rows: int, fwf_file: pathlib.Path) -> Callable[[], int]:
+    def run() -> int:
+        for _ in range(rows):
+            for col in spec.columns:
+                rnd_fwf_value(col)
+        return rows * spec.record_length
+
+    return run
+
+
+def __bench_generate_fwf_lines(
+    spec: FWFSpec, rows: int, fwf_file: pathlib.Path
+) -> Callable[[], int]:
+    return lambda: sum(len(line) + 1 for line in generate_fwf_lines(spec, rows))
+
+
+def __bench_generate_fwf_file(
+    spec: FWFSpec, rows: int, fwf_file: pathlib.Path
+) -> Callable[[], int]:
+    output_file = fwf_file.with_suffix(".generated")
+
+    def run() -> int:
+        generate_fwf_file(spec, rows, output_file)
+        return output_file.stat().st_size
+
+    return run
+
+
+def __bench_generate_fwf_file_bulk(
+    spec: FWFSpec, rows: int, fwf_file: pathlib.Path
+) -> Callable[[], int]:
+    output_file = fwf_file.with_suffix(".generated")
+
+    def run() -> int:
+        generate_fwf_file_bulk(spec, rows, output_file)
+        return output_file.stat().st_size
+
+    return run
+
+
+def __bench_parser(
+    parser: Callable[[FWFSpec, pathlib.Path], Any],
+) -> Callable[[FWFSpec, int, pathlib.Path], Callable[[], int]]:
+    def prepare(spec: FWFSpec, rows: int, fwf_file: pathlib.Path) -> Callable[[], int]:
+        def run() -> int:
+            for line in parser(spec, fwf_file):
+                for _ in line:
+                    pass
+            return fwf_file.stat().st_size
+
+        return run
+
+    return prepare
+
+
+def __bench_parse_fwf_batches(
+    spec: FWFSpec, rows: int, fwf_file: pathlib.Path
+) -> Callable[[], int]:
+    def run() -> int:
+        for _ in parse_fwf_batches(spec, fwf_file):
+            pass
+        return fwf_file.stat().st_size
+
+    return run
+
+
+def __bench_writer(
+    writer: Callable[[CSVSpec, Any, pathlib.Path], None],
+) -> Callable[[FWFSpec, int, pathlib.Path], Callable[[], int]]:
+    def prepare(spec: FWFSpec, rows: int, fwf_file: pathlib.Path) -> Callable[[], int]:
+        # lines are parsed before the measurement, only writing is measured
+        lines = [list(line) for line in parse_fwf_file(spec, fwf_file)]
+        csv_file = fwf_file.with_suffix(".csv")
+
+        def run() -> int:
+            writer(__csv_spec(spec), lines, csv_file)
+            return csv_file.stat().st_size
+
+        return run
+
+    return prepare
+
+
+def __bench_write_csv_batches(
+    spec: FWFSpec, rows: int, fwf_file: pathlib.Path
+) -> Callable[[], int]:
+    batches = list(parse_fwf_batches(spec, fwf_file))
+    csv_file = fwf_file.with_suffix(".csv")
+
+    def run() -> int:
+        write_csv_batches(__csv_spec(spec), batches, csv_file)
+        return csv_file.stat().st_size
+
+    return run
+
+
+BENCHMARK_CASES: Dict[str, Callable[[FWFSpec, int, pathlib.Path], Callable[[], int]]] = {
+    "rnd_fwf_value": __bench_rnd_fwf_value,
+    "generate_fwf_lines": __bench_generate_fwf_lines,
+    "generate_fwf_file": __bench_generate_fwf_file,
+    "generate_fwf_file_bulk": __bench_generate_fwf_file_bulk,
+    "parse_fwf_file": __bench_parser(parse_fwf_file),
+    "parse_fwf_file_mmap": __bench_parser(parse_fwf_file_mmap),
+    "parse_fwf_batches": __bench_parse_fwf_batches,
+    "write_csv_file": __bench_writer(write_csv_file),
+    "write_csv_file_fast": __bench_writer(write_csv_file_fast),
+    "write_csv_batches": __bench_write_csv_batches,
+}
+
+
+def __peak_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+def __run_case(task: Tuple[str, FWFSpec, int, pathlib.Path]) -> BenchmarkResult:
+    case, spec, rows, fwf_file = task
+    run = BENCHMARK_CASES[case](spec, rows, fwf_file)
+    # like timeit, garbage collection of prepared data should not affect the measurement
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        processed_bytes = run()
+        seconds = time.perf_counter() - start
+    finally:
+        gc.enable()
+    return BenchmarkResult(
+        case=case,
+        columns=len(spec.columns),
+        column_length=spec.columns[0].length,
+        rows=rows,
+        seconds=seconds,
+        rows_per_second=rows / seconds,
+        mb_per_second=processed_bytes / seconds / 1024 / 1024,
+        peak_rss_bytes=__peak_rss_bytes(),
+    )
+
+
+def run_benchmarks(
+    cases: List[str],
+    columns: List[int],
+    column_lengths: List[int],
+    rows: List[int],
+    work_dir: pathlib.Path,
+) -> List[BenchmarkResult]:
+    """Runs benchmark cases for every combination of synthetic spec and file size.
+       Every case runs in a fresh process, so peak RSS is measured per case.
+
+    Args:
+        cases (List[str]): names of cases, see BENCHMARK_CASES
+        columns (List[int]): numbers of columns of synthetic specs
+        column_lengths (List[int]): column lengths of synthetic specs
+        rows (List[int]): numbers of rows of synthetic files
+        work_dir (pathlib.Path): directory for synthetic files
+
+    Returns:
+        List[BenchmarkResult]: results in the order of execution
+    """
+    tasks: List[Tuple[str, FWFSpec, int, pathlib.Path]] = []
+    for number_of_columns in columns:
+        for column_length in column_lengths:
+            spec = synthetic_fwf_spec(number_of_columns, column_length)
+            for number_of_rows in rows:
+                fwf_file = (
+                    work_dir / f"bench_{number_of_columns}_{column_length}_{number_of_rows}.txt"
+                )
+                generate_fwf_file_bulk(spec, number_of_rows, fwf_file, seed=0)
+                tasks.extend((case, spec, number_of_rows, fwf_file) for case in cases)
+    with Pool(1, maxtasksperchild=1) as pool:
+        return pool.map(__run_case, tasks, chunksize=1)
+
+
+def __import_times(module: str) -> Dict[str, Tuple[float, float]]:
+    # the child process imports the package from the same location
+    package_parent = str(pathlib.Path(__file__).resolve().parent.parent)
+    python_path = os.pathsep.join(filter(None, [package_parent, os.environ.get("PYTHONPATH")]))
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": python_path},
+        text=True,
+    )
+    times = {}
+    # import time: self [us] | cumulative | imported package
+    for line in completed.stderr.splitlines():
+        fields = line.partition("import time:")[2].split("|")
+        if len(fields) == 3 and fields[0].strip().isdigit():
+            times[fields[2].strip()] = (int(fields[0]) / 1e6, int(fields[1]) / 1e6)
+    return times
+
+
+def measure_startup(module: str, repeat: int = 5, top: int = 10) -> StartupResult:
+    """Measures import time of a module in fresh interpreters with python -X importtime.
+       The first run only warms up file system and bytecode caches.
+
+    Args:
+        module (str): module name, e.g. dck_problem1.csv_cli
+        repeat (int, optional): number of measured runs, the fastest is reported. Defaults to 5.
+        top (int, optional): number of slowest imports reported. Defaults to 10.
+
+    Returns:
+        StartupResult: cumulative import time of the module and its slowest imports
+    """
+    runs = [__import_times(module) for _ in range(repeat + 1)][1:]
+    fastest = min(runs, key=lambda times: times[module][1])
+    slowest = sorted(fastest.items(), key=lambda item: item[1][0], reverse=True)[:top]
+    return StartupResult(
+        module=module,
+        import_seconds=fastest[module][1],
+        slowest_imports={name: self_seconds for name, (self_seconds, _) in slowest},
+    )
+
+
+def compare_results(
+    results: List[BenchmarkResult], baseline: List[Dict[str, Any]]
+) -> List[Tuple[BenchmarkResult, float]]:
+    """Compares results with results of a previous run
+
+    Args:
+        results (List[BenchmarkResult]): current results
+        baseline (List[Dict[str, Any]]): results loaded from a previous JSON report
+
+    Returns:
+        List[Tuple[BenchmarkResult, float]]: results found in baseline and rows/s ratio
+    """
+    key_fields = ("case", "columns", "column_length", "rows")
+    baseline_by_key = {tuple(item[k] for k in key_fields): item for item in baseline}
+    compared = []
+    for result in results:
+        previous = baseline_by_key.get(tuple(getattr(result, k) for k in key_fields))
+        if previous:
+            compared.append((result, result.rows_per_second / previous["rows_per_second"]))
+    return compared
+
+
+def compare_startup_results(
+    results: List[StartupResult], baseline: List[Dict[str, Any]]
+) -> List[Tuple[StartupResult, float]]:
+    """Compares startup results with results of a previous run
+
+    Args:
+        results (List[StartupResult]): current results
+        baseline (List[Dict[str, Any]]): startup results loaded from a previous JSON report
+
+    Returns:
+        List[Tuple[StartupResult, float]]: results found in baseline and import time ratio
+    """
+    baseline_by_module = {item["module"]: item for item in baseline}
+    return [
+        (result, result.import_seconds / baseline_by_module[result.module]["import_seconds"])
+        for result in results
+        if result.module in baseline_by_module
+    ]
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse user command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Measures throughput of fixed width file generation and conversion.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--cases",
+        nargs="*",
+        choices=BENCHMARK_CASES.keys(),
+        default=list(BENCHMARK_CASES.keys()),
+        help="Benchmark cases",
+    )
+    parser.add_argument(
+        "--columns", type=int, nargs="+", default=[10, 50], help="Numbers of columns"
+    )
+    parser.add_argument(
+        "--column_lengths", type=int, nargs="+", default=[5, 20], help="Column lengths"
+    )
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000, 100_000], help="Numbers of rows"
+    )
+    parser.add_argument(
+        "--startup_modules",
+        nargs="*",
+        default=list(STARTUP_MODULES),
+        help="Modules which import time is measured with python -X importtime",
+    )
+    parser.add_argument(
+        "--startup_repeat", type=int, default=5, help="Number of import time measurements"
+    )
+    parser.add_argument(
+        "--output", type=pathlib.Path, required=True, help="Output JSON report file path"
+    )
+    parser.add_argument(
+        "--baseline", type=pathlib.Path, default=None, help="JSON report of a previous run"
+    )
+    parser.add_argument(
+        "--work_dir",
+        type=pathlib.Path,
+        default=None,
+        help="Directory for synthetic files, a temporary directory by default",
+    )
+    return parser.parse_args()
+
+
+def main() -> ExitStatus:
+    """Accept arguments from the user, run benchmarks, save and display the results."""
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = args.work_dir or pathlib.Path(tmp_dir)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        results = []
+        if args.cases:
+            results = run_benchmarks(
+                args.cases, args.columns, args.column_lengths, args.rows, work_dir
+            )
+    startup_results = [
+        measure_startup(module, args.startup_repeat) for module in args.startup_modules
+    ]
+
+    report = {
+        "created": datetime.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [dataclasses.asdict(result) for result in results],
+        "startup": [dataclasses.asdict(result) for result in startup_results],
+    }
+    if args.output.parent:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+
+    for result in results:
+        print(
+            f"{result.case:<24} columns={result.columns:<4} length={result.column_length:<4} "
+            f"rows={result.rows:<10} {result.rows_per_second:>12.0f} rows/s "
+            f"{result.mb_per_second:>8.2f} MB/s peak RSS={result.peak_rss_bytes}"
+        )
+    for startup_result in startup_results:
+        print(
+            f"{startup_result.module:<24} import {startup_result.import_seconds * 1000:>8.1f} ms"
+        )
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for result, ratio in compare_results(results, baseline["results"]):
+            print(
+                f"{result.case:<24} columns={result.columns:<4} length={result.column_length:<4} "
+                f"rows={result.rows:<10} {ratio:>6.2f}x baseline rows/s"
+            )
+        for startup_result, ratio in compare_startup_results(
+            startup_results, baseline.get("startup", [])
+        ):
+            print(f"{startup_result.module:<24} {ratio:>6.2f}x baseline import time")
+
+    print(f"Benchmark report is generated : {args.output}")
+    return ExitStatus.success
+
+
+# Allow the script to be run standalone (useful during development in PyCharm).
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,351 @@
+from array import array
+import datetime
+from decimal import Decimal
+import io
+import json
+import mmap
+import pathlib
+import struct
+import sys
+from typing import (
+    Any,
+    Callable,
+    ClassVar,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from dck_problem1.fixed_width_file_helper import DictionaryColumn
+from dck_problem1.models import FWFColumnSpec, FWFSpec
+
+# a str column is dictionary encoded if it has at most DICTIONARY_RATIO distinct values per row
+DICTIONARY_RATIO = 0.5
+_MAGIC = b"FWFCOL01"
+# footer size, magic
+_TRAILER = struct.Struct("<Q8s")
+_ALIGNMENT = 8
+_FORMAT_VERSION = 1
+
+# (encoding, buffers, null mask) of a column of a row group
+ColumnChunk = Tuple[str, List[bytes], Optional[bytes]]
+
+
+def write_columnar_file(
+    spec: FWFSpec,
+    batches: Iterable[Sequence[Sequence[Any]]],
+    output_file: pathlib.Path,
+    columns: Optional[List[str]] = None,
+) -> None:
+    """Writes blocks of typed columns into columnar binary file, see parse_fwf_batches with
+       typed=True. The file is read by ColumnarReader without parsing text.
+
+       Every block is stored as a row group of column chunks. Values of int and fixed
+       columns are stored as int64 arrays, fixed values without the implied scale, dates
+       as int32 ordinals, str and decimal values as offsets and UTF-8 bytes or, if a str
+       column has few distinct values, see DICTIONARY_RATIO, as a dictionary and uint32
+       codes. DictionaryColumn blocks of str columns, see parse_fwf_batches with
+       dictionary_size, keep their codes. None values are marked by a null mask. Buffers
+       are 8-byte aligned and located by a JSON footer at the end of the file.
+
+    Parameters
+    ----------
+    spec : FWFSpec
+        Fixed width file spec, column dtypes define the stored types
+    batches : Iterable[Sequence[Sequence[Any]]]
+        blocks iterator. Every block is a list of columns of the same length in spec order
+        or in the order of projected columns
+    output_file : pathlib.Path
+        path to output file
+    columns : Optional[List[str]], optional
+        names of projected columns, by default all columns
+
+    Raises
+    ------
+    ValueError
+        if a projected column is not found or a block has a wrong number of columns
+    """
+    column_specs = spec.select_columns(columns)
+    if output_file.parent:
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+
+    row_groups = []
+    rows = 0
+    with open(output_file, "wb") as f:
+        f.write(_MAGIC)
+        for block in batches:
+            if len(block) != len(column_specs):
+                raise ValueError(
+                    f"Block has {len(block)} columns, expected {len(column_specs)} columns"
+                )
+            length = len(block[0]) if block else 0
+            chunks = []
+            for col, values in zip(column_specs, block):
+                encoding, buffers, nulls = __encode_column(col, values)
+                chunks.append(
+                    {
+                        "encoding": encoding,
+                        "buffers": [__write_buffer(f, buffer) for buffer in buffers],
+                        "nulls": None if nulls is None else __write_buffer(f, nulls),
+                    }
+                )
+            row_groups.append({"rows": length, "columns": chunks})
+            rows += length
+        footer = {
+            "version": _FORMAT_VERSION,
+            "byteorder": sys.byteorder,
+            "rows": rows,
+            "columns": [
+                {"name": col.name, "dtype": col.dtype, "scale": col.scale} for col in column_specs
+            ],
+            "row_groups": row_groups,
+        }
+        footer_data = json.dumps(footer, separators=(",", ":")).encode("utf-8")
+        f.write(footer_data)
+        f.write(_TRAILER.pack(len(footer_data), _MAGIC))
+
+
+def __write_buffer(f: Any, buffer: bytes) -> Tuple[int, int]:
+    padding = -f.tell() % _ALIGNMENT
+    f.write(b"\0" * padding)
+    offset = f.tell()
+    f.write(buffer)
+    return offset, len(buffer)
+
+
+def __encode_column(col: FWFColumnSpec, values: Sequence[Any]) -> ColumnChunk:
+    if col.dtype == "str" and isinstance(values, DictionaryColumn):
+        # codes of parse_fwf_batches with dictionary_size are stored as they are
+        return (
+            "dictionary",
+            __encode_strings(values.dictionary) + [array("I", values.codes).tobytes()],
+            None,
+        )
+    nulls = bytes(value is None for value in values) if None in values else None
+    try:
+        if col.dtype == "int":
+            return "int64", [array("q", [value or 0 for value in values]).tobytes()], nulls
+        if col.dtype == "fixed":
+            exponent = col.scale
+            unscaled = [0 if value is None else int(value.scaleb(exponent)) for value in values]
+            return "int64", [array("q", unscaled).tobytes()], nulls
+    except OverflowError:
+        # too large for int64, stored as strings
+        pass
+    if col.dtype == "date":
+        # None is stored as the first day, so every stored value is a valid date
+        ordinals = [1 if value is None else value.toordinal() for value in values]
+        return "int32", [array("i", ordinals).tobytes()], nulls
+    texts = ["" if value is None else str(value) for value in values]
+    if col.dtype == "str":
+        dictionary = dict.fromkeys(texts)
+        if len(dictionary) <= len(texts) * DICTIONARY_RATIO:
+            codes = {text: code for code, text in enumerate(dictionary)}
+            return (
+                "dictionary",
+                __encode_strings(list(dictionary))
+                + [array("I", map(codes.__getitem__, texts)).tobytes()],
+                nulls,
+            )
+    return "string", __encode_strings(texts), nulls
+
+
+def __encode_strings(texts: List[str]) -> List[Any]:
+    data = "".join(texts).encode("utf-8")
+    offsets = array("Q", [0])
+    if len(data) == sum(map(len, texts)):
+        # ASCII values, so character offsets are byte offsets
+        lengths: Iterable[int] = map(len, texts)
+    else:
+        lengths = (len(text.encode("utf-8")) for text in texts)
+    position = 0
+    for length in lengths:
+        position += length
+        offsets.append(position)
+    return [offsets.tobytes(), data]
+
+
+class ColumnarReader:
+    """Memory mapped reader of columnar files written by write_columnar_file.
+
+    Column chunks are decoded from the mapped buffers without parsing text: numeric
+    arrays are cast in place, dictionary encoded strings share one str object per distinct
+    value. Values are typed like parse_fwf_file with typed=True returns them. The reader
+    supports len(reader) and iteration over rows and should be closed, e.g. used as
+    a context manager.
+
+    Parameters
+    ----------
+    input_file : pathlib.Path
+        path to columnar file
+
+    Raises
+    ------
+    ValueError
+        if the file is not a columnar file or its format version is not supported
+    """
+
+    # converters of typed string columns, e.g. of numbers which do not fit int64
+    __STRING_CONVERTERS: ClassVar[Dict[str, Callable[[str], Any]]] = {
+        "int": int,
+        "decimal": Decimal,
+        "fixed": Decimal,
+    }
+
+    def __init__(self, input_file: pathlib.Path):
+        self.__mm: Optional[mmap.mmap] = None
+        with open(input_file, "rb") as f:
+            size = f.seek(0, io.SEEK_END)
+            if size < len(_MAGIC) + _TRAILER.size:
+                raise ValueError(f"File {input_file} is not a columnar file")
+            self.__mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            footer_size, magic = _TRAILER.unpack_from(self.__mm, size - _TRAILER.size)
+            footer_end = size - _TRAILER.size
+            if magic != _MAGIC or self.__mm[: len(_MAGIC)] != _MAGIC:
+                raise ValueError(f"File {input_file} is not a columnar file")
+            footer = json.loads(self.__mm[footer_end - footer_size : footer_end])
+            if footer["version"] != _FORMAT_VERSION:
+                raise ValueError(f"Columnar file version {footer['version']} is not supported")
+        except BaseException:
+            self.close()
+            raise
+        self.__byteswap = footer["byteorder"] != sys.byteorder
+        self.__length: int = footer["rows"]
+        self.__columns: List[Dict[str, Any]] = footer["columns"]
+        self.__row_groups: List[Dict[str, Any]] = footer["row_groups"]
+        self.__index = {column["name"]: i for i, column in enumerate(self.__columns)}
+
+    def __enter__(self) -> "ColumnarReader":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes memory mapped file"""
+        if self.__mm is not None:
+            self.__mm.close()
+            self.__mm = None
+
+    def __len__(self) -> int:
+        return self.__length
+
+    @property
+    def column_names(self) -> List[str]:
+        """Names of stored columns"""
+        return [column["name"] for column in self.__columns]
+
+    def read_column(self, name: str) -> List[Any]:
+        """Reads all values of a column
+
+        Parameters
+        ----------
+        name : str
+            column name
+
+        Returns
+        -------
+        List[Any]
+            values of the column
+
+        Raises
+        ------
+        ValueError
+            if the column is not found
+        """
+        values: List[Any] = []
+        for batch in self.read_batches([name]):
+            values.extend(batch[0])
+        return values
+
+    def read_batches(self, columns: Optional[List[str]] = None) -> Iterator[List[List[Any]]]:
+        """Reads row groups as blocks of columns, like parse_fwf_batches returns them
+
+        Parameters
+        ----------
+        columns : Optional[List[str]], optional
+            names of projected columns, only these columns are decoded, by default all columns
+
+        Yields
+        -------
+        Iterator[List[List[Any]]]
+            blocks iterator. Every block is a list of columns, every column is a list of values
+
+        Raises
+        ------
+        ValueError
+            if a projected column is not found
+        """
+        names = self.column_names if columns is None else columns
+        for name in names:
+            if name not in self.__index:
+                raise ValueError(f"Column {name} not found")
+        indexes = [self.__index[name] for name in names]
+        for row_group in self.__row_groups:
+            yield [self.__decode(self.__columns[i], row_group["columns"][i]) for i in indexes]
+
+    def __iter__(self) -> Iterator[List[Any]]:
+        for batch in self.read_batches():
+            yield from map(list, zip(*batch))
+
+    def __decode(self, column: Dict[str, Any], chunk: Dict[str, Any]) -> List[Any]:
+        buffers = [self.__buffer(offset, size) for offset, size in chunk["buffers"]]
+        if chunk["nulls"] is not None:
+            buffers.append(self.__buffer(*chunk["nulls"]))
+        try:
+            values = self.__decode_values(column, chunk["encoding"], buffers)
+            if chunk["nulls"] is not None:
+                values = [None if null else value for value, null in zip(values, buffers[-1])]
+            return values
+        finally:
+            # views of the mapped file would prevent closing it
+            for buffer in buffers:
+                buffer.release()
+
+    def __decode_values(
+        self, column: Dict[str, Any], encoding: str, buffers: List[memoryview]
+    ) -> List[Any]:
+        dtype = column["dtype"]
+        if encoding == "int64":
+            values: List[Any] = self.__array("q", buffers[0])
+            if dtype == "fixed":
+                exponent = -column["scale"]
+                values = [Decimal(value).scaleb(exponent) for value in values]
+            return values
+        if encoding == "int32":
+            return list(map(datetime.date.fromordinal, self.__array("i", buffers[0])))
+        if encoding == "dictionary":
+            dictionary = self.__strings(buffers[0], buffers[1])
+            return list(map(dictionary.__getitem__, self.__array("I", buffers[2])))
+        values = self.__strings(buffers[0], buffers[1])
+        if dtype != "str":
+            converter = self.__STRING_CONVERTERS[dtype]
+            values = [converter(value) if value else None for value in values]
+        return values
+
+    def __buffer(self, offset: int, size: int) -> memoryview:
+        if self.__mm is None:
+            raise ValueError("Columnar file is closed")
+        return memoryview(self.__mm)[offset : offset + size]
+
+    def __array(self, typecode: str, buffer: memoryview) -> List[int]:
+        if not self.__byteswap:
+            with buffer.cast(typecode) as view:  # type: ignore
+                return view.tolist()
+        values = array(typecode, buffer)
+        values.byteswap()
+        return values.tolist()
+
+    def __strings(self, offsets_buffer: memoryview, data_buffer: memoryview) -> List[str]:
+        offsets = self.__array("Q", offsets_buffer)
+        data = bytes(data_buffer)
+        text = data.decode("utf-8")
+        if len(text) == len(data):
+            # ASCII values, so byte offsets are character offsets
+            return [text[start:end] for start, end in zip(offsets, offsets[1:])]
+        return [data[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
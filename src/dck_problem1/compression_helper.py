@@ -0,0 +1,247 @@
+import importlib.util
+import io
+import pathlib
+import re
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional, Pattern, TextIO, Tuple
+
+from dck_problem1.stream_helper import threaded_iterator
+
+AUTO = "auto"
+NONE = "none"
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+__MAGIC_LENGTH = 10
+
+
+def __module_exists(name: str) -> bool:
+    try:
+        return importlib.util.find_spec(name) is not None
+    except ImportError:
+        return False
+
+
+# compression modules are imported when a compressed file is opened
+def __open_gzip(path: pathlib.Path, mode: str, level: Optional[int]) -> BinaryIO:
+    import gzip
+
+    return gzip.open(path, mode, 6 if level is None else level)  # type: ignore
+
+
+def __open_bz2(path: pathlib.Path, mode: str, level: Optional[int]) -> BinaryIO:
+    import bz2
+
+    return bz2.open(path, mode, 9 if level is None else level)  # type: ignore
+
+
+def __open_xz(path: pathlib.Path, mode: str, level: Optional[int]) -> BinaryIO:
+    import lzma
+
+    preset = level if "w" in mode else None
+    return lzma.open(path, mode, preset=preset)  # type: ignore
+
+
+def __open_zstd(path: pathlib.Path, mode: str, level: Optional[int]) -> BinaryIO:
+    from compression import zstd  # type: ignore
+
+    if "w" in mode:
+        return zstd.open(path, mode, level=level)  # type: ignore
+    return zstd.open(path, mode)  # type: ignore
+
+
+# compression -> (opener, file extensions, pattern of the header)
+# headers are matched beyond the magic bytes, so plain files starting e.g. with "BZh"
+# are not detected as compressed
+__COMPRESSIONS: Dict[str, Tuple[Callable[..., BinaryIO], Tuple[str, ...], Pattern[bytes]]] = {
+    # magic, deflate method, flags with reserved bits unset
+    "gzip": (__open_gzip, (".gz", ".gzip"), re.compile(b"\x1f\x8b\x08[\x00-\x1f]")),
+    # magic, block size, block magic (pi) or end of stream magic (sqrt(pi)) of empty data
+    "bz2": (
+        __open_bz2,
+        (".bz2",),
+        re.compile(b"BZh[1-9](?:\x31\x41\x59\x26\x53\x59|\x17\x72\x45\x38\x50\x90)"),
+    ),
+    "xz": (__open_xz, (".xz",), re.compile(re.escape(b"\xfd7zXZ\x00"))),
+}
+# available in the standard library since python 3.14
+if __module_exists("compression.zstd"):  # pragma: no cover
+    __COMPRESSIONS["zstd"] = (
+        __open_zstd,
+        (".zst", ".zstd"),
+        re.compile(re.escape(b"\x28\xb5\x2f\xfd")),
+    )
+
+COMPRESSIONS = (AUTO, NONE) + tuple(__COMPRESSIONS.keys())
+
+
+def compression_from_extension(path: pathlib.Path) -> Optional[str]:
+    """Detects compression from the file extension
+
+    Args:
+        path (pathlib.Path): file path
+
+    Returns:
+        Optional[str]: compression name or None for plain files
+    """
+    suffix = path.suffix.lower()
+    for name, (_, extensions, _) in __COMPRESSIONS.items():
+        if suffix in extensions:
+            return name
+    return None
+
+
+def detect_compression(path: pathlib.Path) -> Optional[str]:
+    """Detects compression of an existing file from the extension or the magic bytes
+
+    Args:
+        path (pathlib.Path): file path
+
+    Returns:
+        Optional[str]: compression name or None for plain files
+    """
+    compression = compression_from_extension(path)
+    if compression is not None:
+        return compression
+    with open(path, "rb") as f:
+        head = f.read(__MAGIC_LENGTH)
+    for name, (_, _, header) in __COMPRESSIONS.items():
+        if header.match(head):
+            return name
+    return None
+
+
+def __resolve(compression: str, detected: Callable[[], Optional[str]]) -> Optional[str]:
+    if compression == AUTO:
+        return detected()
+    if compression == NONE:
+        return None
+    if compression not in __COMPRESSIONS:
+        raise ValueError(f"Compression {compression} is not supported")
+    return compression
+
+
+class _DecompressingReader(io.RawIOBase):
+    """Raw stream of decompressed data, decompression runs in a separate thread"""
+
+    def __init__(self, chunks: Iterator[bytes], source: BinaryIO):
+        self.__chunks = chunks
+        self.__source = source
+        self.__chunk = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        while not self.__chunk:
+            chunk = next(self.__chunks, None)
+            if chunk is None:
+                return 0
+            self.__chunk = memoryview(chunk)
+        size = min(len(buffer), len(self.__chunk))
+        buffer[:size] = self.__chunk[:size]
+        self.__chunk = self.__chunk[size:]
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            close_chunks = getattr(self.__chunks, "close", None)
+            if close_chunks:
+                close_chunks()
+            self.__source.close()
+        super().close()
+
+
+def __read_chunks(source: BinaryIO, block_size: int) -> Iterator[bytes]:
+    while True:
+        chunk = source.read(block_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def open_input(
+    path: pathlib.Path, compression: str = AUTO, block_size: int = DEFAULT_BLOCK_SIZE
+) -> BinaryIO:
+    """Opens binary input file, compressed files are decompressed in a separate thread
+
+    Args:
+        path (pathlib.Path): file path
+        compression (str, optional): one of COMPRESSIONS, by default detected from
+            the extension or the magic bytes. Defaults to AUTO.
+        block_size (int, optional): size of read and decompressed blocks.
+            Defaults to DEFAULT_BLOCK_SIZE.
+
+    Raises:
+        ValueError: if the compression is not supported
+
+    Returns:
+        BinaryIO: decompressed binary stream
+    """
+    resolved = __resolve(compression, lambda: detect_compression(path))
+    if resolved is None:
+        return open(path, "rb", block_size)
+    opener = __COMPRESSIONS[resolved][0]
+    source = opener(path, "rb", None)
+    chunks = threaded_iterator(__read_chunks(source, block_size))
+    return io.BufferedReader(_DecompressingReader(chunks, source), block_size)  # type: ignore
+
+
+def open_output(
+    path: pathlib.Path,
+    compression: str = AUTO,
+    level: Optional[int] = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> BinaryIO:
+    """Opens binary output file, creates parent directories
+
+    Args:
+        path (pathlib.Path): file path
+        compression (str, optional): one of COMPRESSIONS, by default detected from
+            the extension. Defaults to AUTO.
+        level (Optional[int], optional): compression level, by default the compression
+            default. Defaults to None.
+        block_size (int, optional): size of blocks passed to the compressor.
+            Defaults to DEFAULT_BLOCK_SIZE.
+
+    Raises:
+        ValueError: if the compression is not supported
+
+    Returns:
+        BinaryIO: binary stream compressing written data
+    """
+    if path.parent:
+        path.parent.mkdir(parents=True, exist_ok=True)
+    resolved = __resolve(compression, lambda: compression_from_extension(path))
+    if resolved is None:
+        return open(path, "wb", block_size)
+    opener = __COMPRESSIONS[resolved][0]
+    return io.BufferedWriter(opener(path, "wb", level), block_size)  # type: ignore
+
+
+def open_text_input(path: pathlib.Path, encoding: str, buffering: int = -1) -> TextIO:
+    """Opens text input file, compression is detected from the extension or the magic bytes
+
+    Args:
+        path (pathlib.Path): file path
+        encoding (str): file encoding
+        buffering (int, optional): buffering of plain files, see open. Defaults to -1.
+
+    Returns:
+        TextIO: text stream with universal new lines
+    """
+    if detect_compression(path) is None:
+        return open(path, "r", buffering, encoding=encoding)
+    return io.TextIOWrapper(open_input(path), encoding=encoding)
+
+
+def open_text_output(path: pathlib.Path, encoding: str) -> TextIO:
+    """Opens text output file with newline="", compression is detected from the extension
+
+    Args:
+        path (pathlib.Path): file path
+        encoding (str): file encoding
+
+    Returns:
+        TextIO: text stream
+    """
+    if compression_from_extension(path) is None:
+        return open(path, "w", newline="", encoding=encoding)
+    return io.TextIOWrapper(open_output(path), encoding=encoding, newline="")
@@ -0,0 +1,845 @@
+import dataclasses
+import io
+from itertools import chain, islice
+import json
+import os
+import pathlib
+import re
+import time
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Tuple,
+)
+import zlib
+
+from dck_problem1.compression_helper import (
+    compression_from_extension,
+    detect_compression,
+    open_output,
+)
+from dck_problem1.csv_file_reader import read_csv_file
+from dck_problem1.csv_file_writer import (
+    DEFAULT_BATCH_SIZE,
+    WRITER_ENGINES,
+    create_csv_writer,
+    write_csv_stream,
+)
+from dck_problem1.encoding_helper import (
+    UNDEFINED_CHAR,
+    encode_without_signature,
+    encoding_signature,
+    is_ascii_compatible_encoding,
+    single_byte_decoding_table,
+)
+from dck_problem1.fixed_width_file_helper import (
+    DEFAULT_BLOCK_SIZE,
+    PARSER_ENGINES,
+    FWFOverflow,
+    check_fwf_byte_offsets,
+    fwf_byte_line_filter,
+    fwf_column_slices,
+    fwf_line_filter,
+    fwf_record_layout,
+    parse_fwf_byte_lines,
+    parse_fwf_lines,
+    write_fwf_file,
+)
+from dck_problem1.models import CSVSpec, FWFSpec
+from dck_problem1.stream_helper import DEFAULT_QUEUE_SIZE, threaded_iterator
+from dck_problem1.transcoding import Transcoder
+
+DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024
+DEFAULT_HEAD_SIZE = 64 * 1024
+DEFAULT_CHECKPOINT_INTERVAL = 256 * 1024 * 1024
+CHECKPOINT_FILE_SUFFIX = ".checkpoint"
+
+Where = Dict[str, Callable[[str], bool]]
+
+
+@dataclasses.dataclass
+class FileConversionResult:
+    """Result of a file converted by convert_fwf_files, error is None on success"""
+
+    input_file: pathlib.Path
+    output_file: pathlib.Path
+    seconds: float
+    error: Optional[str] = None
+
+
+@dataclasses.dataclass
+class ConversionCheckpoint:
+    """Progress of an incremental conversion, see convert_fwf_file_incremental"""
+
+    # byte offset of the first record which is not converted yet
+    offset: int
+    records: int
+    csv_size: int
+    # fingerprint of the first head_size bytes of the fixed width file
+    head_size: int
+    head_crc32: int
+
+
+def split_fwf_file(
+    spec: FWFSpec, input_file: pathlib.Path, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> List[Tuple[int, int]]:
+    """Splits fixed width file into byte ranges of whole lines. Range boundaries are
+       estimated from the size of the first record, see fwf_record_layout, and moved to
+       the start of the next line if the byte before is not a line feed, e.g. if a line is
+       trimmed, so a range never starts in the middle of a record.
+
+    Parameters
+    ----------
+    spec : FWFSpec
+        Fixed width file spec, column offsets must be byte offsets, see check_fwf_byte_offsets
+    input_file : pathlib.Path
+        path to input file
+    chunk_size : int, optional
+        approximate size of a range in bytes, by default DEFAULT_CHUNK_SIZE
+
+    Returns
+    -------
+    List[Tuple[int, int]]
+        list of (start, end) byte offsets, header is excluded
+
+    Raises
+    ------
+    ValueError
+        if column offsets are not byte offsets or the file is compressed
+    """
+    if detect_compression(input_file) is not None:
+        raise ValueError(f"Compressed file {input_file} can not be split")
+    check_fwf_byte_offsets(spec)
+    with open(input_file, "rb") as f:
+        data_offset, record_size = fwf_record_layout(spec, f)
+        file_size = f.seek(0, io.SEEK_END)
+        step = max(1, chunk_size // record_size) * record_size
+        boundaries = [data_offset]
+        for position in range(data_offset + step, file_size, step):
+            position = max(position, boundaries[-1])
+            f.seek(position - 1)
+            if f.read(1) != b"\n":
+                # a trimmed or longer line, the range starts with the next line
+                f.readline()
+                position = f.tell()
+            if boundaries[-1] < position < file_size:
+                boundaries.append(position)
+    boundaries.append(file_size)
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if start < end]
+
+
+def __convert_range(
+    task: Tuple[FWFSpec, CSVSpec, pathlib.Path, int, int, Optional[List[str]], Optional[Where]],
+) -> bytes:
+    fwf_spec, csv_spec, input_file, start, end, columns, where = task
+    with open(input_file, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return convert_fwf_lines(fwf_spec, csv_spec, __block_lines(fwf_spec, data), columns, where)
+
+
+def __block_lines(fwf_spec: FWFSpec, data: bytes) -> Iterable[Any]:
+    # byte lines are sliced if widths are counted in bytes
+    if fwf_spec.byte_widths:
+        return io.BytesIO(data)
+    # universal newlines, like a fixed width file opened in text mode
+    return io.StringIO(data.decode(fwf_spec.encoding), newline=None)
+
+
+def convert_fwf_lines(
+    fwf_spec: FWFSpec,
+    csv_spec: CSVSpec,
+    lines: Iterable[Any],
+    columns: Optional[List[str]] = None,
+    where: Optional[Where] = None,
+) -> bytes:
+    """Converts fixed width lines into encoded CSV rows without a header. Rows are encoded
+       without the signature of encodings like utf-16, see encode_without_signature, so
+       converted parts of a file are joined after the header or the signature.
+
+    Parameters
+    ----------
+    fwf_spec : FWFSpec
+        Fixed width file spec
+    csv_spec : CSVSpec
+        CSV file spec
+    lines : Iterable[Any]
+        fixed width lines without a header, str lines or encoded lines if fwf_spec.byte_widths
+    columns : Optional[List[str]], optional
+        names of projected columns, see parse_fwf_file, by default all columns
+    where : Optional[Dict[str, Callable[[str], bool]]], optional
+        predicates of raw column values, see parse_fwf_file, by default None
+
+    Returns
+    -------
+    bytes
+        CSV rows in the CSV spec encoding
+    """
+    text = __format_csv_rows(fwf_spec, csv_spec, lines, columns, where)
+    return encode_without_signature(text, csv_spec.encoding)
+
+
+def __format_csv_rows(
+    fwf_spec: FWFSpec,
+    csv_spec: CSVSpec,
+    lines: Iterable[Any],
+    columns: Optional[List[str]],
+    where: Optional[Where],
+) -> str:
+    output = io.StringIO(newline="")
+    create_csv_writer(csv_spec, output).writerows(__parse_rows(fwf_spec, lines, columns, where))
+    return output.getvalue()
+
+
+def __parse_rows(
+    fwf_spec: FWFSpec,
+    lines: Iterable[Any],
+    columns: Optional[List[str]],
+    where: Optional[Where],
+) -> Iterator[Iterable[Any]]:
+    slices = fwf_column_slices(fwf_spec, columns)
+    if fwf_spec.byte_widths:
+        byte_line_filter = fwf_byte_line_filter(fwf_spec, where)
+        if byte_line_filter is not None:
+            lines = filter(byte_line_filter, lines)
+        return parse_fwf_byte_lines(slices, fwf_spec.encoding, lines)
+    line_filter = fwf_line_filter(fwf_spec, where)
+    if line_filter is not None:
+        lines = filter(line_filter, lines)
+    return parse_fwf_lines(slices, lines)
+
+
+def convert_fwf_blocks(
+    fwf_spec: FWFSpec,
+    csv_spec: CSVSpec,
+    blocks: Iterable[bytes],
+    columns: Optional[List[str]] = None,
+    where: Optional[Where] = None,
+) -> Iterator[bytes]:
+    """Converts blocks of whole fixed width lines into blocks of CSV file.
+       ASCII-only blocks are sliced, stripped and joined as bytes without decoding and
+       encoding if both encodings are ascii compatible, there are no where predicates and
+       no value needs quoting. Blocks of a single-byte encoding, e.g. latin-1, are sliced
+       the same way and translated into the CSV encoding by Transcoder.transcode if every
+       character has a single byte in it. Other blocks are decoded, converted by csv module
+       and encoded by Transcoder. Produces the same output as convert_fwf_lines.
+
+    Parameters
+    ----------
+    fwf_spec : FWFSpec
+        Fixed width file spec, encoding must be ascii compatible
+    csv_spec : CSVSpec
+        CSV file spec
+    blocks : Iterable[bytes]
+        blocks of fixed width file, every block except the last one ends with a line
+        terminator, the first block starts with the header if fwf_spec.header is True
+    columns : Optional[List[str]], optional
+        names of projected columns, see parse_fwf_file, by default all columns
+    where : Optional[Dict[str, Callable[[str], bool]]], optional
+        predicates of raw column values, see parse_fwf_file, by default None
+
+    Yields
+    -------
+    Iterator[bytes]
+        blocks of CSV file in the CSV spec encoding, starting with the header
+        if csv_spec.header is True
+
+    Raises
+    ------
+    ValueError
+        if the fixed width encoding is not ascii compatible or a projected or filtered
+        column is not found
+    """
+    if not is_ascii_compatible_encoding(fwf_spec.encoding):
+        raise ValueError(f"Encoding {fwf_spec.encoding} is not ascii compatible")
+    transcoder = Transcoder(fwf_spec.encoding, csv_spec.encoding)
+    slices = fwf_column_slices(fwf_spec, columns)
+    # unknown filtered columns are reported before the first block is read
+    fwf_line_filter(fwf_spec, where)
+    dialect = create_csv_writer(csv_spec, io.StringIO()).dialect
+    # non-ASCII bytes are sliced only if they are translated byte by byte
+    decoding_table = (
+        single_byte_decoding_table(fwf_spec.encoding) if transcoder.byte_translation else None
+    )
+    special_bytes = __special_bytes(csv_spec, dialect.lineterminator, decoding_table)
+    # csv module quotes a single empty value, where predicates need decoded values
+    if not transcoder.ascii_passthrough or len(slices) == 1 or where:
+        special_bytes = None
+    if csv_spec.header:
+        header = io.StringIO(newline="")
+        create_csv_writer(csv_spec, header).writerow(csv_spec.column_names)
+        yield transcoder.encode(header.getvalue())
+    skip_header = fwf_spec.header
+    for block in blocks:
+        if skip_header:
+            block = block[block.find(b"\n") + 1 :] if b"\n" in block else b""
+            skip_header = False
+        if not block:
+            continue
+        if (
+            special_bytes is not None
+            and (decoding_table is not None or block.isascii())
+            and not special_bytes.search(block)
+        ):
+            rows = __convert_ascii_block(
+                block, slices, dialect.delimiter.encode(), dialect.lineterminator.encode()
+            )
+            yield transcoder.transcode(rows)
+        else:
+            lines: Iterable[Any] = (
+                io.BytesIO(block)
+                if fwf_spec.byte_widths
+                else io.StringIO(transcoder.decode(block), newline=None)
+            )
+            yield transcoder.encode(__format_csv_rows(fwf_spec, csv_spec, lines, columns, where))
+    # raises an error of a truncated character
+    transcoder.decode(b"", final=True)
+    tail = transcoder.encode("", final=True)
+    if tail:
+        yield tail
+
+
+def __special_bytes(
+    csv_spec: CSVSpec, lineterminator: str, decoding_table: Optional[str]
+) -> Optional[Pattern[bytes]]:
+    special_chars = (csv_spec.delimiter, csv_spec.quotechar, lineterminator)
+    if not all(char.isascii() for char in special_chars):
+        return None
+    # values with these bytes are quoted by csv module or stripped differently by str.strip,
+    # values never contain "\n" which separates lines
+    special = {*csv_spec.delimiter, *csv_spec.quotechar, *lineterminator, "\r"} - {"\n"}
+    special.update(map(chr, range(0x1C, 0x20)))
+    pattern = re.escape("".join(sorted(special)).encode("ascii"))
+    if decoding_table is not None:
+        # non-ASCII whitespace like latin-1 "\xa0" is stripped by str.strip, undefined bytes
+        # raise the error of the codec when they are decoded
+        pattern += re.escape(
+            bytes(
+                b
+                for b, char in enumerate(decoding_table)
+                if b >= 0x80 and (char == UNDEFINED_CHAR or char.isspace())
+            )
+        )
+    return re.compile(b"[" + pattern + b"]")
+
+
+def __convert_ascii_block(
+    block: bytes, slices: List[slice], delimiter: bytes, lineterminator: bytes
+) -> bytes:
+    lines = block.split(b"\n")
+    if not lines[-1]:
+        lines.pop()
+    rows = [delimiter.join([line[s].strip() for s in slices]) for line in lines]
+    rows.append(b"")
+    return lineterminator.join(rows)
+
+
+def transcode_fwf_stream(
+    fwf_spec: FWFSpec,
+    csv_spec: CSVSpec,
+    input_stream: BinaryIO,
+    output_stream: BinaryIO,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    columns: Optional[List[str]] = None,
+    where: Optional[Where] = None,
+) -> None:
+    """Converts fixed width binary stream into CSV binary stream in large blocks of whole
+       lines, see convert_fwf_blocks. Streams are not closed, the output stream is flushed.
+
+    Parameters
+    ----------
+    fwf_spec : FWFSpec
+        Fixed width file spec, encoding must be ascii compatible
+    csv_spec : CSVSpec
+        CSV file spec
+    input_stream : BinaryIO
+        fixed width input, e.g. a file or stdin
+    output_stream : BinaryIO
+        CSV output, e.g. a file or stdout
+    block_size : int, optional
+        approximate size of a converted block in bytes, by default DEFAULT_BLOCK_SIZE
+    columns : Optional[List[str]], optional
+        names of projected columns, see parse_fwf_file, by default all columns
+    where : Optional[Dict[str, Callable[[str], bool]]], optional
+        predicates of raw column values, see parse_fwf_file, by default None
+
+    Raises
+    ------
+    ValueError
+        if the fixed width encoding is not ascii compatible or a projected or filtered
+        column is not found
+    """
+    blocks = __whole_lines(input_stream, block_size, final=True)
+    for data in convert_fwf_blocks(fwf_spec, csv_spec, blocks, columns, where):
+        output_stream.write(data)
+    output_stream.flush()
+
+
+def convert_fwf_file_parallel(
+    fwf_spec: FWFSpec,
+    csv_spec: CSVSpec,
+    input_file: pathlib.Path,
+    csv_output_file: pathlib.Path,
+    workers: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    columns: Optional[List[str]] = None,
+    where: Optional[Where] = None,
+) -> None:
+    """Converts fixed width file into CSV file using multiple processes.
+       Output rows keep the order of the input file.
+
+    Parameters
+    ----------
+    fwf_spec : FWFSpec
+        Fixed width file spec, column offsets must be byte offsets, see check_fwf_byte_offsets
+    csv_spec : CSVSpec
+        CSV file spec
+    input_file : pathlib.Path
+        path to input file
+    csv_output_file : pathlib.Path
+        CSV file output path
+    workers : int
+        number of worker processes
+    chunk_size : int, optional
+        approximate size of a range converted by a worker in bytes, by default DEFAULT_CHUNK_SIZE
+    columns : Optional[List[str]], optional
+        names of projected columns, see parse_fwf_file, by default all columns
+    where : Optional[Dict[str, Callable[[str], bool]]], optional
+        predicates of raw column values, must be picklable, see parse_fwf_file, by default None
+
+    Raises
+    ------
+    ValueError
+        if the number of workers is <= 0, column offsets are not byte offsets
+        or the input file is compressed
+    """
+    if workers <= 0:
+        raise ValueError("workers should be > 0")
+    ranges = split_fwf_file(fwf_spec, input_file, chunk_size)
+    # multiprocessing is slow to import, only parallel conversion needs it
+    from multiprocessing import Pool
+
+    with open_output(csv_output_file) as f, Pool(workers) as pool:
+        # the header starts with the signature of the encoding, chunks are written without it
+        signed = csv_spec.header
+        if csv_spec.header:
+            f.write(__csv_header(csv_spec))
+        tasks = (
+            (fwf_spec, csv_spec, input_file, start, end, columns, where) for start, end in ranges
+        )
+        for chunk in pool.imap(__convert_range, tasks):
+            if chunk and not signed:
+                f.write(encoding_signature(csv_spec.encoding))
+                signed = True
+            f.write(chunk)
+
+
+def __csv_header(csv_spec: CSVSpec) -> bytes:
+    header = io.StringIO(newline="")
+    create_csv_writer(csv_spec, header).writerow(csv_spec.column_names)
+    return header.getvalue().encode(csv_spec.encoding)
+
+
+def __line_batches(lines: Iterable[Iterable[Any]], batch_size: int) -> Iterator[List[List[Any]]]:
+    rows = iter(lines)
+    while True:
+        batch = [list(row) for row in islice(rows, batch_size)]
+        if not batch:
+            return
+        yield batch
+
+
+def convert_fwf_stream(
+    fwf_spec: FWFSpec,
+    csv_spec: CSVSpec,
+    input_stream: BinaryIO,
+    output_stream: BinaryIO,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    columns: Optional[List[str]] = None,
+    where: Optional[Where] = None,
+) -> None:
+    """Converts fixed width binary stream into CSV binary stream.
+       Lines are parsed in a separate thread and passed to the writer in batches
+       through a bounded queue. Streams are not closed, the output stream is flushed.
+
+    Parameters
+    ----------
+    fwf_spec : FWFSpec
+        Fixed width file spec
+    csv_spec : CSVSpec
+        CSV file spec
+    input_stream : BinaryIO
+        fixed width input, e.g. stdin
+    output_stream : BinaryIO
+        CSV output, e.g. stdout
+    batch_size : int, optional
+        number of lines passed to the writer at once, by default DEFAULT_BATCH_SIZE
+    queue_size : int, optional
+        max number of batches waiting for the writer, by default DEFAULT_QUEUE_SIZE
+    columns : Optional[List[str]], optional
+        names of projected columns, see parse_fwf_file, by default all columns
+    where : Optional[Dict[str, Callable[[str], bool]]], optional
+        predicates of raw column values, see parse_fwf_file, by default None
+    """
+    # byte lines are sliced if widths are counted in bytes
+    text_lines = (
+        None
+        if fwf_spec.byte_widths
+        else io.TextIOWrapper(input_stream, encoding=fwf_spec.encoding)
+    )
+    lines: Iterable[Any] = input_stream if text_lines is None else text_lines
+    output = io.TextIOWrapper(output_stream, encoding=csv_spec.encoding, newline="")
+    try:
+        rows = __parse_rows(fwf_spec, __skip_header(fwf_spec, lines), columns, where)
+        batches = threaded_iterator(__line_batches(rows, batch_size), queue_size)
+        write_csv_stream(csv_spec, chain.from_iterable(batches), output, batch_size)
+    finally:
+        # streams are owned by the caller
+        output.detach()
+        if text_lines is not None:
+            text_lines.detach()
+    output_stream.flush()
+
+
+def __skip_header(fwf_spec: FWFSpec, lines: Iterable[Any]) -> Iterator[Any]:
+    # the header is skipped when the first line is read
+    lines = iter(lines)
+    if fwf_spec.header:
+        next(lines, None)
+    return lines
+
+
+def __convert_file(
+    task: Tuple[
+        FWFSpec,
+        CSVSpec,
+        pathlib.Path,
+        pathlib.Path,
+        str,
+        str,
+        Optional[List[str]],
+        Optional[Where],
+    ],
+) -> FileConversionResult:
+    fwf_spec, csv_spec, input_file, output_file, parser, writer, columns, where = task
+    start = time.perf_counter()
+    try:
+        lines = PARSER_ENGINES[parser](fwf_spec, input_file, columns=columns, where=where)
+        WRITER_ENGINES[writer](csv_spec, lines, output_file)
+    except Exception as e:
+        # a broken file should not stop the conversion of the others
+        error = f"{type(e).__name__}: {e}"
+        return FileConversionResult(input_file, output_file, time.perf_counter() - start, error)
+    return FileConversionResult(input_file, output_file, time.perf_counter() - start)
+
+
+def convert_fwf_files(
+    fwf_spec: FWFSpec,
+    csv_spec: CSVSpec,
+    files: Iterable[Tuple[pathlib.Path, pathlib.Path]],
+    workers: int = 1,
+    parser: str = "text",
+    writer: str = "csv",
+    columns: Optional[List[str]] = None,
+    where: Optional[Where] = None,
+) -> Iterator[FileConversionResult]:
+    """Converts many fixed width files sharing the same spec into CSV files.
+       Files are converted concurrently by a pool of worker processes, a failed file
+       is reported in its result and does not stop the conversion of other files.
+
+    Parameters
+    ----------
+    fwf_spec : FWFSpec
+        Fixed width file spec
+    csv_spec : CSVSpec
+        CSV file spec
+    files : Iterable[Tuple[pathlib.Path, pathlib.Path]]
+        pairs of input fixed width file and output CSV file paths
+    workers : int, optional
+        number of worker processes, files are converted in this process if 1, by default 1
+    parser : str, optional
+        parser engine, see PARSER_ENGINES, by default "text"
+    writer : str, optional
+        writer engine, see WRITER_ENGINES, by default "csv"
+    columns : Optional[List[str]], optional
+        names of projected columns, see parse_fwf_file, by default all columns
+    where : Optional[Dict[str, Callable[[str], bool]]], optional
+        predicates of raw column values, must be picklable, see parse_fwf_file, by default None
+
+    Yields
+    -------
+    Iterator[FileConversionResult]
+        results in the order of completion
+
+    Raises
+    ------
+    ValueError
+        if the number of workers is <= 0 or the parser or writer engine is not found
+    """
+    if workers <= 0:
+        raise ValueError("workers should be > 0")
+    if parser not in PARSER_ENGINES:
+        raise ValueError(f"Parser engine {parser} not found")
+    if writer not in WRITER_ENGINES:
+        raise ValueError(f"Writer engine {writer} not found")
+    tasks = (
+        (fwf_spec, csv_spec, input_file, output_file, parser, writer, columns, where)
+        for input_file, output_file in files
+    )
+    if workers == 1:
+        yield from map(__convert_file, tasks)
+        return
+    # multiprocessing is slow to import, only parallel conversion needs it
+    from multiprocessing import Pool
+
+    with Pool(workers) as pool:
+        yield from pool.imap_unordered(__convert_file, tasks)
+
+
+def checkpoint_path(csv_output_file: pathlib.Path) -> pathlib.Path:
+    """Path of the checkpoint of an incremental conversion, see convert_fwf_file_incremental
+
+    Parameters
+    ----------
+    csv_output_file : pathlib.Path
+        CSV file output path
+
+    Returns
+    -------
+    pathlib.Path
+        CSV file path with CHECKPOINT_FILE_SUFFIX appended
+    """
+    return csv_output_file.with_name(csv_output_file.name + CHECKPOINT_FILE_SUFFIX)
+
+
+def __read_checkpoint(checkpoint_file: pathlib.Path) -> Optional[ConversionCheckpoint]:
+    try:
+        with open(checkpoint_file) as f:
+            return ConversionCheckpoint(**json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def __write_checkpoint(checkpoint_file: pathlib.Path, checkpoint: ConversionCheckpoint) -> None:
+    # write, sync and rename, so a crash never leaves a partial checkpoint
+    tmp_file = checkpoint_file.with_name(checkpoint_file.name + ".tmp")
+    with open(tmp_file, "w") as f:
+        json.dump(dataclasses.asdict(checkpoint), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, checkpoint_file)
+    __fsync_directory(checkpoint_file.parent)
+
+
+def __fsync_directory(directory: pathlib.Path) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        # directories can not be opened on Windows, the rename is durable there
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def __save_checkpoint(
+    checkpoint_file: pathlib.Path,
+    input_file: pathlib.Path,
+    output: BinaryIO,
+    offset: int,
+    records: int,
+) -> None:
+    # CSV rows are on the disk before the checkpoint which refers to them
+    output.flush()
+    os.fsync(output.fileno())
+    head_size = min(offset, DEFAULT_HEAD_SIZE)
+    with open(input_file, "rb") as f:
+        head_crc32 = __head_crc32(f, head_size)
+    checkpoint = ConversionCheckpoint(offset, records, output.tell(), head_size, head_crc32)
+    __write_checkpoint(checkpoint_file, checkpoint)
+
+
+def __head_crc32(f: BinaryIO, head_size: int) -> int:
+    f.seek(0)
+    return zlib.crc32(f.read(head_size))
+
+
+def __is_valid_checkpoint(
+    checkpoint: ConversionCheckpoint, f: BinaryIO, csv_output_file: pathlib.Path
+) -> bool:
+    # a truncated or rewritten file is converted again from the start
+    if os.fstat(f.fileno()).st_size < checkpoint.offset:
+        return False
+    if not csv_output_file.exists() or csv_output_file.stat().st_size < checkpoint.csv_size:
+        return False
+    return __head_crc32(f, checkpoint.head_size) == checkpoint.head_crc32
+
+
+def __whole_lines(f: BinaryIO, block_size: int, final: bool = False) -> Iterator[bytes]:
+    rest = b""
+    while True:
+        data = f.read(block_size)
+        if not data:
+            # an incremental conversion converts the last line when it is complete
+            if final and rest:
+                yield rest
+            return
+        data = rest + data
+        end = data.rfind(b"\n") + 1
+        rest = data[end:]
+        if end:
+            yield data[:end]
+
+
+def convert_fwf_file_incremental(
+    fwf_spec: FWFSpec,
+    csv_spec: CSVSpec,
+    input_file: pathlib.Path,
+    csv_output_file: pathlib.Path,
+    checkpoint_file: Optional[pathlib.Path] = None,
+    columns: Optional[List[str]] = None,
+    where: Optional[Where] = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+) -> int:
+    """Converts records appended to fixed width file since the previous run and appends
+       them to CSV file. The checkpoint stores the byte offset and the number of converted
+       records, the size of CSV file and a fingerprint of the head of fixed width file.
+       The whole file is converted again if there is no valid checkpoint, the file is
+       truncated or its head is rewritten. CSV file is truncated to the checkpoint size,
+       so rows appended by an interrupted run are not duplicated. A last line without
+       a line terminator is left for the next run.
+       A checkpoint is saved after every checkpoint_interval converted bytes, CSV file and
+       checkpoint are synced to the disk first, so a crashed run resumes from the last one.
+
+    Parameters
+    ----------
+    fwf_spec : FWFSpec
+        Fixed width file spec, encoding must be ascii compatible
+    csv_spec : CSVSpec
+        CSV file spec
+    input_file : pathlib.Path
+        path to input file
+    csv_output_file : pathlib.Path
+        CSV file output path
+    checkpoint_file : Optional[pathlib.Path], optional
+        path to checkpoint file, by default see checkpoint_path
+    columns : Optional[List[str]], optional
+        names of projected columns, must be the same in every run, see parse_fwf_file,
+        by default all columns
+    where : Optional[Dict[str, Callable[[str], bool]]], optional
+        predicates of raw column values, must be the same in every run, see parse_fwf_file,
+        by default None
+    block_size : int, optional
+        approximate size of a converted block in bytes, by default DEFAULT_BLOCK_SIZE
+    checkpoint_interval : int, optional
+        number of converted fixed width bytes between checkpoints,
+        by default DEFAULT_CHECKPOINT_INTERVAL
+
+    Returns
+    -------
+    int
+        number of new records
+
+    Raises
+    ------
+    ValueError
+        if the encoding is not ascii compatible or a file is compressed
+    """
+    if not is_ascii_compatible_encoding(fwf_spec.encoding):
+        raise ValueError(f"Encoding {fwf_spec.encoding} is not ascii compatible")
+    if detect_compression(input_file) is not None:
+        raise ValueError(f"Compressed file {input_file} can not be converted incrementally")
+    if compression_from_extension(csv_output_file) is not None:
+        raise ValueError(f"Compressed file {csv_output_file} can not be appended")
+    checkpoint_file = checkpoint_file or checkpoint_path(csv_output_file)
+    output: BinaryIO
+    with open(input_file, "rb") as f:
+        checkpoint = __read_checkpoint(checkpoint_file)
+        if checkpoint is None or not __is_valid_checkpoint(checkpoint, f, csv_output_file):
+            if checkpoint_file.exists():
+                checkpoint_file.unlink()
+            checkpoint = ConversionCheckpoint(0, 0, 0, 0, 0)
+            if csv_output_file.parent:
+                csv_output_file.parent.mkdir(parents=True, exist_ok=True)
+            output = open(csv_output_file, "wb")
+            if csv_spec.header:
+                output.write(__csv_header(csv_spec))
+        else:
+            output = open(csv_output_file, "r+b")
+            output.truncate(checkpoint.csv_size)
+            output.seek(checkpoint.csv_size)
+        offset, records = checkpoint.offset, checkpoint.records
+        with output:
+            f.seek(offset)
+            if offset == 0 and fwf_spec.header:
+                header = f.readline()
+                offset = len(header) if header.endswith(b"\n") else 0
+                f.seek(offset)
+            checkpoint_offset = offset
+            if offset > 0 or not fwf_spec.header:
+                for data in __whole_lines(f, block_size):
+                    # blocks end with a line terminator, so they are decoded independently
+                    lines = __block_lines(fwf_spec, data)
+                    rows = convert_fwf_lines(fwf_spec, csv_spec, lines, columns, where)
+                    # appended rows continue the file, only an empty file gets the signature
+                    if rows and output.tell() == 0:
+                        output.write(encoding_signature(csv_spec.encoding))
+                    output.write(rows)
+                    offset += len(data)
+                    records += data.count(b"\n")
+                    if offset - checkpoint_offset >= checkpoint_interval:
+                        __save_checkpoint(checkpoint_file, input_file, output, offset, records)
+                        checkpoint_offset = offset
+            __save_checkpoint(checkpoint_file, input_file, output, offset, records)
+    return records - checkpoint.records
+
+
+def convert_csv_file(
+    csv_spec: CSVSpec,
+    fwf_spec: FWFSpec,
+    csv_input_file: pathlib.Path,
+    fwf_output_file: pathlib.Path,
+    overflow: str = "error",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> List[FWFOverflow]:
+    """Converts CSV file into fixed width file, the reverse of convert_fwf_files.
+       CSV values are assigned to fixed width columns by position and written in batches,
+       see write_fwf_file.
+
+    Parameters
+    ----------
+    csv_spec : CSVSpec
+        CSV file spec
+    fwf_spec : FWFSpec
+        Fixed width file spec
+    csv_input_file : pathlib.Path
+        CSV file input path
+    fwf_output_file : pathlib.Path
+        Fixed width file output path
+    overflow : str, optional
+        policy of values longer than their column, see write_fwf_file, by default "error"
+    batch_size : int, optional
+        number of rows formatted and written at once, by default DEFAULT_BATCH_SIZE
+
+    Returns
+    -------
+    List[FWFOverflow]
+        truncated values if overflow is report, empty list otherwise
+
+    Raises
+    ------
+    ValueError
+        see write_fwf_file
+    """
+    rows = read_csv_file(csv_spec, csv_input_file)
+    return write_fwf_file(fwf_spec, rows, fwf_output_file, overflow, batch_size)
@@ -1,14 +1,38 @@
 #!/usr/bin/env python3
 
 import argparse
+import contextlib
+import csv
+import dataclasses
+import glob
 import pathlib
 import sys
+from typing import Callable, Dict, List, Optional, Tuple
 
 from exitstatus import ExitStatus
 
-from dck_problem1.csv_file_writer import write_csv_file
-from dck_problem1.fixed_width_file_helper import parse_fwf_file
-from dck_problem1.spec_file_loader import load_csv_spec_file, load_fwf_spec_file
+from dck_problem1.compression_helper import (
+    AUTO,
+    COMPRESSIONS,
+    DEFAULT_BLOCK_SIZE,
+    NONE,
+    compression_from_extension,
+    detect_compression,
+    open_input,
+    open_output,
+)
+from dck_problem1.csv_file_writer import WRITER_ENGINES, write_csv_file
+from dck_problem1.fixed_width_file_helper import (
+    DEFAULT_DICTIONARY_SIZE,
+    PARSER_ENGINES,
+    equals_predicate,
+    parse_fwf_batches,
+    parse_fwf_file,
+)
+from dck_problem1.instrumentation import Instrumentation, ThroughputStats, capture_profile
+from dck_problem1.models import CSVSpec, FWFSpec
+from dck_problem1.spec_file_loader import default_spec_cache_dir, load_spec_file
+from dck_problem1.stream_helper import is_stdio_path, open_stdin, open_stdout
 
 
 def parse_args() -> argparse.Namespace:
@@ -22,28 +46,513 @@ def parse_args() -> argparse.Namespace:
         "--spec_file", type=pathlib.Path, required=True, help="Fixed width and CSV spec file path"
     )
     parser.add_argument(
-        "--fwf_file", type=pathlib.Path, required=True, help="Fixed width data file path"
+        "--spec_cache_dir",
+        type=pathlib.Path,
+        default=default_spec_cache_dir(),
+        help="Directory of validated specs cached by spec file content",
     )
     parser.add_argument(
-        "--csv_file", type=pathlib.Path, required=True, help="Output CSV file path"
+        "--no_spec_cache", action="store_true", help="Validate the spec file on every run"
+    )
+    parser.add_argument(
+        "--fwf_file",
+        type=pathlib.Path,
+        default=None,
+        help="Fixed width data file path, - for stdin, required without --batch",
+    )
+    parser.add_argument(
+        "--csv_file",
+        type=pathlib.Path,
+        default=None,
+        help="Output CSV file path, - for stdout, required without --batch",
+    )
+    parser.add_argument(
+        "--batch",
+        default=None,
+        metavar="SOURCE",
+        help="Convert many fixed width files: a glob pattern, a directory or with --manifest "
+        "a manifest CSV file",
+    )
+    parser.add_argument(
+        "--manifest",
+        action="store_true",
+        help="--batch SOURCE is a manifest CSV file of input,output paths relative to it",
+    )
+    parser.add_argument(
+        "--output_dir",
+        type=pathlib.Path,
+        default=None,
+        help="Output directory of CSV files for a --batch glob pattern or directory",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes, requires a single-byte fixed width encoding or "
+        "WidthUnit bytes if > 1, number of files converted at once with --batch",
+    )
+    parser.add_argument(
+        "--parser",
+        choices=PARSER_ENGINES.keys(),
+        default="text",
+        help="Fixed width parser engine, mmap requires a single-byte fixed width encoding or "
+        "WidthUnit bytes",
+    )
+    parser.add_argument(
+        "--writer",
+        choices=WRITER_ENGINES.keys(),
+        default="csv",
+        help="CSV writer engine",
+    )
+    parser.add_argument(
+        "--output_format",
+        choices=("csv", "columnar"),
+        default="csv",
+        help="Output file format, columnar writes typed columns into a binary file read "
+        "by ColumnarReader, it supports a single file conversion into an uncompressed file",
+    )
+    parser.add_argument(
+        "--fwf_compression",
+        choices=COMPRESSIONS,
+        default=AUTO,
+        help="Fixed width file compression, auto detects it from the extension or content, "
+        "none reads e.g. a plain data.gz file as it is",
+    )
+    parser.add_argument(
+        "--csv_compression",
+        choices=COMPRESSIONS,
+        default=AUTO,
+        help="CSV file compression, auto detects it from the extension, none writes "
+        "a plain file whatever its extension",
+    )
+    parser.add_argument(
+        "--compression_level", type=int, default=None, help="CSV file compression level"
+    )
+    parser.add_argument(
+        "--block_size",
+        type=int,
+        default=DEFAULT_BLOCK_SIZE,
+        help="Size of blocks read from and written to compressed files",
+    )
+    parser.add_argument(
+        "--columns", nargs="+", default=None, help="Names of columns to convert, all by default"
+    )
+    parser.add_argument(
+        "--where",
+        action="append",
+        default=None,
+        metavar="COLUMN=VALUE",
+        help="Convert only lines where the column value equals to VALUE, can be repeated",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Convert only records appended since the previous run and append them to "
+        "the CSV file, the whole file is converted again if it is truncated or rewritten. "
+        "An interrupted run resumes from its last checkpoint, the CSV file is truncated to "
+        "the checkpoint. Supports the text parser and the csv writer only",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Write fsync'd checkpoints pairing fixed width and CSV file offsets, and resume "
+        "an interrupted run from the last one, the CSV file is truncated to the checkpoint. "
+        "A finished conversion is not repeated. Runs the checkpointed conversion of "
+        "--incremental, so it supports uncompressed files, a single worker, the text parser "
+        "and the csv writer only",
+    )
+    parser.add_argument(
+        "--checkpoint_file",
+        type=pathlib.Path,
+        default=None,
+        help="Checkpoint of --incremental or --resume conversion, "
+        "CSV file path + .checkpoint by default",
+    )
+    parser.add_argument(
+        "--checkpoint_interval",
+        type=int,
+        default=None,
+        help="Number of converted fixed width bytes between checkpoints of --incremental or "
+        "--resume conversion, 256 MiB by default",
+    )
+    parser.add_argument(
+        "--transcode",
+        action="store_true",
+        help="Convert large binary blocks and transcode them between the fixed width and CSV "
+        "encodings, ASCII-only blocks are converted without decoding, requires an ascii "
+        "compatible fixed width encoding",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print rows/s, MB/s and time spent in read, decode, slice, strip and write "
+        "to stderr every second, supports the text parser and the csv writer only",
+    )
+    parser.add_argument(
+        "--profile",
+        type=pathlib.Path,
+        default=None,
+        metavar="FILE",
+        help="Profile the conversion with cProfile and dump pstats into FILE, "
+        "worker processes are not profiled",
+    )
+    parser.add_argument(
+        "--profile_memory",
+        action="store_true",
+        help="Trace memory allocations of --profile with tracemalloc and dump the snapshot "
+        "into FILE.tracemalloc",
+    )
+    args = parser.parse_args()
+    if args.profile_memory and args.profile is None:
+        parser.error("--profile_memory requires --profile")
+    try:
+        args.where = __parse_where(args.where)
+    except ValueError as e:
+        parser.error(str(e))
+    # column names are checked before any output file is created
+    cache_dir = None if args.no_spec_cache else args.spec_cache_dir
+    args.fwf_spec, args.csv_spec = load_spec_file(args.spec_file, cache_dir)
+    for option, names in (("--columns", args.columns), ("--where", args.where)):
+        try:
+            args.fwf_spec.select_columns(None if names is None else list(names))
+        except ValueError as e:
+            parser.error(f"{option} {e} in {args.spec_file}")
+    if args.output_format == "columnar" and (
+        args.batch is not None
+        or args.incremental
+        or args.resume
+        or args.transcode
+        or args.stats
+        or args.workers > 1
+    ):
+        parser.error(
+            "--output_format columnar can not be used with --batch, --incremental, --resume, "
+            "--transcode, --stats or --workers > 1"
+        )
+    if args.manifest and args.batch is None:
+        parser.error("--manifest requires --batch")
+    if args.batch is not None:
+        if args.incremental or args.resume or args.stats or args.transcode:
+            parser.error(
+                "--batch can not be used with --incremental, --resume, --stats or --transcode"
+            )
+        if args.fwf_compression != AUTO or args.csv_compression != AUTO:
+            parser.error(
+                "--batch detects compression of every file, it can not be used with "
+                "--fwf_compression or --csv_compression"
+            )
+        if args.fwf_file is not None or args.csv_file is not None:
+            parser.error("--batch can not be used with --fwf_file or --csv_file")
+        try:
+            args.batch_files = __batch_files(args.batch, args.output_dir, args.manifest)
+        except ValueError as e:
+            parser.error(str(e))
+        return args
+    if args.fwf_file is None or args.csv_file is None:
+        parser.error("--fwf_file and --csv_file are required without --batch")
+    fwf_detected = __resolve_compression(AUTO, args.fwf_file, detect_compression)
+    csv_detected = __resolve_compression(AUTO, args.csv_file, compression_from_extension)
+    args.fwf_compression = __resolve_compression(
+        args.fwf_compression, args.fwf_file, lambda _: fwf_detected
+    )
+    args.csv_compression = __resolve_compression(
+        args.csv_compression, args.csv_file, lambda _: csv_detected
+    )
+    # file engines detect compression themselves, so files with a compression other than
+    # the detected one are converted as streams opened with the given compression
+    args.compression_overridden = (args.fwf_compression, args.csv_compression) != (
+        fwf_detected,
+        csv_detected,
+    )
+    if __is_stream_conversion(args) and (args.workers > 1 or args.parser != "text"):
+        parser.error(
+            "stdin, stdout, compressed files and --fwf_compression or --csv_compression "
+            "other than detected support the text parser only"
+        )
+    if args.output_format == "columnar" and (
+        is_stdio_path(args.fwf_file)
+        or is_stdio_path(args.csv_file)
+        or args.csv_compression != NONE
+    ):
+        parser.error("--output_format columnar does not support stdin, stdout or compression")
+    if (args.incremental or args.resume) and (
+        __is_stream_conversion(args)
+        or args.workers > 1
+        or args.parser != "text"
+        or args.writer != "csv"
+    ):
+        parser.error(
+            "--incremental and --resume support uncompressed files, a single worker, "
+            "the text parser and the csv writer only"
+        )
+    if args.transcode and (args.workers > 1 or args.incremental or args.resume):
+        parser.error(
+            "--transcode supports a single worker and can not be used with --incremental "
+            "or --resume"
+        )
+    if args.stats and (
+        args.transcode
+        or __is_stream_conversion(args)
+        or args.workers > 1
+        or args.incremental
+        or args.resume
+        or args.parser != "text"
+        or args.writer != "csv"
+    ):
+        parser.error("--stats supports a single file conversion by the text parser and csv writer")
+    return args
+
+
+def __parse_where(conditions: Optional[List[str]]) -> Optional[Dict[str, Callable[[str], bool]]]:
+    if not conditions:
+        return None
+    where = {}
+    for condition in conditions:
+        name, separator, value = condition.partition("=")
+        if not separator:
+            raise ValueError(f"--where condition {condition} should be COLUMN=VALUE")
+        where[name] = equals_predicate(value)
+    return where
+
+
+def __batch_files(
+    source: str, output_dir: Optional[pathlib.Path], manifest: bool
+) -> List[Tuple[pathlib.Path, pathlib.Path]]:
+    source_path = pathlib.Path(source)
+    # a fixed width file matched by the pattern is never read as a manifest
+    if manifest:
+        if output_dir is not None:
+            raise ValueError("--output_dir can not be used with --manifest")
+        return __read_manifest(source_path)
+    if output_dir is None:
+        raise ValueError("--output_dir is required for a --batch glob pattern or directory")
+    if source_path.is_dir():
+        input_files = sorted(path for path in source_path.iterdir() if path.is_file())
+    else:
+        input_files = sorted(pathlib.Path(path) for path in glob.glob(source))
+    if not input_files:
+        raise ValueError(f"No fixed width files found for --batch {source}")
+    files = []
+    output_files = set()
+    for input_file in input_files:
+        # data.txt.gz -> data.csv
+        name = input_file.with_suffix("") if compression_from_extension(input_file) else input_file
+        output_file = output_dir / (pathlib.Path(name.name).stem + ".csv")
+        if output_file in output_files:
+            raise ValueError(f"Several input files are converted into {output_file}")
+        output_files.add(output_file)
+        files.append((input_file, output_file))
+    return files
+
+
+def __read_manifest(manifest: pathlib.Path) -> List[Tuple[pathlib.Path, pathlib.Path]]:
+    with open(manifest, newline="") as f:
+        rows = [row for row in csv.reader(f) if row]
+    files = []
+    for row in rows:
+        if len(row) != 2:
+            raise ValueError(f"Manifest {manifest} rows should be input,output paths")
+        input_file, output_file = (manifest.parent / path.strip() for path in row)
+        files.append((input_file, output_file))
+    return files
+
+
+def __resolve_compression(
+    compression: str, path: pathlib.Path, detect: Callable[[pathlib.Path], Optional[str]]
+) -> str:
+    if is_stdio_path(path):
+        return NONE
+    if compression == AUTO:
+        return detect(path) or NONE
+    return compression
+
+
+def __is_stream_conversion(args: argparse.Namespace) -> bool:
+    return (
+        is_stdio_path(args.fwf_file)
+        or is_stdio_path(args.csv_file)
+        or args.fwf_compression != NONE
+        or args.csv_compression != NONE
+        or args.compression_overridden
     )
-    return parser.parse_args()
 
 
 def main() -> ExitStatus:
-    """Accept arguments from the user, compute generate CSV file, and display the results."""
+    """Accept arguments from the user, compute generate CSV file, and display the results.
+    Modules needed by streams and multiple workers only are imported on demand to keep
+    the startup of a single file conversion short."""
     args = parse_args()
+    profile = (
+        contextlib.nullcontext()
+        if args.profile is None
+        else capture_profile(args.profile, args.profile_memory)
+    )
+    with profile:
+        return __convert(args)
+
 
-    fwf_spec = load_fwf_spec_file(args.spec_file)
-    csv_spec = load_csv_spec_file(args.spec_file)
-    lines = parse_fwf_file(fwf_spec, args.fwf_file)
-    write_csv_file(csv_spec, lines, args.csv_file)
+def __convert(args: argparse.Namespace) -> ExitStatus:
+    fwf_spec = args.fwf_spec
+    csv_spec = __project_csv_spec(fwf_spec, args.csv_spec, args.columns)
+    if args.batch is not None:
+        return __convert_batch(fwf_spec, csv_spec, args)
+    if args.incremental or args.resume:
+        # an interrupted conversion resumes from its last checkpoint
+        from dck_problem1.converter import (
+            DEFAULT_CHECKPOINT_INTERVAL,
+            convert_fwf_file_incremental,
+        )
 
-    print(f"CSV file is generated : {args.csv_file}")
+        new_records = convert_fwf_file_incremental(
+            fwf_spec,
+            csv_spec,
+            args.fwf_file,
+            args.csv_file,
+            args.checkpoint_file,
+            columns=args.columns,
+            where=args.where,
+            checkpoint_interval=args.checkpoint_interval or DEFAULT_CHECKPOINT_INTERVAL,
+        )
+        if args.incremental:
+            print(f"CSV file is updated : {args.csv_file}, {new_records} new records")
+        else:
+            print(f"CSV file is generated : {args.csv_file}, {new_records} records converted")
+        return ExitStatus.success
+    if args.output_format == "columnar":
+        from dck_problem1.columnar_file_helper import write_columnar_file
+
+        # low-cardinality columns are parsed once per distinct value and stored as codes
+        batches = parse_fwf_batches(
+            fwf_spec,
+            args.fwf_file,
+            typed=True,
+            columns=args.columns,
+            where=args.where,
+            dictionary_size=DEFAULT_DICTIONARY_SIZE,
+        )
+        write_columnar_file(fwf_spec, batches, args.csv_file, args.columns)
+        print(f"Columnar file is generated : {args.csv_file}")
+        return ExitStatus.success
+    if __is_stream_conversion(args) or args.transcode:
+        __convert_streams(fwf_spec, csv_spec, args)
+    elif args.workers > 1:
+        from dck_problem1.converter import convert_fwf_file_parallel
+
+        convert_fwf_file_parallel(
+            fwf_spec,
+            csv_spec,
+            args.fwf_file,
+            args.csv_file,
+            args.workers,
+            columns=args.columns,
+            where=args.where,
+        )
+    elif args.stats:
+        instrumentation = Instrumentation(__print_stats)
+        lines = parse_fwf_file(
+            fwf_spec,
+            args.fwf_file,
+            columns=args.columns,
+            where=args.where,
+            instrumentation=instrumentation,
+        )
+        write_csv_file(csv_spec, lines, args.csv_file, instrumentation)
+        instrumentation.finish()
+    else:
+        lines = PARSER_ENGINES[args.parser](
+            fwf_spec, args.fwf_file, columns=args.columns, where=args.where
+        )
+        WRITER_ENGINES[args.writer](csv_spec, lines, args.csv_file)
+
+    # keep stdout clean when it is used for CSV output
+    output = sys.stderr if is_stdio_path(args.csv_file) else sys.stdout
+    print(f"CSV file is generated : {args.csv_file}", file=output)
 
     return ExitStatus.success
 
 
+def __print_stats(stats: ThroughputStats) -> None:
+    print(stats.format(), file=sys.stderr)
+
+
+def __convert_streams(fwf_spec: FWFSpec, csv_spec: CSVSpec, args: argparse.Namespace) -> None:
+    from dck_problem1.converter import convert_fwf_stream, transcode_fwf_stream
+
+    with contextlib.ExitStack() as stack:
+        if is_stdio_path(args.fwf_file):
+            input_stream = open_stdin()
+        else:
+            input_stream = stack.enter_context(
+                open_input(args.fwf_file, args.fwf_compression, args.block_size)
+            )
+        if is_stdio_path(args.csv_file):
+            output_stream = open_stdout()
+        else:
+            output_stream = stack.enter_context(
+                open_output(
+                    args.csv_file, args.csv_compression, args.compression_level, args.block_size
+                )
+            )
+        if args.transcode:
+            transcode_fwf_stream(
+                fwf_spec,
+                csv_spec,
+                input_stream,
+                output_stream,
+                columns=args.columns,
+                where=args.where,
+            )
+        else:
+            convert_fwf_stream(
+                fwf_spec,
+                csv_spec,
+                input_stream,
+                output_stream,
+                columns=args.columns,
+                where=args.where,
+            )
+
+
+def __convert_batch(fwf_spec: FWFSpec, csv_spec: CSVSpec, args: argparse.Namespace) -> ExitStatus:
+    from dck_problem1.converter import convert_fwf_files
+
+    results = convert_fwf_files(
+        fwf_spec,
+        csv_spec,
+        args.batch_files,
+        args.workers,
+        args.parser,
+        args.writer,
+        args.columns,
+        args.where,
+    )
+    total, failed = len(args.batch_files), 0
+    for done, result in enumerate(results, 1):
+        if result.error is None:
+            print(
+                f"[{done}/{total}] {result.input_file} -> {result.output_file} "
+                f"({result.seconds:.2f} s)"
+            )
+        else:
+            failed += 1
+            print(f"[{done}/{total}] FAILED {result.input_file} : {result.error}", file=sys.stderr)
+    print(f"CSV files are generated : {total - failed} of {total}")
+    return ExitStatus.failure if failed else ExitStatus.success
+
+
+def __project_csv_spec(
+    fwf_spec: FWFSpec, csv_spec: CSVSpec, columns: Optional[List[str]]
+) -> CSVSpec:
+    if columns is None:
+        return csv_spec
+    # CSV columns are in the same order as fixed width columns
+    indexes = {col.name: i for i, col in enumerate(fwf_spec.columns)}
+    column_names = [
+        csv_spec.column_names[indexes[col.name]] for col in fwf_spec.select_columns(columns)
+    ]
+    return dataclasses.replace(csv_spec, column_names=column_names)
+
+
 # Allow the script to be run standalone (useful during development in PyCharm).
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,29 @@
+import csv
+import pathlib
+from typing import Iterator, List
+
+from dck_problem1.compression_helper import open_text_input
+from dck_problem1.models import CSVSpec
+
+
+def read_csv_file(spec: CSVSpec, csv_input_file: pathlib.Path) -> Iterator[List[str]]:
+    """Reads rows of CSV file written according to spec, see write_csv_file.
+       Skips first line if spec.header is True and empty lines.
+
+    Parameters
+    ----------
+    spec : CSVSpec
+         CSV file spec
+    csv_input_file : pathlib.Path
+        CSV file input path, compression is detected from the extension or the content
+
+    Yields
+    -------
+    Iterator[List[str]]
+        rows of string values
+    """
+    with open_text_input(csv_input_file, spec.encoding) as f:
+        reader = csv.reader(f, delimiter=spec.delimiter, quotechar=spec.quotechar)
+        if spec.header:
+            next(reader, None)
+        yield from filter(None, reader)
@@ -1,27 +1,232 @@
+import codecs
 import csv
+import io
+from itertools import chain, islice
 import pathlib
-from typing import Any, Iterator
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+)
 
+from dck_problem1.compression_helper import open_output, open_text_output
+from dck_problem1.instrumentation import Instrumentation, timed
 from dck_problem1.models import CSVSpec
 
+DEFAULT_BATCH_SIZE = 10_000
 
-def write_csv_file(spec: CSVSpec, lines: Iterator[Iterator[Any]], csv_output_file: pathlib.Path):
+
+def write_csv_file(
+    spec: CSVSpec,
+    lines: Iterable[Iterable[Any]],
+    csv_output_file: pathlib.Path,
+    instrumentation: Optional[Instrumentation] = None,
+):
     """Writes lines into CSV file
 
     Parameters
     ----------
     spec : CSVSpec
          CSV file spec
-    lines : Iterator[Iterator[Any]]
+    lines : Iterable[Iterable[Any]]
         lines iterator
     csv_output_file : pathlib.Path
         CSV file output path
+    instrumentation : Optional[Instrumentation], optional
+        counts written lines and bytes and times write stage, lines are formatted and
+        written in batches then, by default None
     """
     if csv_output_file.parent:
         csv_output_file.parent.mkdir(parents=True, exist_ok=True)
 
-    with open(csv_output_file, "w", newline="", encoding=spec.encoding) as f:
-        writer = csv.writer(f, delimiter=spec.delimiter, quotechar=spec.quotechar)
+    if instrumentation is not None:
+        __write_csv_file_instrumented(spec, lines, csv_output_file, instrumentation)
+        return
+    with open_text_output(csv_output_file, spec.encoding) as f:
+        writer = create_csv_writer(spec, f)
         if spec.header:
             writer.writerow(spec.column_names)
         writer.writerows(lines)
+
+
+def __write_csv_file_instrumented(
+    spec: CSVSpec,
+    lines: Iterable[Iterable[Any]],
+    csv_output_file: pathlib.Path,
+    instrumentation: Instrumentation,
+) -> None:
+    # batches are formatted in memory, so the size of written bytes is known
+    buffer = io.StringIO(newline="")
+    writer = create_csv_writer(spec, buffer)
+    encoder = codecs.getincrementalencoder(spec.encoding)()
+    if spec.header:
+        writer.writerow(spec.column_names)
+    rows = iter(lines)
+    with open_output(csv_output_file) as f:
+        while True:
+            # rows are produced outside of the write stage, e.g. by the parser
+            batch = list(islice(rows, DEFAULT_BATCH_SIZE))
+            with timed(instrumentation, "write"):
+                writer.writerows(batch)
+                data = encoder.encode(buffer.getvalue())
+                buffer.seek(0)
+                buffer.truncate()
+                f.write(data)
+            instrumentation.add_written(len(batch), len(data))
+            if not batch:
+                break
+
+
+def create_csv_writer(spec: CSVSpec, f: TextIO) -> Any:
+    """Creates csv writer configured according to spec
+
+    Parameters
+    ----------
+    spec : CSVSpec
+         CSV file spec
+    f : TextIO
+        text stream opened with newline=""
+
+    Returns
+    -------
+    csv writer
+    """
+    return csv.writer(f, delimiter=spec.delimiter, quotechar=spec.quotechar)
+
+
+def write_csv_file_fast(
+    spec: CSVSpec,
+    lines: Iterable[Iterable[Any]],
+    csv_output_file: pathlib.Path,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+):
+    """Writes lines into CSV file. Output is the same as produced by write_csv_file.
+       Batches of string values without delimiter, quotechar and new lines are written
+       by joining the values, other batches are written by csv module.
+
+    Parameters
+    ----------
+    spec : CSVSpec
+         CSV file spec
+    lines : Iterable[Iterable[Any]]
+        lines iterator
+    csv_output_file : pathlib.Path
+        CSV file output path
+    batch_size : int, optional
+        number of lines checked and written at once, by default DEFAULT_BATCH_SIZE
+
+    Raises
+    ------
+    ValueError
+        if the batch size is <= 0
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size should be > 0")
+    if csv_output_file.parent:
+        csv_output_file.parent.mkdir(parents=True, exist_ok=True)
+
+    with open_text_output(csv_output_file, spec.encoding) as f:
+        write_csv_stream(spec, lines, f, batch_size)
+
+
+def write_csv_stream(
+    spec: CSVSpec,
+    lines: Iterable[Iterable[Any]],
+    f: TextIO,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+):
+    """Writes lines into text stream, see write_csv_file_fast
+
+    Parameters
+    ----------
+    spec : CSVSpec
+         CSV file spec
+    lines : Iterable[Iterable[Any]]
+        lines iterator
+    f : TextIO
+        text stream opened with newline=""
+    batch_size : int, optional
+        number of lines checked and written at once, by default DEFAULT_BATCH_SIZE
+    """
+    special_chars = __special_chars(spec)
+    writer = create_csv_writer(spec, f)
+    if spec.header:
+        writer.writerow(spec.column_names)
+    rows = iter(lines)
+    while True:
+        batch = [tuple(row) for row in islice(rows, batch_size)]
+        if not batch:
+            break
+        __write_batch(f, writer, batch, special_chars)
+
+
+def write_csv_batches(
+    spec: CSVSpec, batches: Iterable[Sequence[Sequence[Any]]], csv_output_file: pathlib.Path
+):
+    """Writes blocks of columns into CSV file, see parse_fwf_batches.
+       Uses the same fast path as write_csv_file_fast.
+
+    Parameters
+    ----------
+    spec : CSVSpec
+         CSV file spec
+    batches : Iterable[Sequence[Sequence[Any]]]
+        blocks iterator. Every block is a list of columns of the same length
+    csv_output_file : pathlib.Path
+        CSV file output path
+    """
+    if csv_output_file.parent:
+        csv_output_file.parent.mkdir(parents=True, exist_ok=True)
+
+    special_chars = __special_chars(spec)
+    with open_text_output(csv_output_file, spec.encoding) as f:
+        writer = create_csv_writer(spec, f)
+        if spec.header:
+            writer.writerow(spec.column_names)
+        for columns in batches:
+            __write_batch(f, writer, list(zip(*columns)), special_chars)
+
+
+def __special_chars(spec: CSVSpec) -> FrozenSet[str]:
+    return frozenset((spec.delimiter, spec.quotechar, "\r", "\n"))
+
+
+def __write_batch(
+    f: TextIO, writer: Any, batch: List[Tuple[Any, ...]], special_chars: FrozenSet[str]
+) -> None:
+    if __is_plain_batch(batch, special_chars):
+        __write_plain_batch(f, batch, writer.dialect.delimiter, writer.dialect.lineterminator)
+    else:
+        writer.writerows(batch)
+
+
+def __is_plain_batch(batch: List[Tuple[Any, ...]], special_chars: FrozenSet[str]) -> bool:
+    try:
+        text = "".join(chain.from_iterable(batch))
+    except TypeError:
+        # not a string value, csv module knows how to format it
+        return False
+    if any(char in text for char in special_chars):
+        return False
+    # csv module quotes a single empty value to distinguish it from an empty line
+    return all(len(row) != 1 or row[0] for row in batch)
+
+
+def __write_plain_batch(
+    f: TextIO, batch: List[Tuple[str, ...]], delimiter: str, lineterminator: str
+) -> None:
+    f.write(lineterminator.join(map(delimiter.join, batch)))
+    f.write(lineterminator)
+
+
+WRITER_ENGINES: Dict[str, Callable[[CSVSpec, Iterable[Iterable[Any]], pathlib.Path], None]] = {
+    "csv": write_csv_file,
+    "fast": write_csv_file_fast,
+}
@@ -0,0 +1,83 @@
+import codecs
+import importlib
+import string
+from typing import Optional
+
+# marks bytes without a character in charmap decoding tables
+UNDEFINED_CHAR = "\ufffe"
+
+
+def single_byte_decoding_table(encoding: str) -> Optional[str]:
+    """Returns the decoding table of a single-byte encoding, see codecs.charmap_decode
+
+    Args:
+        encoding (str): encoding name
+
+    Returns:
+        Optional[str]: 256 characters, the character of byte b is at index b,
+            UNDEFINED_CHAR for bytes without a character. None for other encodings
+    """
+    name = codecs.lookup(encoding).name
+    if name == "ascii":
+        return "".join(map(chr, range(128))) + UNDEFINED_CHAR * 128
+    if name == "iso8859-1":
+        return "".join(map(chr, range(256)))
+    try:
+        module = importlib.import_module(f"encodings.{name.replace('-', '_')}")
+    except ImportError:
+        return None
+    # charmap codecs are generated with a 256 entries decoding table
+    return getattr(module, "decoding_table", None)
+
+
+def is_single_byte_encoding(encoding: str) -> bool:
+    """Checks if every character of the encoding is stored in exactly one byte
+
+    Args:
+        encoding (str): encoding name
+
+    Returns:
+        bool: True for ascii, latin-1 and charmap based encodings like windows-1252
+    """
+    return single_byte_decoding_table(encoding) is not None
+
+
+def is_ascii_compatible_encoding(encoding: str) -> bool:
+    """Checks if ascii text is stored in the encoding as plain ascii bytes
+
+    Args:
+        encoding (str): encoding name
+
+    Returns:
+        bool: True for encodings like utf-8 or windows-1252, False for utf-16
+    """
+    sample = string.printable
+    return sample.encode(encoding) == sample.encode("ascii")
+
+
+def encoding_signature(encoding: str) -> bytes:
+    """Returns the byte order mark or signature written at the start of encoded text
+
+    Args:
+        encoding (str): encoding name
+
+    Returns:
+        bytes: e.g. the byte order mark of utf-16 or utf-8-sig, empty for most encodings
+    """
+    return "".encode(encoding)
+
+
+def encode_without_signature(text: str, encoding: str) -> bytes:
+    """Encodes text without the signature, see encoding_signature. Parts of a file encoded
+       on their own are joined this way, the signature is written once at the start.
+
+    Args:
+        text (str): text
+        encoding (str): encoding name
+
+    Returns:
+        bytes: encoded text
+    """
+    data = text.encode(encoding)
+    signature = encoding_signature(encoding)
+    return data[len(signature) :] if signature and data.startswith(signature) else data
@@ -1,9 +1,72 @@
-from itertools import chain
+from array import array
+import codecs
+import collections.abc
+import dataclasses
+import functools
+import io
+from itertools import chain, islice
+import mmap
+import os
 import pathlib
-from typing import Any, Callable, Iterator
+import random
+import struct
+import sys
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
+from dck_problem1.compression_helper import (
+    compression_from_extension,
+    detect_compression,
+    open_input,
+    open_output,
+    open_text_input,
+    open_text_output,
+)
+from dck_problem1.encoding_helper import is_ascii_compatible_encoding, is_single_byte_encoding
+from dck_problem1.instrumentation import Instrumentation, timed
 from dck_problem1.models import FWFColumnSpec, FWFSpec
-from dck_problem1.random_values_generator import rnd_fwf_value
+from dck_problem1.random_values_generator import (
+    rnd_digit_bytes,
+    rnd_fwf_value,
+    rnd_lowercase_bytes,
+)
+from dck_problem1.value_converters import fwf_value_converters
+
+DEFAULT_BATCH_SIZE = 10_000
+DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024
+DEFAULT_SHARD_LINES = 1_000_000
+DEFAULT_INDEX_STEP = 1024
+# max number of distinct values of an interned column, see parse_fwf_file
+DEFAULT_DICTIONARY_SIZE = 1024
+INDEX_FILE_SUFFIX = ".idx"
+KEY_INDEX_FILE_SUFFIX = ".keyidx"
+__BULK_DTYPES = ("str", "int", "decimal", "fixed")
+# magic, file size, file mtime in ns, key size, number of entries
+__KEY_INDEX_HEADER = struct.Struct("<8sQqQQ")
+__KEY_INDEX_MAGIC = b"FWFKEY01"
+__RECORD_NUMBER = struct.Struct("<Q")
+# values longer than their column raise an error, are truncated or truncated and reported
+OVERFLOW_POLICIES = ("error", "truncate", "report")
+
+
+@dataclasses.dataclass
+class FWFOverflow:
+    """Value longer than its column, see write_fwf_file"""
+
+    # number of the record, starts with 0 and does not count the header
+    record: int
+    column: str
+    value: str
 
 
 def __create_fwf_header(spec: FWFSpec) -> str:
@@ -62,6 +125,7 @@ def generate_fwf_file(
     number_of_lines: int,
     output_file: pathlib.Path,
     rnd_value_generator: Callable[[FWFColumnSpec], str] = rnd_fwf_value,
+    instrumentation: Optional[Instrumentation] = None,
 ) -> None:
     """Generates fixed width file.
 
@@ -75,18 +139,359 @@ def generate_fwf_file(
         path to output file
     rnd_value_generator : Callable[[FWFColumnSpec], str], optional
         generator to create random values for cell, by default rnd_fwf_value
+    instrumentation : Optional[Instrumentation], optional
+        counts written lines and bytes and times generate and write stages, lines are
+        generated and written in blocks then, by default None
     """
     if output_file.parent:
         output_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_file, "w", 1024, encoding=spec.encoding, newline="") as f:
-        lines = generate_fwf_lines(spec, number_of_lines, rnd_value_generator)
+    lines = generate_fwf_lines(spec, number_of_lines, rnd_value_generator)
+    if instrumentation is not None:
+        __write_fwf_lines_instrumented(spec, lines, output_file, instrumentation)
+        return
+    with open_text_output(output_file, spec.encoding) as f:
         f.writelines((line + "\n" for line in lines))
 
 
+def __write_fwf_lines_instrumented(
+    spec: FWFSpec,
+    lines: Iterator[str],
+    output_file: pathlib.Path,
+    instrumentation: Instrumentation,
+) -> None:
+    # incremental encoder writes a BOM only once for encodings like utf-16
+    encoder = codecs.getincrementalencoder(spec.encoding)()
+    with open_output(output_file) as f:
+        while True:
+            with timed(instrumentation, "generate"):
+                batch = list(islice(lines, DEFAULT_BATCH_SIZE))
+            if not batch:
+                break
+            with timed(instrumentation, "write"):
+                data = encoder.encode("".join(line + "\n" for line in batch))
+                f.write(data)
+            instrumentation.add_written(len(batch), len(data))
+
+
+def generate_fwf_file_bulk(
+    spec: FWFSpec,
+    number_of_lines: int,
+    output_file: pathlib.Path,
+    seed: Optional[int] = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> None:
+    """Generates fixed width file with random values in blocks of lines.
+       Random bytes are drawn in bulk and mapped to lowercase letters or digits.
+
+    Parameters
+    ----------
+    spec : FWFSpec
+        Fixed Width File spec
+    number_of_lines : int
+        number of lines to generate
+    output_file : pathlib.Path
+        path to output file
+    seed : Optional[int], optional
+        random generator seed, the same seed generates the same file, by default None
+    block_size : int, optional
+        approximate size of a block of lines in bytes, by default DEFAULT_BLOCK_SIZE
+
+    Raises
+    ------
+    ValueError
+        if the number of lines is <= 0 or a column dtype is not supported, date columns are
+        not supported
+    """
+    if number_of_lines <= 0:
+        raise ValueError("number_of_lines should be > 0")
+    __check_bulk_dtypes(spec)
+    if output_file.parent:
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+
+    generator = random.Random(seed)
+    # incremental encoder writes a BOM only once for encodings like utf-16
+    encoder = codecs.getincrementalencoder(spec.encoding)()
+    ascii_compatible = is_ascii_compatible_encoding(spec.encoding)
+    with open_output(output_file, block_size=block_size) as f:
+        if spec.header:
+            f.write(encoder.encode(__create_fwf_header(spec) + "\n"))
+        for block in __generate_fwf_blocks(spec, number_of_lines, generator, block_size):
+            f.write(block if ascii_compatible else encoder.encode(block.decode("ascii")))
+
+
+def generate_fwf_file_parallel(
+    spec: FWFSpec,
+    number_of_lines: int,
+    output_file: pathlib.Path,
+    workers: int,
+    seed: Optional[int] = None,
+    shard_lines: int = DEFAULT_SHARD_LINES,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> None:
+    """Generates fixed width file with random values using multiple processes.
+       Lines are split into shards, every shard is generated from a seed derived from
+       the seed and the shard index and written at its own offset of the file.
+       The same seed and shard_lines generate the same file for any number of workers.
+
+    Parameters
+    ----------
+    spec : FWFSpec
+        Fixed Width File spec, encoding must be ascii compatible
+    number_of_lines : int
+        number of lines to generate
+    output_file : pathlib.Path
+        path to output file
+    workers : int
+        number of worker processes
+    seed : Optional[int], optional
+        random generator seed, by default None
+    shard_lines : int, optional
+        number of lines in a shard, by default DEFAULT_SHARD_LINES
+    block_size : int, optional
+        approximate size of a block of lines in bytes, by default DEFAULT_BLOCK_SIZE
+
+    Raises
+    ------
+    ValueError
+        if the number of lines, workers or shard lines is <= 0, a column dtype is not supported,
+        the encoding is not ascii compatible or the output file is compressed
+    """
+    if number_of_lines <= 0:
+        raise ValueError("number_of_lines should be > 0")
+    if workers <= 0:
+        raise ValueError("workers should be > 0")
+    if shard_lines <= 0:
+        raise ValueError("shard_lines should be > 0")
+    if not is_ascii_compatible_encoding(spec.encoding):
+        raise ValueError(f"Encoding {spec.encoding} is not ascii compatible")
+    if compression_from_extension(output_file) is not None:
+        raise ValueError(f"Compressed file {output_file} can not be written in parallel")
+    __check_bulk_dtypes(spec)
+    if output_file.parent:
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+
+    if seed is None:
+        seed = random.getrandbits(64)
+    header = (__create_fwf_header(spec) + "\n").encode(spec.encoding) if spec.header else b""
+    line_size = spec.record_length + 1
+    # every line has the same size, so the file is preallocated and shards know their offsets
+    with open(output_file, "wb") as f:
+        f.write(header)
+        f.truncate(len(header) + number_of_lines * line_size)
+    tasks = [
+        (
+            spec,
+            output_file,
+            len(header) + start * line_size,
+            min(shard_lines, number_of_lines - start),
+            f"{seed}:{shard}",
+            block_size,
+        )
+        for shard, start in enumerate(range(0, number_of_lines, shard_lines))
+    ]
+    # multiprocessing is slow to import, only parallel generation needs it
+    from multiprocessing import Pool
+
+    with Pool(workers) as pool:
+        for _ in pool.imap_unordered(__generate_shard, tasks):
+            pass
+
+
+def __generate_shard(task: Tuple[FWFSpec, pathlib.Path, int, int, str, int]) -> None:
+    spec, output_file, offset, number_of_lines, seed, block_size = task
+    generator = random.Random(seed)
+    with open(output_file, "r+b") as f:
+        f.seek(offset)
+        for block in __generate_fwf_blocks(spec, number_of_lines, generator, block_size):
+            f.write(block)
+
+
+def __generate_fwf_blocks(
+    spec: FWFSpec, number_of_lines: int, generator: random.Random, block_size: int
+) -> Iterator[bytearray]:
+    # a line starts as record_length random letters, numeric columns get random digits
+    line_size = spec.record_length + 1
+    lines_per_block = max(1, block_size // line_size)
+    numeric_columns = [col for col in spec.columns if col.dtype != "str"]
+    for start in range(0, number_of_lines, lines_per_block):
+        lines = min(lines_per_block, number_of_lines - start)
+        block = rnd_lowercase_bytes(generator, lines * line_size)
+        for col in numeric_columns:
+            for position in range(col.offset, col.offset + col.length):
+                block[position::line_size] = rnd_digit_bytes(generator, lines)
+            if col.dtype == "decimal" and col.scale:
+                block[col.offset + col.length - col.scale - 1 :: line_size] = b"." * lines
+        block[spec.record_length :: line_size] = b"\n" * lines
+        yield block
+
+
+def __check_bulk_dtypes(spec: FWFSpec) -> None:
+    for col in spec.columns:
+        if col.dtype not in __BULK_DTYPES:
+            raise ValueError(
+                f"Datatype {col.dtype} of column {col.name} is not supported by bulk "
+                f"generation, supported datatypes are {', '.join(__BULK_DTYPES)}"
+            )
+
+
+def __zero_pad(value: str, length: int) -> str:
+    # empty values are blank like empty int values, so they are read back as None
+    return value.zfill(length) if value else " " * length
+
+
+# values are padded like generated ones: str and date left aligned, numbers right aligned
+__PAD_BY_TYPE: Dict[str, Callable[[str, int], str]] = {
+    "str": str.ljust,
+    "int": str.rjust,
+    "decimal": str.rjust,
+    "date": str.ljust,
+    "fixed": __zero_pad,
+}
+
+
+def write_fwf_file(
+    spec: FWFSpec,
+    rows: Iterable[Sequence[str]],
+    output_file: pathlib.Path,
+    overflow: str = "error",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> List[FWFOverflow]:
+    """Writes rows of string values into fixed width file, e.g. rows read from CSV file.
+       Values are padded to the length of their column, str and date values are left
+       aligned, int and decimal values are right aligned and fixed values are padded with
+       zeros, empty fixed values with spaces. Rows are formatted and encoded in batches and
+       every batch is written at once. Lengths are counted in bytes of encoded values if
+       spec.byte_widths.
+
+    Parameters
+    ----------
+    spec : FWFSpec
+        Fixed Width File spec, values are written in the order of the columns
+    rows : Iterable[Sequence[str]]
+        rows iterator, every row has a value for every column
+    output_file : pathlib.Path
+        path to output file
+    overflow : str, optional
+        policy of values longer than their column, see OVERFLOW_POLICIES: error raises
+        ValueError, truncate keeps the leading characters and report truncates the value
+        and returns it, by default "error"
+    batch_size : int, optional
+        number of rows formatted and written at once, by default DEFAULT_BATCH_SIZE
+
+    Returns
+    -------
+    List[FWFOverflow]
+        truncated values if overflow is report, empty list otherwise
+
+    Raises
+    ------
+    ValueError
+        if the overflow policy, a column dtype or the batch size is not valid, a row has
+        a wrong number of values, a value contains a line terminator or a value is longer
+        than its column and overflow is error
+    """
+    if overflow not in OVERFLOW_POLICIES:
+        raise ValueError(f"Unexpected overflow policy {overflow}")
+    if batch_size <= 0:
+        raise ValueError("batch_size should be > 0")
+    for col in spec.columns:
+        if col.dtype not in __PAD_BY_TYPE:
+            raise ValueError(f"Unexpected datatype {col.dtype} for column {col.name}")
+    if output_file.parent:
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+
+    overflows: List[FWFOverflow] = []
+    pads = [(__PAD_BY_TYPE[col.dtype], col.length) for col in spec.columns]
+    line_length = sum(col.length for col in spec.columns)
+    # incremental encoder writes a BOM only once for encodings like utf-16
+    encoder = codecs.getincrementalencoder(spec.encoding)()
+    records = iter(rows)
+    record = 0
+    with open_output(output_file) as f:
+        if spec.header:
+            f.write(encoder.encode(__create_fwf_header(spec) + "\n"))
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            lines = []
+            for row in batch:
+                line = "".join([pad(value, length) for (pad, length), value in zip(pads, row)])
+                # a longer line or a multi-byte character of byte widths needs a closer look
+                if (
+                    len(line) != line_length
+                    or len(row) != len(pads)
+                    or spec.byte_widths
+                    and not line.isascii()
+                ):
+                    line = __format_fwf_record(spec, row, record, overflow, overflows)
+                lines.append(line)
+                record += 1
+            block = "\n".join(lines) + "\n"
+            if block.count("\n") != len(lines) or "\r" in block:
+                __check_line_terminators(lines, record - len(lines))
+            f.write(encoder.encode(block))
+    return overflows
+
+
+def __format_fwf_record(
+    spec: FWFSpec,
+    row: Sequence[str],
+    record: int,
+    overflow: str,
+    overflows: List[FWFOverflow],
+) -> str:
+    if len(row) != len(spec.columns):
+        raise ValueError(
+            f"Record {record} has {len(row)} values, expected {len(spec.columns)} values"
+        )
+    encoding = spec.encoding if spec.byte_widths else None
+    values = []
+    for col, value in zip(spec.columns, row):
+        width = __value_width(value, encoding)
+        if width > col.length:
+            if overflow == "error":
+                raise ValueError(
+                    f"Value {value!r} of column {col.name} in record {record} is longer "
+                    f"than {col.length}"
+                )
+            if overflow == "report":
+                overflows.append(FWFOverflow(record, col.name, value))
+            value = __truncate_value(value, col.length, encoding)
+            width = __value_width(value, encoding)
+        # padding is counted in characters, multi-byte characters of byte widths need less
+        values.append(__PAD_BY_TYPE[col.dtype](value, len(value) + col.length - width))
+    return "".join(values)
+
+
+def __value_width(value: str, encoding: Optional[str]) -> int:
+    if encoding is None or value.isascii():
+        return len(value)
+    return len(value.encode(encoding))
+
+
+def __truncate_value(value: str, length: int, encoding: Optional[str]) -> str:
+    if encoding is None:
+        return value[:length]
+    # a multi-byte character cut by the byte length is dropped
+    return value.encode(encoding)[:length].decode(encoding, "ignore")
+
+
+def __check_line_terminators(lines: List[str], first_record: int) -> None:
+    for record, line in enumerate(lines, first_record):
+        if "\n" in line or "\r" in line:
+            raise ValueError(f"Record {record} contains a line terminator")
+
+
 def parse_fwf_file(
     spec: FWFSpec,
     input_file: pathlib.Path,
-) -> Iterator[Iterator[Any]]:
+    typed: bool = False,
+    columns: Optional[List[str]] = None,
+    where: Optional[Dict[str, Callable[[str], bool]]] = None,
+    instrumentation: Optional[Instrumentation] = None,
+    dictionary_size: Optional[int] = None,
+) -> Iterator[Iterable[Any]]:
     """Parses fixed width file. Skips first line if spec.header is True
 
     Parameters
@@ -95,18 +500,1174 @@ def parse_fwf_file(
         Fixed width file spec
     input_file : pathlib.Path
         path to input file
+    typed : bool, optional
+        convert values according to column dtypes, see fwf_value_converters, by default False
+    columns : Optional[List[str]], optional
+        names of projected columns, only these columns are sliced, by default all columns
+    where : Optional[Dict[str, Callable[[str], bool]]], optional
+        predicates by column name tested against raw column values before the line is parsed,
+        a line is parsed if all predicates are true, see equals_predicate, by default None
+    instrumentation : Optional[Instrumentation], optional
+        counts parsed lines and read bytes and times read, decode, slice, strip and convert
+        stages, the file is read and parsed in blocks of lines then, by default None
+    dictionary_size : Optional[int], optional
+        max number of distinct values of a column which are interned. Equal raw values of
+        a column are parsed once into a shared value, a column with more distinct values
+        falls back to parsing every value. Values are not interned if None, by default None
 
     Yields
     -------
-    Iterator[Iterator[Any]]
-        lines iterator. Every line is an iterator of values
+    Iterator[Iterable[Any]]
+        lines iterator. Every line is an iterable of values
+
+    Raises
+    ------
+    ValueError
+        if a projected or filtered column is not found, the dictionary size is <= 0 or
+        values are interned with instrumentation
     """
-    # generate slices for each column
-    slices = [slice(col.offset, col.offset + col.length, None) for col in spec.columns]
-    with open(input_file, "r", 1024, encoding=spec.encoding) as f:
+    if dictionary_size is not None and dictionary_size <= 0:
+        raise ValueError("dictionary_size should be > 0")
+    if dictionary_size is not None and instrumentation is not None:
+        raise ValueError("Values can not be interned with instrumentation")
+    slices = fwf_column_slices(spec, columns)
+    converters = fwf_value_converters(spec, columns) if typed else None
+    if dictionary_size is not None:
+        for block in __parse_fwf_blocks_interned(
+            spec, input_file, slices, converters, where, dictionary_size, DEFAULT_BATCH_SIZE
+        ):
+            yield from map(list, zip(*block))
+        return
+    if instrumentation is not None:
+        yield from __parse_fwf_file_instrumented(
+            spec, input_file, slices, converters, where, instrumentation
+        )
+        return
+    if spec.byte_widths:
+        byte_line_filter = fwf_byte_line_filter(spec, where)
+        with open_input(input_file) as binary_file:
+            # skip first line if header is included
+            if spec.header:
+                next(binary_file, None)
+            byte_lines = (
+                binary_file if byte_line_filter is None else filter(byte_line_filter, binary_file)
+            )
+            yield from parse_fwf_byte_lines(slices, spec.encoding, byte_lines, converters)
+        return
+    line_filter = fwf_line_filter(spec, where)
+    with open_text_input(input_file, spec.encoding, 1024) as f:
         # skip first line if header is included
         if spec.header:
             next(f)
-        for line in f:
-            # remove spaces rom column values
-            yield (line[s].strip() for s in slices)
+        lines = f if line_filter is None else filter(line_filter, f)
+        if converters is not None:
+            yield from parse_fwf_lines_typed(slices, converters, lines)
+        else:
+            yield from parse_fwf_lines(slices, lines)
+
+
+def __parse_fwf_file_instrumented(
+    spec: FWFSpec,
+    input_file: pathlib.Path,
+    slices: List[slice],
+    converters: Optional[List[Callable[[str], Any]]],
+    where: Optional[Dict[str, Callable[[str], bool]]],
+    instrumentation: Instrumentation,
+) -> Iterator[List[Any]]:
+    line_filter: Optional[Callable[[Any], bool]]
+    if spec.byte_widths:
+        line_filter = fwf_byte_line_filter(spec, where)
+        blocks = __instrumented_line_blocks(input_file, None, instrumentation)
+    else:
+        line_filter = fwf_line_filter(spec, where)
+        blocks = __instrumented_line_blocks(input_file, spec.encoding, instrumentation)
+    skip_header = spec.header
+    for lines in blocks:
+        if skip_header:
+            lines = lines[1:]
+            skip_header = False
+        if line_filter is not None:
+            # predicates test sliced raw values
+            with timed(instrumentation, "slice"):
+                lines = list(filter(line_filter, lines))
+        with timed(instrumentation, "slice"):
+            rows = [[line[s] for s in slices] for line in lines]
+        if spec.byte_widths:
+            # every value is decoded on its own
+            with timed(instrumentation, "decode"):
+                rows = [[value.decode(spec.encoding) for value in row] for row in rows]
+        with timed(instrumentation, "strip"):
+            rows = [[value.strip() for value in row] for row in rows]
+        if converters is not None:
+            with timed(instrumentation, "convert"):
+                rows = [
+                    [convert(value) for convert, value in zip(converters, row)] for row in rows
+                ]
+        instrumentation.add_read(len(rows), 0)
+        yield from rows
+
+
+def __instrumented_line_blocks(
+    input_file: pathlib.Path, encoding: Optional[str], instrumentation: Instrumentation
+) -> Iterator[List[Any]]:
+    # lines are decoded if encoding is not None, byte lines are split at "\n" otherwise
+    decoder = codecs.getincrementaldecoder(encoding)() if encoding is not None else None
+    rest: Any = "" if decoder is not None else b""
+    lines: List[Any]
+    with open_input(input_file) as f:
+        while True:
+            with timed(instrumentation, "read"):
+                data = f.read(DEFAULT_BLOCK_SIZE)
+            instrumentation.add_read(0, len(data))
+            if decoder is None:
+                block = rest + data
+                end = len(block) if not data else block.rfind(b"\n") + 1
+                rest = block[end:]
+                lines = io.BytesIO(block[:end]).readlines()
+            else:
+                with timed(instrumentation, "decode"):
+                    text = rest + decoder.decode(data, final=not data)
+                    end = len(text) if not data else text.rfind("\n") + 1
+                    rest = text[end:]
+                    # universal newlines, like the file opened in text mode
+                    lines = io.StringIO(text[:end], newline=None).readlines()
+            if lines:
+                yield lines
+            if not data:
+                break
+
+
+def parse_fwf_batches(
+    spec: FWFSpec,
+    input_file: pathlib.Path,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    typed: bool = False,
+    columns: Optional[List[str]] = None,
+    where: Optional[Dict[str, Callable[[str], bool]]] = None,
+    dictionary_size: Optional[int] = None,
+) -> Iterator[List[Sequence[Any]]]:
+    """Parses fixed width file into blocks of columns. Skips first line if spec.header is True
+
+    Parameters
+    ----------
+    spec : FWFSpec
+        Fixed width file spec
+    input_file : pathlib.Path
+        path to input file
+    batch_size : int, optional
+        max number of lines in a block, by default DEFAULT_BATCH_SIZE
+    typed : bool, optional
+        convert values according to column dtypes, see fwf_value_converters, by default False
+    columns : Optional[List[str]], optional
+        names of projected columns, only these columns are sliced, by default all columns
+    where : Optional[Dict[str, Callable[[str], bool]]], optional
+        predicates by column name tested against raw column values before the line is parsed,
+        a line is parsed if all predicates are true, see equals_predicate, by default None
+    dictionary_size : Optional[int], optional
+        max number of distinct values of a dictionary encoded column. Columns are parsed
+        into DictionaryColumn codes of values parsed once per distinct raw value, a column
+        with more distinct values falls back to a list of values. Columns are not encoded
+        if None, by default None
+
+    Yields
+    -------
+    Iterator[List[Sequence[Any]]]
+        blocks iterator. Every block is a list of columns in spec order or in the order of
+        projected columns, every column is a list of values or a DictionaryColumn
+
+    Raises
+    ------
+    ValueError
+        if the batch size or the dictionary size is <= 0 or a projected or filtered column
+        is not found
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size should be > 0")
+    if dictionary_size is not None and dictionary_size <= 0:
+        raise ValueError("dictionary_size should be > 0")
+    slices = fwf_column_slices(spec, columns)
+    if dictionary_size is not None:
+        yield from __parse_fwf_blocks_interned(
+            spec,
+            input_file,
+            slices,
+            fwf_value_converters(spec, columns) if typed else None,
+            where,
+            dictionary_size,
+            batch_size,
+        )
+        return
+    # str columns are not converted
+    converters = [
+        None if not typed or col.dtype == "str" else converter
+        for col, converter in zip(
+            spec.select_columns(columns), fwf_value_converters(spec, columns)
+        )
+    ]
+    if spec.byte_widths:
+        byte_line_filter = fwf_byte_line_filter(spec, where)
+        with open_input(input_file) as binary_file:
+            # skip first line if header is included
+            if spec.header:
+                next(binary_file, None)
+            byte_lines = (
+                binary_file if byte_line_filter is None else filter(byte_line_filter, binary_file)
+            )
+            rows = parse_fwf_byte_lines(slices, spec.encoding, byte_lines)
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                yield __convert_columns([list(column) for column in zip(*batch)], converters)
+        return
+    line_filter = fwf_line_filter(spec, where)
+    with open_text_input(input_file, spec.encoding, 1024 * 1024) as f:
+        # skip first line if header is included
+        if spec.header:
+            next(f, None)
+        lines_source = f if line_filter is None else filter(line_filter, f)
+        while True:
+            lines = list(islice(lines_source, batch_size))
+            if not lines:
+                break
+            values = [list(map(str.strip, [line[s] for line in lines])) for s in slices]
+            yield __convert_columns(values, converters)
+
+
+class DictionaryColumn(collections.abc.Sequence):
+    """Column of a block of parse_fwf_batches encoded as codes of a dictionary of values.
+    The dictionary is shared by the blocks of a column and only grows, so every value
+    is a shared object and codes of earlier blocks stay valid.
+
+    Parameters
+    ----------
+    codes : List[int]
+        indexes of values in the dictionary
+    dictionary : List[Any]
+        distinct values
+    """
+
+    def __init__(self, codes: List[int], dictionary: List[Any]):
+        self.codes = codes
+        self.dictionary = dictionary
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, key: Any) -> Any:
+        if isinstance(key, slice):
+            return list(map(self.dictionary.__getitem__, self.codes[key]))
+        return self.dictionary[self.codes[key]]
+
+    def __iter__(self) -> Iterator[Any]:
+        return map(self.dictionary.__getitem__, self.codes)
+
+
+def __parse_fwf_blocks_interned(
+    spec: FWFSpec,
+    input_file: pathlib.Path,
+    slices: List[slice],
+    converters: Optional[List[Callable[[str], Any]]],
+    where: Optional[Dict[str, Callable[[str], bool]]],
+    dictionary_size: int,
+    batch_size: int,
+) -> Iterator[List[Sequence[Any]]]:
+    # raw slices are decoded, stripped and converted once per distinct value
+    if converters is None:
+        converters = [str] * len(slices)
+    if spec.byte_widths:
+        decoders = [
+            functools.partial(__decode_raw_bytes, spec.encoding, converter)
+            for converter in converters
+        ]
+        line_filter: Any = fwf_byte_line_filter(spec, where)
+        f: Any = open_input(input_file)
+    else:
+        decoders = [functools.partial(__decode_raw_str, converter) for converter in converters]
+        line_filter = fwf_line_filter(spec, where)
+        f = open_text_input(input_file, spec.encoding, 1024 * 1024)
+    # a dictionary is dropped when the column has more distinct values than dictionary_size
+    dictionaries: List[Optional[Tuple[Dict[Any, int], List[Any]]]] = [({}, []) for _ in slices]
+    with f:
+        # skip first line if header is included
+        if spec.header:
+            next(f, None)
+        lines_source = f if line_filter is None else filter(line_filter, f)
+        while True:
+            lines = list(islice(lines_source, batch_size))
+            if not lines:
+                break
+            block: List[Sequence[Any]] = []
+            for i, (s, decode) in enumerate(zip(slices, decoders)):
+                raw_values = [line[s] for line in lines]
+                dictionary = dictionaries[i]
+                codes = (
+                    None
+                    if dictionary is None
+                    else __dictionary_codes(raw_values, dictionary, decode, dictionary_size)
+                )
+                if dictionary is None or codes is None:
+                    dictionaries[i] = None
+                    block.append(list(map(decode, raw_values)))
+                else:
+                    block.append(DictionaryColumn(codes, dictionary[1]))
+            yield block
+
+
+def __dictionary_codes(
+    raw_values: List[Any],
+    dictionary: Tuple[Dict[Any, int], List[Any]],
+    decode: Callable[[Any], Any],
+    dictionary_size: int,
+) -> Optional[List[int]]:
+    codes, values = dictionary
+    new_raw_values = [raw for raw in dict.fromkeys(raw_values) if raw not in codes]
+    if len(codes) + len(new_raw_values) > dictionary_size:
+        return None
+    for raw in new_raw_values:
+        codes[raw] = len(values)
+        values.append(decode(raw))
+    return list(map(codes.__getitem__, raw_values))
+
+
+def __decode_raw_str(converter: Callable[[str], Any], raw: str) -> Any:
+    return converter(raw.strip())
+
+
+def __decode_raw_bytes(encoding: str, converter: Callable[[str], Any], raw: bytes) -> Any:
+    return converter(raw.decode(encoding).strip())
+
+
+def __convert_columns(
+    values: List[List[str]], converters: List[Optional[Callable[[str], Any]]]
+) -> List[Sequence[Any]]:
+    return [
+        column if converter is None else list(map(converter, column))
+        for column, converter in zip(values, converters)
+    ]
+
+
+def fwf_column_slices(spec: FWFSpec, columns: Optional[List[str]] = None) -> List[slice]:
+    """Generates slices for columns of the spec
+
+    Parameters
+    ----------
+    spec : FWFSpec
+        Fixed width file spec
+    columns : Optional[List[str]], optional
+        names of projected columns, by default all columns
+
+    Returns
+    -------
+    List[slice]
+        column slices in spec order or in the order of projected columns
+
+    Raises
+    ------
+    ValueError
+        if a projected column is not found
+    """
+    return [
+        slice(col.offset, col.offset + col.length, None) for col in spec.select_columns(columns)
+    ]
+
+
+def check_fwf_byte_offsets(spec: FWFSpec) -> None:
+    """Checks that column offsets and lengths are byte offsets and lengths of encoded lines,
+       so records can be found and sliced without decoding the file. Widths of byte widths
+       specs are byte offsets in an ascii compatible encoding, character widths are byte
+       offsets in a single-byte encoding.
+
+    Parameters
+    ----------
+    spec : FWFSpec
+        Fixed width file spec
+
+    Raises
+    ------
+    ValueError
+        if the encoding of byte widths is not ascii compatible or the encoding of character
+        widths is not a single-byte encoding
+    """
+    if spec.byte_widths:
+        if not is_ascii_compatible_encoding(spec.encoding):
+            raise ValueError(f"Encoding {spec.encoding} is not ascii compatible")
+    elif not is_single_byte_encoding(spec.encoding):
+        raise ValueError(f"Encoding {spec.encoding} is not a single-byte encoding")
+
+
+def fwf_record_layout(spec: FWFSpec, f: BinaryIO) -> Tuple[int, int]:
+    """Detects where records of a fixed width file start and the size of a record in bytes.
+       Every record is expected to have the same size, the first one tells which line
+       terminator is used.
+
+    Parameters
+    ----------
+    spec : FWFSpec
+        Fixed width file spec
+    f : BinaryIO
+        binary file positioned at the start of the file
+
+    Returns
+    -------
+    Tuple[int, int]
+        offset of the first record after the header and record size including line terminator
+    """
+    data_offset = len(f.readline()) if spec.header else 0
+    first_record = f.read(spec.record_length + 2)
+    terminator_length = 2 if first_record[spec.record_length :] == b"\r\n" else 1
+    return data_offset, spec.record_length + terminator_length
+
+
+def fwf_line_filter(
+    spec: FWFSpec, where: Optional[Dict[str, Callable[[str], bool]]] = None
+) -> Optional[Callable[[str], bool]]:
+    """Combines column predicates into a predicate of a fixed width line
+
+    Parameters
+    ----------
+    spec : FWFSpec
+        Fixed width file spec
+    where : Optional[Dict[str, Callable[[str], bool]]], optional
+        predicates by column name tested against raw column values, by default None
+
+    Returns
+    -------
+    Optional[Callable[[str], bool]]
+        line predicate, true if all column predicates are true, None if there are no predicates
+
+    Raises
+    ------
+    ValueError
+        if a filtered column is not found
+    """
+    if not where:
+        return None
+    predicates = list(zip(fwf_column_slices(spec, list(where.keys())), where.values()))
+    return functools.partial(__test_line, predicates)
+
+
+def __test_line(predicates: List[Tuple[slice, Callable[[str], bool]]], line: str) -> bool:
+    return all(predicate(line[s]) for s, predicate in predicates)
+
+
+def fwf_byte_line_filter(
+    spec: FWFSpec, where: Optional[Dict[str, Callable[[str], bool]]] = None
+) -> Optional[Callable[[bytes], bool]]:
+    """Combines column predicates into a predicate of an encoded fixed width line,
+       see fwf_line_filter. Columns are sliced from the bytes and decoded on their own,
+       so offsets must be byte offsets, see FWFSpec.byte_widths
+
+    Parameters
+    ----------
+    spec : FWFSpec
+        Fixed width file spec
+    where : Optional[Dict[str, Callable[[str], bool]]], optional
+        predicates by column name tested against raw column values, by default None
+
+    Returns
+    -------
+    Optional[Callable[[bytes], bool]]
+        line predicate, true if all column predicates are true, None if there are no predicates
+
+    Raises
+    ------
+    ValueError
+        if a filtered column is not found
+    """
+    if not where:
+        return None
+    predicates = list(zip(fwf_column_slices(spec, list(where.keys())), where.values()))
+    return functools.partial(__test_byte_line, spec.encoding, predicates)
+
+
+def __test_byte_line(
+    encoding: str, predicates: List[Tuple[slice, Callable[[str], bool]]], line: bytes
+) -> bool:
+    return all(predicate(line[s].decode(encoding)) for s, predicate in predicates)
+
+
+def equals_predicate(value: str) -> Callable[[str], bool]:
+    """Creates predicate of a raw column value, true if the stripped value equals to value.
+       The predicate can be passed to worker processes.
+
+    Parameters
+    ----------
+    value : str
+        expected value
+
+    Returns
+    -------
+    Callable[[str], bool]
+        predicate
+    """
+    return functools.partial(__stripped_equals, value)
+
+
+def __stripped_equals(value: str, raw_value: str) -> bool:
+    return raw_value.strip() == value
+
+
+def parse_fwf_lines(slices: List[slice], lines: Iterable[str]) -> Iterator[Iterator[Any]]:
+    """Parses fixed width lines
+
+    Parameters
+    ----------
+    slices : List[slice]
+        column slices, see fwf_column_slices
+    lines : Iterable[str]
+        fixed width lines
+
+    Yields
+    -------
+    Iterator[Iterator[Any]]
+        lines iterator. Every line is an iterator of values
+    """
+    for line in lines:
+        # remove spaces rom column values
+        yield (line[s].strip() for s in slices)
+
+
+def parse_fwf_lines_typed(
+    slices: List[slice], converters: List[Callable[[str], Any]], lines: Iterable[str]
+) -> Iterator[List[Any]]:
+    """Parses fixed width lines and converts values
+
+    Parameters
+    ----------
+    slices : List[slice]
+        column slices, see fwf_column_slices
+    converters : List[Callable[[str], Any]]
+        column value converters, see fwf_value_converters
+    lines : Iterable[str]
+        fixed width lines
+
+    Yields
+    -------
+    Iterator[List[Any]]
+        lines iterator. Every line is a list of converted values
+    """
+    columns = list(zip(slices, converters))
+    for line in lines:
+        yield [convert(line[s].strip()) for s, convert in columns]
+
+
+def parse_fwf_byte_lines(
+    slices: List[slice],
+    encoding: str,
+    lines: Iterable[bytes],
+    converters: Optional[List[Callable[[str], Any]]] = None,
+) -> Iterator[List[Any]]:
+    """Parses encoded fixed width lines with column offsets and lengths counted in bytes.
+       Every value is sliced from the bytes and decoded on its own, so a multi-byte
+       character never moves the following columns. ASCII lines are decoded at once.
+
+    Parameters
+    ----------
+    slices : List[slice]
+        column byte slices, see fwf_column_slices
+    encoding : str
+        ascii compatible encoding of the lines
+    lines : Iterable[bytes]
+        encoded fixed width lines
+    converters : Optional[List[Callable[[str], Any]]], optional
+        column value converters, see fwf_value_converters, by default values are not
+        converted
+
+    Yields
+    -------
+    Iterator[List[Any]]
+        lines iterator. Every line is a list of values
+    """
+    for line in lines:
+        if line.isascii():
+            # ASCII characters are single bytes, so the offsets are the same
+            text = line.decode("ascii")
+            values = [text[s].strip() for s in slices]
+        else:
+            values = [line[s].decode(encoding).strip() for s in slices]
+        if converters is not None:
+            values = [convert(value) for convert, value in zip(converters, values)]
+        yield values
+
+
+def parse_fwf_file_mmap(
+    spec: FWFSpec,
+    input_file: pathlib.Path,
+    typed: bool = False,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    columns: Optional[List[str]] = None,
+    where: Optional[Dict[str, Callable[[str], bool]]] = None,
+) -> Iterator[List[Any]]:
+    """Parses fixed width file stored in a single-byte encoding or with byte widths.
+       Memory maps the file and decodes it in blocks of whole lines, values of byte widths
+       specs are decoded on their own, see parse_fwf_byte_lines.
+       Produces the same values as parse_fwf_file. Skips first line if spec.header is True
+
+    Parameters
+    ----------
+    spec : FWFSpec
+        Fixed width file spec, column offsets must be byte offsets, see check_fwf_byte_offsets
+    input_file : pathlib.Path
+        path to input file
+    typed : bool, optional
+        convert values according to column dtypes, see fwf_value_converters, by default False
+    block_size : int, optional
+        approximate size of a decoded block in bytes, by default DEFAULT_BLOCK_SIZE
+    columns : Optional[List[str]], optional
+        names of projected columns, only these columns are sliced, by default all columns
+    where : Optional[Dict[str, Callable[[str], bool]]], optional
+        predicates by column name tested against raw column values before the line is parsed,
+        a line is parsed if all predicates are true, see equals_predicate, by default None
+
+    Yields
+    -------
+    Iterator[List[Any]]
+        lines iterator. Every line is a list of values
+
+    Raises
+    ------
+    ValueError
+        if column offsets are not byte offsets, see check_fwf_byte_offsets, the file is
+        compressed or a projected or filtered column is not found
+    """
+    check_fwf_byte_offsets(spec)
+    if detect_compression(input_file) is not None:
+        raise ValueError(f"Compressed file {input_file} can not be memory mapped")
+    slices = fwf_column_slices(spec, columns)
+    if spec.byte_widths:
+        yield from __parse_fwf_file_mmap_bytes(spec, input_file, typed, block_size, columns, where)
+        return
+    line_filter = fwf_line_filter(spec, where)
+    with open(input_file, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            lines = __mmap_lines(mm, spec.encoding, block_size)
+            # skip first line if header is included
+            if spec.header:
+                next(lines, None)
+            if line_filter is not None:
+                lines = filter(line_filter, lines)
+            # single-byte encoding, so decoded lines have the same offsets as the bytes
+            if typed:
+                yield from parse_fwf_lines_typed(
+                    slices, fwf_value_converters(spec, columns), lines
+                )
+            else:
+                for line in lines:
+                    yield [line[s].strip() for s in slices]
+
+
+def __parse_fwf_file_mmap_bytes(
+    spec: FWFSpec,
+    input_file: pathlib.Path,
+    typed: bool,
+    block_size: int,
+    columns: Optional[List[str]],
+    where: Optional[Dict[str, Callable[[str], bool]]],
+) -> Iterator[List[Any]]:
+    slices = fwf_column_slices(spec, columns)
+    converters = fwf_value_converters(spec, columns) if typed else None
+    line_filter = fwf_byte_line_filter(spec, where)
+    with open(input_file, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            lines = __mmap_lines(mm, None, block_size)
+            # skip first line if header is included
+            if spec.header:
+                next(lines, None)
+            if line_filter is not None:
+                lines = filter(line_filter, lines)
+            yield from parse_fwf_byte_lines(slices, spec.encoding, lines, converters)
+
+
+def __mmap_lines(mm: mmap.mmap, encoding: Optional[str], block_size: int) -> Iterator[Any]:
+    # byte lines if encoding is None
+    position, size = 0, len(mm)
+    while position < size:
+        # decode a block of whole lines at once, it is much cheaper than decoding every field
+        end = size
+        if position + block_size < size:
+            end = mm.rfind(b"\n", position, position + block_size)
+            if end == -1:
+                end = mm.find(b"\n", position + block_size)
+            end = size if end == -1 else end + 1
+        block = mm[position:end]
+        lines: List[Any] = (
+            block.split(b"\n") if encoding is None else block.decode(encoding).split("\n")
+        )
+        if not lines[-1]:
+            lines.pop()
+        yield from lines
+        position = end
+
+
+PARSER_ENGINES: Dict[str, Callable[..., Iterator[Iterable[Any]]]] = {
+    "text": parse_fwf_file,
+    "mmap": parse_fwf_file_mmap,
+}
+
+
+def fwf_index_path(input_file: pathlib.Path) -> pathlib.Path:
+    """Path of the sidecar offset index of a fixed width file, see FixedWidthReader
+
+    Parameters
+    ----------
+    input_file : pathlib.Path
+        path to fixed width file
+
+    Returns
+    -------
+    pathlib.Path
+        input file path with INDEX_FILE_SUFFIX appended
+    """
+    return input_file.with_name(input_file.name + INDEX_FILE_SUFFIX)
+
+
+class FixedWidthReader:
+    """Random access reader of fixed width file records.
+
+    Records of a file with byte offsets of columns, see check_fwf_byte_offsets, and
+    the same line terminator on every line are found by multiplying the record size,
+    see fwf_record_layout. The record size is used only if the terminator is found at
+    the end of every record and nowhere else. Other files, e.g. files with mixed line
+    terminators, blank or trimmed lines or character widths in multi-byte encodings, use
+    a sparse index of byte offsets of every index_step-th record. The checked layout and
+    the index are persisted in a sidecar file, so the file is scanned once, and rebuilt
+    when the file size or mtime changes.
+
+    Records are split and parsed like parse_fwf_file does, so lines of character widths
+    specs end at "\\n", "\\r\\n" or "\\r" and every line, blank lines included, is a record.
+    Every record is a list of values.
+    Values of byte widths specs are sliced from the bytes, see parse_fwf_byte_lines.
+    The reader supports len(reader), reader[i], reader[start:stop:step] and iteration
+    and should be closed, e.g. used as a context manager.
+
+    Parameters
+    ----------
+    spec : FWFSpec
+        Fixed width file spec, encoding must be ascii compatible
+    input_file : pathlib.Path
+        path to input file
+    typed : bool, optional
+        convert values according to column dtypes, see fwf_value_converters, by default False
+    columns : Optional[List[str]], optional
+        names of projected columns, by default all columns
+    index_file : Optional[pathlib.Path], optional
+        path to sidecar offset index, by default see fwf_index_path
+    index_step : int, optional
+        number of records between indexed offsets, by default DEFAULT_INDEX_STEP
+
+    Raises
+    ------
+    ValueError
+        if the index step is <= 0, the encoding is not ascii compatible, the file is
+        compressed or a projected column is not found
+    """
+
+    # magic, file size, file mtime in ns, data offset, index step, record length,
+    # universal newlines, record size of a fixed stride or 0 if indexed, number of records
+    __INDEX_HEADER = struct.Struct("<8sQqQQQ?QQ")
+    __INDEX_MAGIC = b"FWFIDX02"
+
+    def __init__(
+        self,
+        spec: FWFSpec,
+        input_file: pathlib.Path,
+        typed: bool = False,
+        columns: Optional[List[str]] = None,
+        index_file: Optional[pathlib.Path] = None,
+        index_step: int = DEFAULT_INDEX_STEP,
+    ):
+        if index_step <= 0:
+            raise ValueError("index_step should be > 0")
+        if not is_ascii_compatible_encoding(spec.encoding):
+            raise ValueError(f"Encoding {spec.encoding} is not ascii compatible")
+        if detect_compression(input_file) is not None:
+            raise ValueError(f"Compressed file {input_file} can not be read randomly")
+        self.__encoding = spec.encoding
+        self.__byte_widths = spec.byte_widths
+        # text files are parsed with universal newlines, byte lines are split at "\n"
+        self.__universal_newlines = not spec.byte_widths
+        self.__record_length = spec.record_length
+        self.__slices = fwf_column_slices(spec, columns)
+        self.__converters = fwf_value_converters(spec, columns) if typed else None
+        self.__index_step = index_step
+        self.__offsets: Optional[array] = None
+        self.__mm: Optional[mmap.mmap] = None
+        with open(input_file, "rb") as f:
+            self.__data_offset, self.__record_size = fwf_record_layout(spec, f)
+            stat = os.fstat(f.fileno())
+            if stat.st_size:
+                self.__mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if spec.header and self.__mm is not None and self.__universal_newlines:
+                self.__data_offset = self.__line_end(0)[1]
+            self.__length = (
+                0
+                if self.__mm is None
+                else self.__load_layout(index_file or fwf_index_path(input_file), stat)
+            )
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self) -> "FixedWidthReader":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes memory mapped file"""
+        if self.__mm is not None:
+            self.__mm.close()
+            self.__mm = None
+
+    def __len__(self) -> int:
+        return self.__length
+
+    def __getitem__(self, key: Any) -> Any:
+        if isinstance(key, slice):
+            records = range(*key.indices(self.__length))
+            if records.step == 1:
+                return list(self.__parse(self.__lines(records.start, len(records))))
+            return [self[i] for i in records]
+        index = key if key >= 0 else key + self.__length
+        if not 0 <= index < self.__length:
+            raise IndexError("record index out of range")
+        return next(self.__parse(self.__lines(index, 1)))
+
+    def __iter__(self) -> Iterator[List[Any]]:
+        return self.__parse(self.__lines(0, self.__length))
+
+    def __parse(self, lines: Iterable[Any]) -> Iterator[List[Any]]:
+        if self.__byte_widths:
+            return parse_fwf_byte_lines(self.__slices, self.__encoding, lines, self.__converters)
+        if self.__converters is not None:
+            return parse_fwf_lines_typed(self.__slices, self.__converters, lines)
+        slices = self.__slices
+        return ([line[s].strip() for s in slices] for line in lines)
+
+    def __lines(self, start: int, count: int) -> Iterator[Any]:
+        # byte lines of byte widths specs, decoded lines otherwise
+        if count <= 0 or self.__mm is None:
+            return
+        if self.__offsets is None:
+            position = self.__data_offset + start * self.__record_size
+            data = self.__mm[position : position + count * self.__record_size]
+            # single-byte encoding, so decoded records have the same offsets as the bytes
+            records = data if self.__byte_widths else data.decode(self.__encoding)
+            for record_start in range(0, len(records), self.__record_size):
+                yield records[record_start : record_start + self.__record_length]
+            return
+        mm = self.__mm
+        position = self.__offsets[start // self.__index_step]
+        for _ in range(start % self.__index_step):
+            position = self.__line_end(position)[1]
+        for _ in range(count):
+            end, next_position = self.__line_end(position)
+            line = mm[position:end]
+            if self.__byte_widths:
+                yield line[:-1] if line.endswith(b"\r") else line
+            else:
+                yield line.decode(self.__encoding)
+            position = next_position
+
+    def __line_end(self, position: int) -> Tuple[int, int]:
+        # end of the line at position without the line terminator and start of the next line
+        mm = self.__mm
+        assert mm is not None
+        end = mm.find(b"\n", position)
+        end = len(mm) if end == -1 else end
+        if self.__universal_newlines:
+            carriage_return = mm.find(b"\r", position, end)
+            if carriage_return != -1:
+                return (
+                    carriage_return,
+                    (end if carriage_return + 1 == end else carriage_return) + 1,
+                )
+        return end, end + 1
+
+    def __fixed_stride_length(self, file_size: int) -> Optional[int]:
+        mm = self.__mm
+        assert mm is not None
+        if not self.__byte_widths and not is_single_byte_encoding(self.__encoding):
+            return None
+        terminated, remainder = divmod(file_size - self.__data_offset, self.__record_size)
+        # the last record may have no line terminator
+        if remainder and remainder != self.__record_length:
+            return None
+        terminator = b"\r\n" if self.__record_size - self.__record_length == 2 else b"\n"
+        # every terminated record must end with the terminator
+        data_end = self.__data_offset + terminated * self.__record_size
+        for i in range(len(terminator)):
+            start = self.__data_offset + self.__record_length + i
+            if mm[start : data_end : self.__record_size] != terminator[i : i + 1] * terminated:
+                return None
+        # and no record may contain another line break, which would split it into more lines
+        line_feeds, carriage_returns = self.__count_line_breaks()
+        if line_feeds != terminated:
+            return None
+        if self.__universal_newlines and carriage_returns != terminated * (len(terminator) - 1):
+            return None
+        return terminated + (1 if remainder else 0)
+
+    def __count_line_breaks(self) -> Tuple[int, int]:
+        mm = self.__mm
+        assert mm is not None
+        line_feeds, carriage_returns = 0, 0
+        for position in range(self.__data_offset, len(mm), DEFAULT_BLOCK_SIZE):
+            block = mm[position : position + DEFAULT_BLOCK_SIZE]
+            line_feeds += block.count(b"\n")
+            carriage_returns += block.count(b"\r")
+        return line_feeds, carriage_returns
+
+    def __load_layout(self, index_file: pathlib.Path, stat: os.stat_result) -> int:
+        # number of records, sets the offsets if the file is indexed
+        expected = (
+            stat.st_size,
+            stat.st_mtime_ns,
+            self.__data_offset,
+            self.__index_step,
+            self.__record_length,
+            self.__universal_newlines,
+        )
+        layout = self.__read_layout(index_file, expected)
+        if layout is not None:
+            self.__offsets, length = layout
+            return length
+        stride_length = self.__fixed_stride_length(stat.st_size)
+        if stride_length is not None:
+            offsets, length = array("Q"), stride_length
+        else:
+            offsets, length = self.__build_index()
+            self.__offsets = offsets
+        record_size = 0 if self.__offsets is not None else self.__record_size
+        header = self.__INDEX_HEADER.pack(self.__INDEX_MAGIC, *expected, record_size, length)
+        if sys.byteorder == "big":  # pragma: no cover
+            offsets = array("Q", offsets)
+            offsets.byteswap()
+        try:
+            _replace_file(index_file, [header, offsets.tobytes()])
+        except OSError:
+            # the sidecar saves the next scan, a read-only directory is not an error
+            pass
+        return length
+
+    def __read_layout(
+        self, index_file: pathlib.Path, expected: Tuple[Any, ...]
+    ) -> Optional[Tuple[Optional[array], int]]:
+        # offsets or None for a fixed stride and number of records of a fresh sidecar
+        try:
+            with open(index_file, "rb") as f:
+                header = f.read(self.__INDEX_HEADER.size)
+                body = f.read()
+        except OSError:
+            return None
+        if len(header) != self.__INDEX_HEADER.size:
+            return None
+        magic, *layout, record_size, length = self.__INDEX_HEADER.unpack(header)
+        if magic != self.__INDEX_MAGIC or tuple(layout) != expected:
+            return None
+        if record_size:
+            return (None, length) if record_size == self.__record_size and not body else None
+        # a partially written index is stale
+        if len(body) != -(-length // self.__index_step) * array("Q").itemsize:
+            return None
+        offsets = array("Q", body)
+        if sys.byteorder == "big":  # pragma: no cover
+            offsets.byteswap()
+        return offsets, length
+
+    def __build_index(self) -> Tuple[array, int]:
+        offsets = array("Q")
+        mm = self.__mm
+        assert mm is not None
+        position, size, length = self.__data_offset, len(mm), 0
+        while position < size:
+            if length % self.__index_step == 0:
+                offsets.append(position)
+            position = self.__line_end(position)[1]
+            length += 1
+        return offsets, length
+
+
+def _replace_file(path: pathlib.Path, chunks: Iterable[bytes]) -> None:
+    # imported on demand, tempfile imports shutil with its compression modules
+    import tempfile
+
+    # write and rename, so a crash or a concurrent reader never sees a partial file
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.writelines(chunks)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def fwf_key_index_path(input_file: pathlib.Path, column: str) -> pathlib.Path:
+    """Path of the key index of a fixed width file column, see build_fwf_key_index
+
+    Parameters
+    ----------
+    input_file : pathlib.Path
+        path to fixed width file
+    column : str
+        indexed column name
+
+    Returns
+    -------
+    pathlib.Path
+        input file path with the column name and KEY_INDEX_FILE_SUFFIX appended
+    """
+    return input_file.with_name(f"{input_file.name}.{column}{KEY_INDEX_FILE_SUFFIX}")
+
+
+def build_fwf_key_index(
+    spec: FWFSpec,
+    input_file: pathlib.Path,
+    column: str,
+    index_file: Optional[pathlib.Path] = None,
+) -> pathlib.Path:
+    """Builds sorted index of stripped column values mapped to record numbers.
+       Every entry is the utf-8 encoded value padded to the longest value and the record
+       number, entries are sorted by value and record number. The index stores the size
+       and mtime of the indexed file, so a stale index is detected, and is written to
+       a temporary file renamed into place, so a partial index is never searched.
+
+    Parameters
+    ----------
+    spec : FWFSpec
+        Fixed width file spec, see FixedWidthReader
+    input_file : pathlib.Path
+        path to input file
+    column : str
+        indexed column name
+    index_file : Optional[pathlib.Path], optional
+        path to index file, by default see fwf_key_index_path
+
+    Returns
+    -------
+    pathlib.Path
+        path to index file
+
+    Raises
+    ------
+    ValueError
+        if the column is not found or the file can not be read by FixedWidthReader
+    """
+    index_file = index_file or fwf_key_index_path(input_file, column)
+    stat = os.stat(input_file)
+    with FixedWidthReader(spec, input_file, columns=[column]) as reader:
+        keys = [values[0].encode("utf-8") for values in reader]
+    key_size = max(map(len, keys), default=0)
+    # sort is stable, so records with the same value keep the file order
+    record_numbers = sorted(range(len(keys)), key=keys.__getitem__)
+    header = __KEY_INDEX_HEADER.pack(
+        __KEY_INDEX_MAGIC, stat.st_size, stat.st_mtime_ns, key_size, len(keys)
+    )
+    entries = (keys[i].ljust(key_size, b"\0") + __RECORD_NUMBER.pack(i) for i in record_numbers)
+    _replace_file(index_file, chain([header], entries))
+    return index_file
+
+
+def lookup_fwf_records(
+    spec: FWFSpec,
+    input_file: pathlib.Path,
+    column: str,
+    value: str,
+    typed: bool = False,
+    columns: Optional[List[str]] = None,
+    index_file: Optional[pathlib.Path] = None,
+) -> List[List[Any]]:
+    """Finds records where the stripped column value equals to value.
+       Uses binary search in the memory mapped key index, the index is built
+       if it does not exist or is stale, see build_fwf_key_index.
+
+    Parameters
+    ----------
+    spec : FWFSpec
+        Fixed width file spec, see FixedWidthReader
+    input_file : pathlib.Path
+        path to input file
+    column : str
+        indexed column name
+    value : str
+        searched value
+    typed : bool, optional
+        convert values according to column dtypes, see fwf_value_converters, by default False
+    columns : Optional[List[str]], optional
+        names of projected columns, by default all columns
+    index_file : Optional[pathlib.Path], optional
+        path to index file, by default see fwf_key_index_path
+
+    Returns
+    -------
+    List[List[Any]]
+        matching records in the file order
+
+    Raises
+    ------
+    ValueError
+        if the column is not found or the file can not be read by FixedWidthReader
+    """
+    spec.select_columns([column])
+    index_file = index_file or fwf_key_index_path(input_file, column)
+    if not __is_fresh_key_index(index_file, input_file):
+        build_fwf_key_index(spec, input_file, column, index_file)
+    record_numbers = __find_record_numbers(index_file, value.encode("utf-8"))
+    if not record_numbers:
+        return []
+    with FixedWidthReader(spec, input_file, typed, columns) as reader:
+        return [reader[i] for i in record_numbers]
+
+
+def __is_fresh_key_index(index_file: pathlib.Path, input_file: pathlib.Path) -> bool:
+    try:
+        with open(index_file, "rb") as f:
+            header = f.read(__KEY_INDEX_HEADER.size)
+            index_size = os.fstat(f.fileno()).st_size
+    except OSError:
+        return False
+    if len(header) != __KEY_INDEX_HEADER.size:
+        return False
+    magic, file_size, mtime_ns, key_size, entries = __KEY_INDEX_HEADER.unpack(header)
+    stat = os.stat(input_file)
+    # a partially written index is stale
+    expected_size = __KEY_INDEX_HEADER.size + entries * (key_size + __RECORD_NUMBER.size)
+    return (magic, file_size, mtime_ns, index_size) == (
+        __KEY_INDEX_MAGIC,
+        stat.st_size,
+        stat.st_mtime_ns,
+        expected_size,
+    )
+
+
+def __find_record_numbers(index_file: pathlib.Path, key: bytes) -> List[int]:
+    with open(index_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        _, _, _, key_size, entries = __KEY_INDEX_HEADER.unpack_from(mm)
+        if len(key) > key_size:
+            return []
+        key = key.ljust(key_size, b"\0")
+        entry_size = key_size + __RECORD_NUMBER.size
+        start = __KEY_INDEX_HEADER.size
+        # first entry with a key >= searched key
+        low, high = 0, entries
+        while low < high:
+            middle = (low + high) // 2
+            position = start + middle * entry_size
+            if mm[position : position + key_size] < key:
+                low = middle + 1
+            else:
+                high = middle
+        record_numbers = []
+        for position in range(start + low * entry_size, len(mm), entry_size):
+            if mm[position : position + key_size] != key:
+                break
+            record_numbers.append(__RECORD_NUMBER.unpack_from(mm, position + key_size)[0])
+        return record_numbers
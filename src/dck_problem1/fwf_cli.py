@@ -1,13 +1,20 @@
 #!/usr/bin/env python3
 
 import argparse
+import contextlib
 import pathlib
+import random
 import sys
 
 from exitstatus import ExitStatus
 
-from dck_problem1.fixed_width_file_helper import generate_fwf_file
-from dck_problem1.spec_file_loader import load_fwf_spec_file
+from dck_problem1.fixed_width_file_helper import (
+    generate_fwf_file,
+    generate_fwf_file_bulk,
+    generate_fwf_file_parallel,
+)
+from dck_problem1.instrumentation import Instrumentation, ThroughputStats, capture_profile
+from dck_problem1.spec_file_loader import default_spec_cache_dir, load_fwf_spec_file
 
 
 def parse_args() -> argparse.Namespace:
@@ -19,24 +26,94 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--spec_file", type=pathlib.Path, required=True, help="Fixed width spec file path"
     )
+    parser.add_argument(
+        "--spec_cache_dir",
+        type=pathlib.Path,
+        default=default_spec_cache_dir(),
+        help="Directory of validated specs cached by spec file content",
+    )
+    parser.add_argument(
+        "--no_spec_cache", action="store_true", help="Validate the spec file on every run"
+    )
     parser.add_argument(
         "--fwf_file", type=pathlib.Path, required=True, help="Output fixed width file path"
     )
     parser.add_argument("-n", type=int, required=True, help="Number of lines")
-    return parser.parse_args()
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="Generate blocks of lines at once, supports str, int, decimal and fixed columns, "
+        "not date columns",
+    )
+    parser.add_argument("--seed", type=int, default=None, help="Random generator seed")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes, generates blocks of lines like --bulk if > 1",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print rows/s, MB/s and time spent in generate and write to stderr every second, "
+        "not supported with --bulk or --workers > 1",
+    )
+    parser.add_argument(
+        "--profile",
+        type=pathlib.Path,
+        default=None,
+        metavar="FILE",
+        help="Profile the generation with cProfile and dump pstats into FILE, "
+        "worker processes are not profiled",
+    )
+    parser.add_argument(
+        "--profile_memory",
+        action="store_true",
+        help="Trace memory allocations of --profile with tracemalloc and dump the snapshot "
+        "into FILE.tracemalloc",
+    )
+    args = parser.parse_args()
+    if args.profile_memory and args.profile is None:
+        parser.error("--profile_memory requires --profile")
+    if args.stats and (args.bulk or args.workers > 1):
+        parser.error("--stats can not be used with --bulk or --workers > 1")
+    return args
 
 
 def main() -> ExitStatus:
     """Accept arguments from the user, compute generate CSV file, and display the results."""
     args = parse_args()
-
-    fwf_spec = load_fwf_spec_file(args.spec_file)
-    generate_fwf_file(fwf_spec, args.n, args.fwf_file)
+    profile = (
+        contextlib.nullcontext()
+        if args.profile is None
+        else capture_profile(args.profile, args.profile_memory)
+    )
+    with profile:
+        __generate(args)
 
     print(f"Fixed width file is generated : {args.fwf_file}")
     return ExitStatus.success
 
 
+def __generate(args: argparse.Namespace) -> None:
+    cache_dir = None if args.no_spec_cache else args.spec_cache_dir
+    fwf_spec = load_fwf_spec_file(args.spec_file, cache_dir)
+    if args.workers > 1:
+        generate_fwf_file_parallel(fwf_spec, args.n, args.fwf_file, args.workers, args.seed)
+    elif args.bulk:
+        generate_fwf_file_bulk(fwf_spec, args.n, args.fwf_file, args.seed)
+    else:
+        random.seed(args.seed)
+        instrumentation = Instrumentation(__print_stats) if args.stats else None
+        generate_fwf_file(fwf_spec, args.n, args.fwf_file, instrumentation=instrumentation)
+        if instrumentation is not None:
+            instrumentation.finish()
+
+
+def __print_stats(stats: ThroughputStats) -> None:
+    print(stats.format(), file=sys.stderr)
+
+
 # Allow the script to be run standalone (useful during development in PyCharm).
 if __name__ == "__main__":
     sys.exit(main())
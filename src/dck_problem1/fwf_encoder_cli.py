@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+import argparse
+import pathlib
+import sys
+from typing import List
+
+from exitstatus import ExitStatus
+
+from dck_problem1.converter import convert_csv_file
+from dck_problem1.csv_file_writer import DEFAULT_BATCH_SIZE
+from dck_problem1.fixed_width_file_helper import OVERFLOW_POLICIES, FWFOverflow
+from dck_problem1.spec_file_loader import default_spec_cache_dir, load_spec_file
+
+# reported overflows printed to stderr, the rest is counted only
+MAX_PRINTED_OVERFLOWS = 20
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse user command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Generates fixed width file based on given CSV file.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--spec_file", type=pathlib.Path, required=True, help="Fixed width and CSV spec file path"
+    )
+    parser.add_argument(
+        "--spec_cache_dir",
+        type=pathlib.Path,
+        default=default_spec_cache_dir(),
+        help="Directory of validated specs cached by spec file content",
+    )
+    parser.add_argument(
+        "--no_spec_cache", action="store_true", help="Validate the spec file on every run"
+    )
+    parser.add_argument("--csv_file", type=pathlib.Path, required=True, help="CSV data file path")
+    parser.add_argument(
+        "--fwf_file", type=pathlib.Path, required=True, help="Output fixed width file path"
+    )
+    parser.add_argument(
+        "--overflow",
+        choices=OVERFLOW_POLICIES,
+        default="error",
+        help="Values longer than their column fail the conversion, are truncated, or are "
+        "truncated and reported to stderr",
+    )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Number of rows formatted and written at once",
+    )
+    args = parser.parse_args()
+    if args.batch_size <= 0:
+        parser.error("--batch_size should be > 0")
+    return args
+
+
+def main() -> ExitStatus:
+    """Accept arguments from the user, generate fixed width file, and display the results."""
+    args = parse_args()
+
+    cache_dir = None if args.no_spec_cache else args.spec_cache_dir
+    fwf_spec, csv_spec = load_spec_file(args.spec_file, cache_dir)
+    try:
+        overflows = convert_csv_file(
+            csv_spec, fwf_spec, args.csv_file, args.fwf_file, args.overflow, args.batch_size
+        )
+    except ValueError as e:
+        print(f"Fixed width file is not generated : {e}", file=sys.stderr)
+        return ExitStatus.failure
+    __print_overflows(overflows)
+
+    print(f"Fixed width file is generated : {args.fwf_file}")
+    return ExitStatus.success
+
+
+def __print_overflows(overflows: List[FWFOverflow]) -> None:
+    for overflow in overflows[:MAX_PRINTED_OVERFLOWS]:
+        print(
+            f"Truncated value {overflow.value!r} of column {overflow.column} "
+            f"in record {overflow.record}",
+            file=sys.stderr,
+        )
+    if overflows:
+        print(f"{len(overflows)} values are truncated", file=sys.stderr)
+
+
+# Allow the script to be run standalone (useful during development in PyCharm).
+if __name__ == "__main__":
+    sys.exit(main())
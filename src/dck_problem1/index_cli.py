@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+import argparse
+import pathlib
+import sys
+
+from exitstatus import ExitStatus
+
+from dck_problem1.fixed_width_file_helper import build_fwf_key_index
+from dck_problem1.spec_file_loader import default_spec_cache_dir, load_fwf_spec_file
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse user command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Builds key indexes of fixed width file columns for point lookups.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--spec_file", type=pathlib.Path, required=True, help="Fixed width spec file path"
+    )
+    parser.add_argument(
+        "--spec_cache_dir",
+        type=pathlib.Path,
+        default=default_spec_cache_dir(),
+        help="Directory of validated specs cached by spec file content",
+    )
+    parser.add_argument(
+        "--no_spec_cache", action="store_true", help="Validate the spec file on every run"
+    )
+    parser.add_argument(
+        "--fwf_file", type=pathlib.Path, required=True, help="Fixed width data file path"
+    )
+    parser.add_argument(
+        "--columns", nargs="+", required=True, help="Names of columns to build indexes for"
+    )
+    return parser.parse_args()
+
+
+def main() -> ExitStatus:
+    """Accept arguments from the user, build key indexes, and display the results."""
+    args = parse_args()
+
+    cache_dir = None if args.no_spec_cache else args.spec_cache_dir
+    fwf_spec = load_fwf_spec_file(args.spec_file, cache_dir)
+    for column in args.columns:
+        index_file = build_fwf_key_index(fwf_spec, args.fwf_file, column)
+        print(f"Key index is generated : {index_file}")
+
+    return ExitStatus.success
+
+
+# Allow the script to be run standalone (useful during development in PyCharm).
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+import contextlib
+import dataclasses
+import pathlib
+import time
+from typing import Callable, Dict, Iterator, Optional
+
+# stages of parsing, generation and writing timed by Instrumentation
+STAGES = ("read", "decode", "slice", "strip", "convert", "generate", "write")
+DEFAULT_REPORT_INTERVAL = 1.0
+MEMORY_SNAPSHOT_SUFFIX = ".tracemalloc"
+
+
+@dataclasses.dataclass
+class ThroughputStats:
+    """Counters and stage times collected by Instrumentation"""
+
+    seconds: float
+    rows_read: int
+    rows_written: int
+    bytes_read: int
+    bytes_written: int
+    # seconds spent in every stage, see STAGES
+    stage_seconds: Dict[str, float]
+
+    @property
+    def rows(self) -> int:
+        return max(self.rows_read, self.rows_written)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    @property
+    def read_mb_per_second(self) -> float:
+        return self.bytes_read / 1024 / 1024 / self.seconds if self.seconds else 0.0
+
+    @property
+    def write_mb_per_second(self) -> float:
+        return self.bytes_written / 1024 / 1024 / self.seconds if self.seconds else 0.0
+
+    def format(self) -> str:
+        """Formats the stats as a single line, e.g. for --stats
+
+        Returns:
+            str: rows/s, MB/s and the share of time of every stage
+        """
+        stages = ", ".join(
+            f"{stage} {seconds / self.seconds:.0%}"
+            for stage, seconds in self.stage_seconds.items()
+            if seconds and self.seconds
+        )
+        return (
+            f"{self.rows} rows in {self.seconds:.2f} s, {self.rows_per_second:,.0f} rows/s, "
+            f"read {self.read_mb_per_second:.2f} MB/s, write {self.write_mb_per_second:.2f} MB/s"
+            + (f" ({stages})" if stages else "")
+        )
+
+
+class Instrumentation:
+    """Counts rows and bytes and times the stages of parse_fwf_file, write_csv_file and
+    generate_fwf_file. Stages are timed per block of lines, so instrumented functions stay
+    close to their normal speed. Stats are reported to the callback every interval seconds
+    while rows are processed and once more by finish.
+
+    The same instance can be passed to a parser and a writer of one conversion.
+    """
+
+    def __init__(
+        self,
+        callback: Optional[Callable[[ThroughputStats], None]] = None,
+        interval: float = DEFAULT_REPORT_INTERVAL,
+    ):
+        self.__callback = callback
+        self.__interval = interval
+        self.__started = time.perf_counter()
+        self.__reported = self.__started
+        self.__stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self.rows_read = 0
+        self.rows_written = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        """Adds time spent in a stage
+
+        Args:
+            stage (str): stage name, see STAGES
+            seconds (float): time in seconds
+        """
+        self.__stage_seconds[stage] += seconds
+
+    def add_read(self, rows: int, size: int) -> None:
+        """Counts parsed rows and read bytes and reports the stats if the interval elapsed
+
+        Args:
+            rows (int): number of rows
+            size (int): number of bytes
+        """
+        self.rows_read += rows
+        self.bytes_read += size
+        self.__report_periodically()
+
+    def add_written(self, rows: int, size: int) -> None:
+        """Counts written rows and bytes and reports the stats if the interval elapsed
+
+        Args:
+            rows (int): number of rows
+            size (int): number of bytes
+        """
+        self.rows_written += rows
+        self.bytes_written += size
+        self.__report_periodically()
+
+    def stats(self) -> ThroughputStats:
+        """Returns the stats collected so far
+
+        Returns:
+            ThroughputStats: stats
+        """
+        return ThroughputStats(
+            time.perf_counter() - self.__started,
+            self.rows_read,
+            self.rows_written,
+            self.bytes_read,
+            self.bytes_written,
+            dict(self.__stage_seconds),
+        )
+
+    def finish(self) -> ThroughputStats:
+        """Reports the final stats to the callback
+
+        Returns:
+            ThroughputStats: final stats
+        """
+        stats = self.stats()
+        if self.__callback is not None:
+            self.__callback(stats)
+        return stats
+
+    def __report_periodically(self) -> None:
+        if self.__callback is None:
+            return
+        now = time.perf_counter()
+        if now - self.__reported >= self.__interval:
+            self.__reported = now
+            self.__callback(self.stats())
+
+
+@contextlib.contextmanager
+def timed(instrumentation: Instrumentation, stage: str) -> Iterator[None]:
+    """Adds time of the with block to a stage
+
+    Args:
+        instrumentation (Instrumentation): instrumentation
+        stage (str): stage name, see STAGES
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        instrumentation.add_time(stage, time.perf_counter() - started)
+
+
+@contextlib.contextmanager
+def capture_profile(profile_file: pathlib.Path, memory: bool = False) -> Iterator[None]:
+    """Profiles the with block with cProfile and dumps the stats into profile_file,
+    they can be read by pstats or snakeviz. Allocations are traced with tracemalloc
+    if memory is True, the snapshot is dumped into profile_file + .tracemalloc and can be
+    loaded by tracemalloc.Snapshot.load.
+
+    Args:
+        profile_file (pathlib.Path): path to profile stats file
+        memory (bool, optional): trace memory allocations, it slows the block down a lot.
+            Defaults to False.
+    """
+    # profilers are needed on demand only
+    import cProfile
+    import tracemalloc
+
+    if profile_file.parent:
+        profile_file.parent.mkdir(parents=True, exist_ok=True)
+    if memory:
+        tracemalloc.start()
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(str(profile_file))
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            snapshot.dump(str(profile_file) + MEMORY_SNAPSHOT_SUFFIX)
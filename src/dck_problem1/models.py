@@ -1,10 +1,11 @@
-import codecs
 import dataclasses
-from itertools import accumulate
-from typing import ClassVar, List
+from typing import List, Optional
 
-from marshmallow import Schema, ValidationError, fields, post_load, validate, validates_schema
-from marshmallow.decorators import validates
+# str, int, decimal with a decimal point, date as YYYYMMDD and fixed-point with implied scale
+DTYPES = ("str", "int", "decimal", "date", "fixed")
+DATE_LENGTH = 8
+# units of column offsets and lengths, bytes widths require an ascii compatible encoding
+WIDTH_UNITS = ("chars", "bytes")
 
 
 @dataclasses.dataclass
@@ -15,6 +16,7 @@ class FWFColumnSpec:
     offset: int
     length: int
     dtype: str = "str"
+    scale: int = 0
 
 
 @dataclasses.dataclass
@@ -24,6 +26,31 @@ class FWFSpec:
     columns: List[FWFColumnSpec]
     header: bool
     encoding: str
+    width_unit: str = "chars"
+
+    @property
+    def record_length(self) -> int:
+        """Length of a single record without line terminator"""
+        return max(col.offset + col.length for col in self.columns)
+
+    @property
+    def byte_widths(self) -> bool:
+        """True if column offsets and lengths are counted in bytes of encoded lines"""
+        return self.width_unit == "bytes"
+
+    def select_columns(self, names: Optional[List[str]] = None) -> List[FWFColumnSpec]:
+        """Selects columns by name in the given order, all columns if names is None
+
+        Raises:
+            ValueError: if a column is not found
+        """
+        if names is None:
+            return self.columns
+        columns_by_name = {col.name: col for col in self.columns}
+        for name in names:
+            if name not in columns_by_name:
+                raise ValueError(f"Column {name} not found")
+        return [columns_by_name[name] for name in names]
 
 
 @dataclasses.dataclass
@@ -35,71 +62,3 @@ class CSVSpec:
     encoding: str
     delimiter: str = ","
     quotechar = '"'
-
-
-class FWFSpecSchema(Schema):
-    __COLUMN_NAMES_MAX_LEN: ClassVar[int] = 128
-    __OFFSETS_MAX_LEN: ClassVar[int] = 128
-    __COLUMN_MAX_LEN: ClassVar[int] = 128
-
-    header = fields.Boolean(data_key="IncludeHeader", required=True)
-
-    encoding = fields.Str(data_key="FixedWidthEncoding", required=True)
-
-    column_lengths = fields.List(
-        fields.Int(validate=validate.Range(min=1, max=__COLUMN_MAX_LEN)),
-        data_key="Offsets",
-        required=True,
-        validate=validate.Length(min=1, max=__OFFSETS_MAX_LEN),
-    )
-
-    column_names = fields.List(
-        fields.Str(),
-        data_key="ColumnNames",
-        required=True,
-        validate=validate.Length(min=1, max=__COLUMN_NAMES_MAX_LEN),
-    )
-
-    @validates_schema
-    def validate_schema(self, data, **kwargs):
-        if len(data["column_names"]) != len(data["column_lengths"]):
-            raise ValidationError("Offsets length must be the same as ColumnNames length")
-
-    @validates("encoding")
-    def validate_encoding(self, encoding, **kwargs):
-        try:
-            codecs.lookup(encoding)
-        except LookupError:
-            raise ValidationError(f"Encoding {encoding} not found")
-
-    @post_load
-    def make_fwf_spec(self, data, **kwargs):
-        # calculate collumn offsets, starts with 0
-        column_offsets = [0] + list(accumulate(data["column_lengths"]))[:-1]
-        # convert into a list of FixedWidthColumnSpec
-        spec_values = zip(data["column_names"], column_offsets, data["column_lengths"])
-        columns = [FWFColumnSpec(*col) for col in spec_values]
-        return FWFSpec(header=data["header"], encoding=data["encoding"], columns=columns)
-
-
-class CSVSpecSchema(Schema):
-    __COLUMN_NAMES_MAX_LEN: ClassVar[int] = 128
-    header = fields.Boolean(data_key="IncludeHeader", required=True)
-    encoding = fields.Str(data_key="DelimitedEncoding", required=True)
-    column_names = fields.List(
-        fields.Str(),
-        data_key="ColumnNames",
-        required=True,
-        validate=validate.Length(min=1, max=__COLUMN_NAMES_MAX_LEN),
-    )
-
-    @validates("encoding")
-    def validate_encoding(self, encoding, **kwargs):
-        try:
-            codecs.lookup(encoding)
-        except LookupError:
-            raise ValidationError(f"Encoding {encoding} not found")
-
-    @post_load
-    def make_csv_spec(self, data, **kwargs):
-        return CSVSpec(**data)
@@ -1,8 +1,25 @@
+import datetime
 import random as rnd
 import string
 
 from dck_problem1.models import FWFColumnSpec
 
+__MIN_DATE = datetime.date(1970, 1, 1).toordinal()
+__MAX_DATE = datetime.date(2099, 12, 31).toordinal()
+
+# byte values drawn in bulk are mapped to letters and digits, values above the largest
+# multiple of the alphabet size are rejected, so every letter and digit is equally likely
+__LOWERCASE_TABLE = bytes.maketrans(
+    bytes(range(256)),
+    bytes(ord(string.ascii_lowercase[i % len(string.ascii_lowercase)]) for i in range(256)),
+)
+__LOWERCASE_REJECTED = bytes(range(256 - 256 % len(string.ascii_lowercase), 256))
+__DIGITS_TABLE = bytes.maketrans(
+    bytes(range(256)),
+    bytes(ord(string.digits[i % len(string.digits)]) for i in range(256)),
+)
+__DIGITS_REJECTED = bytes(range(256 - 256 % len(string.digits), 256))
+
 
 def __rnd_str(length=1) -> str:
     return "".join(rnd.choice(string.ascii_lowercase) for _ in range(length))
@@ -12,8 +29,35 @@ def __rnd_fwf_str(column_spec: FWFColumnSpec) -> str:
     return __rnd_str(column_spec.length)
 
 
+def __rnd_fwf_int(column_spec: FWFColumnSpec) -> str:
+    return str(rnd.randrange(10**column_spec.length)).rjust(column_spec.length)
+
+
+def __rnd_fwf_decimal(column_spec: FWFColumnSpec) -> str:
+    # keep room for the decimal point
+    digits = column_spec.length - 1 if column_spec.scale else column_spec.length
+    value = rnd.randrange(10**digits)
+    if column_spec.scale:
+        integer_part, fraction = divmod(value, 10**column_spec.scale)
+        return f"{integer_part}.{fraction:0{column_spec.scale}d}".rjust(column_spec.length)
+    return str(value).rjust(column_spec.length)
+
+
+def __rnd_fwf_date(column_spec: FWFColumnSpec) -> str:
+    date = datetime.date.fromordinal(rnd.randint(__MIN_DATE, __MAX_DATE))
+    return date.strftime("%Y%m%d").ljust(column_spec.length)
+
+
+def __rnd_fwf_fixed(column_spec: FWFColumnSpec) -> str:
+    return str(rnd.randrange(10**column_spec.length)).zfill(column_spec.length)
+
+
 __RND_VALUES_GENERATOR_BY_TYPE = {
     "str": __rnd_fwf_str,
+    "int": __rnd_fwf_int,
+    "decimal": __rnd_fwf_decimal,
+    "date": __rnd_fwf_date,
+    "fixed": __rnd_fwf_fixed,
 }
 
 
@@ -32,3 +76,43 @@ def rnd_fwf_value(column_spec: FWFColumnSpec) -> str:
     """
     rnd_generator = __RND_VALUES_GENERATOR_BY_TYPE.get(column_spec.dtype, __unexpected_data_type)
     return rnd_generator(column_spec)
+
+
+def rnd_lowercase_bytes(generator: rnd.Random, size: int) -> bytearray:
+    """Generates random ascii lowercase letters in bulk
+
+    Args:
+        generator (random.Random): random numbers generator
+        size (int): number of letters
+
+    Returns:
+        bytearray: ascii encoded random letters
+    """
+    return __rnd_alphabet_bytes(generator, size, __LOWERCASE_TABLE, __LOWERCASE_REJECTED)
+
+
+def rnd_digit_bytes(generator: rnd.Random, size: int) -> bytearray:
+    """Generates random ascii digits in bulk
+
+    Args:
+        generator (random.Random): random numbers generator
+        size (int): number of digits
+
+    Returns:
+        bytearray: ascii encoded random digits
+    """
+    return __rnd_alphabet_bytes(generator, size, __DIGITS_TABLE, __DIGITS_REJECTED)
+
+
+def __rnd_alphabet_bytes(
+    generator: rnd.Random, size: int, table: bytes, rejected: bytes
+) -> bytearray:
+    result = bytearray()
+    while len(result) < size:
+        missing = size - len(result)
+        # a few more bytes are drawn than needed, rejected ones are deleted by translate
+        count = missing + missing // 8 + 16
+        random_bytes = generator.getrandbits(count * 8).to_bytes(count, "little")
+        result += random_bytes.translate(table, rejected)
+    del result[size:]
+    return result
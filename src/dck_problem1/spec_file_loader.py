@@ -1,11 +1,73 @@
+import dataclasses
+import json
+import os
 import pathlib
+from typing import Any, Callable, Dict, Optional, Tuple
+import zlib
 
-from dck_problem1.models import CSVSpec, CSVSpecSchema, FWFSpec, FWFSpecSchema
+from dck_problem1.models import CSVSpec, FWFColumnSpec, FWFSpec
 
+# bump when cached specs or their validation change, old cache files are ignored
+__CACHE_FORMAT = b"4"
 
-def load_csv_spec_file(spec_path: pathlib.Path) -> CSVSpec:
-    with open(spec_path, "r") as f:
-        return load_csv_spec_json(f.read())
+
+def default_spec_cache_dir() -> pathlib.Path:
+    """Directory of compiled spec cache, $XDG_CACHE_HOME/dck_problem1 or ~/.cache/dck_problem1
+
+    Returns:
+        pathlib.Path: cache directory
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or pathlib.Path.home() / ".cache"
+    return pathlib.Path(cache_home) / "dck_problem1"
+
+
+def load_spec_file(
+    spec_path: pathlib.Path, cache_dir: Optional[pathlib.Path] = None
+) -> Tuple[FWFSpec, CSVSpec]:
+    """Loads Fixed Width File and CSV file specs from a single spec file.
+       The file is read and parsed once, see load_spec_json.
+
+    Args:
+        spec_path (pathlib.Path): spec file path
+        cache_dir (Optional[pathlib.Path], optional): directory of compiled spec cache,
+            see default_spec_cache_dir. The cache is not used if None. Defaults to None.
+
+    Returns:
+        Tuple[FWFSpec, CSVSpec]: Fixed width file spec and CSV file spec
+    """
+    return __load_cached(
+        spec_path,
+        b"fwf+csv",
+        load_spec_json,
+        lambda data: (__fwf_spec_from_dict(data[0]), CSVSpec(**data[1])),
+        cache_dir,
+    )
+
+
+def load_spec_json(spec_json: str) -> Tuple[FWFSpec, CSVSpec]:
+    """Loads Fixed Width File and CSV file specs from json string.
+       Uses marchmallow package to validate json, the json is parsed once
+
+    Args:
+        spec_json (str): json string
+
+    Returns:
+        Tuple[FWFSpec, CSVSpec]: Fixed width file spec and CSV file spec
+    """
+    from dck_problem1.spec_schemas import CSVSpecSchema, FWFSpecSchema
+
+    data = json.loads(spec_json)
+    fwf_spec = FWFSpecSchema(unknown="EXCLUDE").load(data)
+    csv_spec = CSVSpecSchema(unknown="EXCLUDE").load(data)
+    return fwf_spec, csv_spec
+
+
+def load_csv_spec_file(
+    spec_path: pathlib.Path, cache_dir: Optional[pathlib.Path] = None
+) -> CSVSpec:
+    return __load_cached(
+        spec_path, b"csv", load_csv_spec_json, lambda data: CSVSpec(**data), cache_dir
+    )
 
 
 def load_csv_spec_json(spec_json: str) -> CSVSpec:
@@ -18,13 +80,16 @@ def load_csv_spec_json(spec_json: str) -> CSVSpec:
     Returns:
         CSVSpec: CSV file spec
     """
+    from dck_problem1.spec_schemas import CSVSpecSchema
+
     schema = CSVSpecSchema(unknown="EXCLUDE")
     return schema.loads(spec_json)
 
 
-def load_fwf_spec_file(spec_path: pathlib.Path) -> FWFSpec:
-    with open(spec_path, "r") as f:
-        return load_fwf_spec_json(f.read())
+def load_fwf_spec_file(
+    spec_path: pathlib.Path, cache_dir: Optional[pathlib.Path] = None
+) -> FWFSpec:
+    return __load_cached(spec_path, b"fwf", load_fwf_spec_json, __fwf_spec_from_dict, cache_dir)
 
 
 def load_fwf_spec_json(spec_json: str) -> FWFSpec:
@@ -37,5 +102,59 @@ def load_fwf_spec_json(spec_json: str) -> FWFSpec:
     Returns:
         FWFSpec: Fixed width file spec
     """
+    from dck_problem1.spec_schemas import FWFSpecSchema
+
     schema = FWFSpecSchema(unknown="EXCLUDE")
     return schema.loads(spec_json)
+
+
+def __fwf_spec_from_dict(data: Dict[str, Any]) -> FWFSpec:
+    columns = [FWFColumnSpec(**col) for col in data["columns"]]
+    return FWFSpec(**{**data, "columns": columns})
+
+
+def __spec_to_dict(specs: Any) -> Any:
+    if isinstance(specs, tuple):
+        return [dataclasses.asdict(spec) for spec in specs]
+    return dataclasses.asdict(specs)
+
+
+def __load_cached(
+    spec_path: pathlib.Path,
+    kind: bytes,
+    load_json: Callable[[str], Any],
+    from_dict: Callable[[Any], Any],
+    cache_dir: Optional[pathlib.Path],
+) -> Any:
+    with open(spec_path, "rb") as f:
+        content = f.read()
+    text = content.decode()
+    if cache_dir is None:
+        return load_json(text)
+    # validated specs are cached by content as plain json data, so the schemas are not
+    # needed on a hit. The key is crc32 of the content and its length, crc32 avoids
+    # importing hashlib, the cached content is compared to rule out collisions
+    key = zlib.crc32(content, zlib.crc32(__CACHE_FORMAT + b":" + kind))
+    cache_file = cache_dir / f"{key:08x}-{len(content):x}.json"
+    try:
+        with open(cache_file, encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached["content"] == text:
+            return from_dict(cached["specs"])
+    except (OSError, ValueError, TypeError, KeyError, IndexError):
+        # missing, partial or stale cache file
+        pass
+    specs = load_json(text)
+    try:
+        import tempfile
+
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # write and rename, so concurrent runs never read a partial cache file
+        fd, tmp_name = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"content": text, "specs": __spec_to_dict(specs)}, f)
+        os.replace(tmp_name, cache_file)
+    except OSError:
+        # cache is an optimization, a read-only cache directory is not an error
+        pass
+    return specs
@@ -0,0 +1,122 @@
+import codecs
+from itertools import accumulate
+from typing import ClassVar
+
+from marshmallow import Schema, ValidationError, fields, post_load, validate, validates_schema
+from marshmallow.decorators import validates
+
+from dck_problem1.encoding_helper import is_ascii_compatible_encoding
+from dck_problem1.models import DATE_LENGTH, DTYPES, WIDTH_UNITS, CSVSpec, FWFColumnSpec, FWFSpec
+
+
+class FWFSpecSchema(Schema):
+    __COLUMN_NAMES_MAX_LEN: ClassVar[int] = 128
+    __OFFSETS_MAX_LEN: ClassVar[int] = 128
+    __COLUMN_MAX_LEN: ClassVar[int] = 128
+
+    header = fields.Boolean(data_key="IncludeHeader", required=True)
+
+    encoding = fields.Str(data_key="FixedWidthEncoding", required=True)
+
+    width_unit = fields.Str(data_key="WidthUnit", validate=validate.OneOf(WIDTH_UNITS))
+
+    column_lengths = fields.List(
+        fields.Int(validate=validate.Range(min=1, max=__COLUMN_MAX_LEN)),
+        data_key="Offsets",
+        required=True,
+        validate=validate.Length(min=1, max=__OFFSETS_MAX_LEN),
+    )
+
+    column_names = fields.List(
+        fields.Str(),
+        data_key="ColumnNames",
+        required=True,
+        validate=validate.Length(min=1, max=__COLUMN_NAMES_MAX_LEN),
+    )
+
+    column_types = fields.List(fields.Str(validate=validate.OneOf(DTYPES)), data_key="ColumnTypes")
+
+    column_scales = fields.List(
+        fields.Int(validate=validate.Range(min=0, max=__COLUMN_MAX_LEN)), data_key="ColumnScales"
+    )
+
+    @validates_schema
+    def validate_schema(self, data, **kwargs):
+        if len(data["column_names"]) != len(data["column_lengths"]):
+            raise ValidationError("Offsets length must be the same as ColumnNames length")
+        column_types = data.get("column_types", ["str"] * len(data["column_lengths"]))
+        if len(column_types) != len(data["column_lengths"]):
+            raise ValidationError("ColumnTypes length must be the same as ColumnNames length")
+        column_scales = data.get("column_scales", [0] * len(data["column_lengths"]))
+        if len(column_scales) != len(data["column_lengths"]):
+            raise ValidationError("ColumnScales length must be the same as ColumnNames length")
+        for name, length, dtype, scale in zip(
+            data["column_names"], data["column_lengths"], column_types, column_scales
+        ):
+            if dtype == "date" and length < DATE_LENGTH:
+                raise ValidationError(f"Date column {name} length must be >= {DATE_LENGTH}")
+            # decimal values keep an integer digit and the decimal point, fixed values may
+            # have only fraction digits
+            if dtype == "decimal" and scale and scale >= length - 1:
+                raise ValidationError(f"Decimal column {name} scale must be < length - 1")
+            if dtype == "fixed" and scale > length:
+                raise ValidationError(f"Fixed column {name} scale must be <= length")
+            if dtype not in ("decimal", "fixed") and scale:
+                raise ValidationError(f"Column {name} of type {dtype} must have scale 0")
+        if data.get("width_unit") == "bytes" and not is_ascii_compatible_encoding(
+            data["encoding"]
+        ):
+            raise ValidationError(
+                f"WidthUnit bytes requires an ascii compatible encoding, not {data['encoding']}"
+            )
+
+    @validates("encoding")
+    def validate_encoding(self, encoding, **kwargs):
+        try:
+            codecs.lookup(encoding)
+        except LookupError:
+            raise ValidationError(f"Encoding {encoding} not found")
+
+    @post_load
+    def make_fwf_spec(self, data, **kwargs):
+        # calculate collumn offsets, starts with 0
+        column_offsets = [0] + list(accumulate(data["column_lengths"]))[:-1]
+        # convert into a list of FixedWidthColumnSpec
+        number_of_columns = len(data["column_lengths"])
+        spec_values = zip(
+            data["column_names"],
+            column_offsets,
+            data["column_lengths"],
+            data.get("column_types", ["str"] * number_of_columns),
+            data.get("column_scales", [0] * number_of_columns),
+        )
+        columns = [FWFColumnSpec(*col) for col in spec_values]
+        return FWFSpec(
+            header=data["header"],
+            encoding=data["encoding"],
+            columns=columns,
+            width_unit=data.get("width_unit", "chars"),
+        )
+
+
+class CSVSpecSchema(Schema):
+    __COLUMN_NAMES_MAX_LEN: ClassVar[int] = 128
+    header = fields.Boolean(data_key="IncludeHeader", required=True)
+    encoding = fields.Str(data_key="DelimitedEncoding", required=True)
+    column_names = fields.List(
+        fields.Str(),
+        data_key="ColumnNames",
+        required=True,
+        validate=validate.Length(min=1, max=__COLUMN_NAMES_MAX_LEN),
+    )
+
+    @validates("encoding")
+    def validate_encoding(self, encoding, **kwargs):
+        try:
+            codecs.lookup(encoding)
+        except LookupError:
+            raise ValidationError(f"Encoding {encoding} not found")
+
+    @post_load
+    def make_csv_spec(self, data, **kwargs):
+        return CSVSpec(**data)
@@ -0,0 +1,109 @@
+import pathlib
+import queue
+import sys
+import threading
+from typing import Any, BinaryIO, Generator, Iterable, Tuple, TypeVar
+
+STDIO_PATH = "-"
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+DEFAULT_QUEUE_SIZE = 8
+__PUT_TIMEOUT = 0.1
+
+T = TypeVar("T")
+
+
+def is_stdio_path(path: pathlib.Path) -> bool:
+    """Checks if the path stands for stdin or stdout
+
+    Args:
+        path (pathlib.Path): path given by user
+
+    Returns:
+        bool: True if the path is "-"
+    """
+    return str(path) == STDIO_PATH
+
+
+def open_stdin(buffer_size: int = DEFAULT_BUFFER_SIZE) -> BinaryIO:
+    """Opens binary stdin with a large buffer. The stream should not be closed.
+
+    Args:
+        buffer_size (int, optional): buffer size. Defaults to DEFAULT_BUFFER_SIZE.
+
+    Returns:
+        BinaryIO: binary stdin
+    """
+    try:
+        return open(sys.stdin.fileno(), "rb", buffer_size, closefd=False)
+    except (AttributeError, OSError, ValueError):
+        # stdin replaced by an in-memory stream, e.g. in tests
+        return sys.stdin.buffer
+
+
+def open_stdout(buffer_size: int = DEFAULT_BUFFER_SIZE) -> BinaryIO:
+    """Opens binary stdout with a large buffer. The stream should be flushed, but not closed.
+
+    Args:
+        buffer_size (int, optional): buffer size. Defaults to DEFAULT_BUFFER_SIZE.
+
+    Returns:
+        BinaryIO: binary stdout
+    """
+    sys.stdout.flush()
+    try:
+        return open(sys.stdout.fileno(), "wb", buffer_size, closefd=False)
+    except (AttributeError, OSError, ValueError):
+        # stdout replaced by an in-memory stream, e.g. in tests
+        return sys.stdout.buffer
+
+
+def __put(items: "queue.Queue[Tuple[bool, Any]]", item: Tuple[bool, Any], stop: threading.Event):
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=__PUT_TIMEOUT)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def threaded_iterator(
+    iterable: Iterable[T], queue_size: int = DEFAULT_QUEUE_SIZE
+) -> Generator[T, None, None]:
+    """Iterates over iterable in a separate thread.
+       Items are passed through a bounded queue, so the producer waits for a slow consumer.
+       Exceptions raised by the iterable are raised by the returned iterator. Closing the
+       returned generator stops the producer thread.
+
+    Args:
+        iterable (Iterable[T]): items source
+        queue_size (int, optional): max number of items waiting in the queue.
+            Defaults to DEFAULT_QUEUE_SIZE.
+
+    Yields:
+        Generator[T, None, None]: items of the iterable in the same order
+    """
+    items: "queue.Queue[Tuple[bool, Any]]" = queue.Queue(queue_size)
+    stop = threading.Event()
+
+    def produce() -> None:
+        try:
+            for item in iterable:
+                if not __put(items, (True, item), stop):
+                    return
+            __put(items, (False, None), stop)
+        except BaseException as e:
+            __put(items, (False, e), stop)
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            has_item, item = items.get()
+            if not has_item:
+                if item is not None:
+                    raise item
+                return
+            yield item
+    finally:
+        # let the producer finish if the consumer stops early
+        stop.set()
@@ -0,0 +1,124 @@
+import codecs
+import re
+from typing import Optional, Pattern
+
+from dck_problem1.encoding_helper import (
+    UNDEFINED_CHAR,
+    is_ascii_compatible_encoding,
+    single_byte_decoding_table,
+)
+
+
+class Transcoder:
+    """Decodes, encodes and transcodes large blocks of bytes between a source and a target
+    encoding, e.g. from a fixed width file encoding to a CSV file encoding.
+
+    Fast paths are chosen once for the pair of encodings:
+
+    * blocks of identical encodings are passed through,
+    * ASCII-only blocks of ASCII compatible encodings are passed through without a copy
+      and decoded and encoded by the ascii codec,
+    * single-byte source encodings are decoded by a precomputed decoding table and
+      translated by bytes.translate if every character has a single byte in the target.
+
+    Multi-byte source blocks are decoded by an incremental decoder, so a character may be
+    split between blocks. Errors are raised like by the codecs.
+
+    Args:
+        source_encoding (str): encoding of decoded and transcoded blocks
+        target_encoding (str): encoding of encoded and transcoded blocks
+    """
+
+    def __init__(self, source_encoding: str, target_encoding: str):
+        self.__source = codecs.lookup(source_encoding).name
+        self.__target = codecs.lookup(target_encoding).name
+        self.__ascii_passthrough = is_ascii_compatible_encoding(
+            self.__source
+        ) and is_ascii_compatible_encoding(self.__target)
+        self.__decoder = codecs.getincrementaldecoder(self.__source)()
+        self.__encoder = codecs.getincrementalencoder(self.__target)()
+        self.__decoding_table = single_byte_decoding_table(self.__source)
+        self.__undefined: Optional[Pattern[bytes]] = None
+        self.__translation: Optional[bytes] = None
+        if self.__decoding_table is not None:
+            undefined = bytes(
+                b for b, char in enumerate(self.__decoding_table) if char == UNDEFINED_CHAR
+            )
+            if undefined:
+                self.__undefined = re.compile(b"[" + re.escape(undefined) + b"]")
+            self.__translation = self.__translation_table(self.__decoding_table)
+
+    @property
+    def ascii_passthrough(self) -> bool:
+        """True if ASCII text has the same bytes in both encodings"""
+        return self.__ascii_passthrough
+
+    @property
+    def byte_translation(self) -> bool:
+        """True if transcode translates every defined source byte into a single target byte"""
+        return self.__translation is not None
+
+    def decode(self, block: bytes, final: bool = False) -> str:
+        """Decodes a block of source bytes
+
+        Args:
+            block (bytes): source bytes
+            final (bool, optional): True for the last block. Defaults to False.
+
+        Returns:
+            str: decoded text
+        """
+        if self.__decoding_table is not None:
+            return codecs.charmap_decode(block, "strict", self.__decoding_table)[0]
+        if self.__ascii_passthrough and block.isascii() and not self.__decoder.getstate()[0]:
+            return block.decode("ascii")
+        return self.__decoder.decode(block, final)
+
+    def encode(self, text: str, final: bool = False) -> bytes:
+        """Encodes text into target bytes
+
+        Args:
+            text (str): text
+            final (bool, optional): True for the last block. Defaults to False.
+
+        Returns:
+            bytes: target bytes
+        """
+        if self.__ascii_passthrough and text.isascii():
+            return text.encode("ascii")
+        return self.__encoder.encode(text, final)
+
+    def transcode(self, block: bytes, final: bool = False) -> bytes:
+        """Transcodes a block of source bytes into target bytes
+
+        Args:
+            block (bytes): source bytes
+            final (bool, optional): True for the last block. Defaults to False.
+
+        Returns:
+            bytes: target bytes, the block itself if it is passed through
+        """
+        if self.__source == self.__target:
+            return block
+        if self.__ascii_passthrough and block.isascii() and not self.__decoder.getstate()[0]:
+            return block
+        if self.__translation is not None:
+            if self.__undefined is not None and self.__undefined.search(block):
+                # raises the error of the codec
+                self.decode(block)
+            return block.translate(self.__translation)
+        return self.encode(self.decode(block, final), final)
+
+    def __translation_table(self, decoding_table: str) -> Optional[bytes]:
+        table = bytearray(range(256))
+        for b, char in enumerate(decoding_table):
+            if char == UNDEFINED_CHAR:
+                continue
+            try:
+                encoded = char.encode(self.__target)
+            except UnicodeEncodeError:
+                return None
+            if len(encoded) != 1:
+                return None
+            table[b] = encoded[0]
+        return bytes(table)
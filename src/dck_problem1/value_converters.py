@@ -0,0 +1,73 @@
+import datetime
+from decimal import Decimal
+from typing import Any, Callable, List, Optional
+
+from dck_problem1.models import FWFColumnSpec, FWFSpec
+
+
+def __to_int(value: str) -> Optional[int]:
+    return int(value) if value else None
+
+
+def __to_decimal(value: str) -> Optional[Decimal]:
+    return Decimal(value) if value else None
+
+
+def __to_date(value: str) -> Optional[datetime.date]:
+    # YYYYMMDD, slicing is much faster than datetime.strptime
+    return datetime.date(int(value[0:4]), int(value[4:6]), int(value[6:8])) if value else None
+
+
+def __fixed_converter(column_spec: FWFColumnSpec) -> Callable[[str], Optional[Decimal]]:
+    exponent = -column_spec.scale
+
+    def to_fixed(value: str) -> Optional[Decimal]:
+        return Decimal(value).scaleb(exponent) if value else None
+
+    return to_fixed
+
+
+__CONVERTER_BY_TYPE = {
+    "str": lambda column_spec: str,
+    "int": lambda column_spec: __to_int,
+    "decimal": lambda column_spec: __to_decimal,
+    "date": lambda column_spec: __to_date,
+    "fixed": __fixed_converter,
+}
+
+
+def __unexpected_data_type(column_spec: FWFColumnSpec):
+    raise ValueError(f"Unexpected datatype {column_spec.dtype} for column {column_spec.name}")
+
+
+def fwf_value_converter(column_spec: FWFColumnSpec) -> Callable[[str], Any]:
+    """Creates converter of stripped column values according to column dtype.
+       Empty values of non str columns are converted to None.
+
+    Args:
+        column_spec (FWFColumnSpec): column spec
+
+    Raises:
+        ValueError: if the column dtype is not supported
+
+    Returns:
+        Callable[[str], Any]: converter
+    """
+    converter_factory = __CONVERTER_BY_TYPE.get(column_spec.dtype, __unexpected_data_type)
+    return converter_factory(column_spec)
+
+
+def fwf_value_converters(
+    spec: FWFSpec, columns: Optional[List[str]] = None
+) -> List[Callable[[str], Any]]:
+    """Creates converters for columns of the spec
+
+    Args:
+        spec (FWFSpec): Fixed width file spec
+        columns (Optional[List[str]], optional): names of projected columns,
+            all columns if None. Defaults to None.
+
+    Returns:
+        List[Callable[[str], Any]]: converters in spec order or in the order of columns
+    """
+    return [fwf_value_converter(col) for col in spec.select_columns(columns)]
@@ -0,0 +1,137 @@
+import asyncio
+import concurrent.futures
+import gzip
+import random as rnd
+import string
+
+import pytest
+
+from dck_problem1.async_converter import convert_fwf_to_csv
+from dck_problem1.csv_file_writer import write_csv_file
+from dck_problem1.fixed_width_file_helper import equals_predicate, parse_fwf_file
+from dck_problem1.models import CSVSpec, FWFColumnSpec, FWFSpec
+
+
+def __rnd_filename(ext, length=10) -> str:
+    return "".join(rnd.choice(string.ascii_lowercase) for _ in range(length)) + ext
+
+
+def __fwf_spec(header: bool = True) -> FWFSpec:
+    return FWFSpec(
+        [FWFColumnSpec("a", 0, 4), FWFColumnSpec("b", 4, 3), FWFColumnSpec("c", 7, 5)],
+        header,
+        "utf-8",
+    )
+
+
+def __write_fwf_file(path, spec: FWFSpec, number_of_lines: int) -> None:
+    with open(path, "w", encoding=spec.encoding, newline="") as f:
+        if spec.header:
+            f.write("a   b  c    \r\n")
+        f.writelines(f"{i:<4}{i % 7:<3}é{i:>4}\r\n" for i in range(number_of_lines))
+
+
+@pytest.mark.parametrize("csv_encoding", ["utf-8", "utf-16", "utf-8-sig"])
+@pytest.mark.parametrize("header", [True, False])
+def test_convert_fwf_to_csv(tmp_path, header, csv_encoding) -> None:
+    # given fixed width file with multi-byte characters and crlf line terminators
+    fwf_spec = __fwf_spec(header)
+    csv_spec = CSVSpec(["a", "b", "c"], header, csv_encoding)
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    __write_fwf_file(fwf_file, fwf_spec, 500)
+    expected_file = tmp_path / __rnd_filename(".csv")
+    write_csv_file(csv_spec, parse_fwf_file(fwf_spec, fwf_file), expected_file)
+    csv_file = tmp_path / __rnd_filename(".csv")
+
+    # when blocks split lines and multi-byte characters
+    asyncio.run(convert_fwf_to_csv(fwf_spec, csv_spec, fwf_file, csv_file, block_size=101))
+
+    # then
+    assert csv_file.read_bytes() == expected_file.read_bytes()
+
+
+def test_convert_fwf_to_csv_byte_widths(tmp_path) -> None:
+    # given utf-8 fwf file where "é" takes 2 of 3 bytes of column b
+    fwf_spec = FWFSpec(
+        [FWFColumnSpec("a", 0, 4), FWFColumnSpec("b", 4, 3), FWFColumnSpec("c", 7, 4)],
+        True,
+        "utf-8",
+        "bytes",
+    )
+    csv_spec = CSVSpec(["a", "b", "c"], True, "utf-8")
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    with open(fwf_file, "wb") as f:
+        f.write(b"a   b  c   \r\n")
+        f.writelines(f"{i:<4}é{i % 7}{i:>4}\r\n".encode() for i in range(500))
+    expected_file = tmp_path / __rnd_filename(".csv")
+    write_csv_file(csv_spec, parse_fwf_file(fwf_spec, fwf_file), expected_file)
+    csv_file = tmp_path / __rnd_filename(".csv")
+
+    # when blocks split lines and multi-byte characters
+    asyncio.run(convert_fwf_to_csv(fwf_spec, csv_spec, fwf_file, csv_file, block_size=101))
+
+    # then
+    assert csv_file.read_bytes() == expected_file.read_bytes()
+    assert csv_file.read_text(encoding="utf-8").splitlines()[1] == "0,é0,0"
+
+
+def test_convert_fwf_to_csv_concurrently(tmp_path) -> None:
+    # given plain and compressed fixed width files
+    fwf_spec = __fwf_spec()
+    csv_spec = CSVSpec(["a", "c"], True, "utf-8")
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    __write_fwf_file(fwf_file, fwf_spec, 100)
+    gzip_file = tmp_path / __rnd_filename(".txt.gz")
+    gzip_file.write_bytes(gzip.compress(fwf_file.read_bytes()))
+    csv_files = [tmp_path / __rnd_filename(".csv") for _ in range(2)]
+    where = {"b": equals_predicate("3")}
+    expected = "a,c\r\n" + "".join(f"{i},é{i:>4}\r\n" for i in range(3, 100, 7))
+
+    # when both conversions share the loop and conversion runs in a process pool
+    async def convert_both() -> None:
+        with concurrent.futures.ProcessPoolExecutor(2) as executor:
+            await asyncio.gather(
+                *(
+                    convert_fwf_to_csv(
+                        fwf_spec,
+                        csv_spec,
+                        input_file,
+                        csv_file,
+                        block_size=64,
+                        columns=["a", "c"],
+                        where=where,
+                        executor=executor,
+                    )
+                    for input_file, csv_file in zip([fwf_file, gzip_file], csv_files)
+                )
+            )
+
+    asyncio.run(convert_both())
+
+    # then
+    for csv_file in csv_files:
+        assert csv_file.read_text(encoding="utf-8") == expected.replace("\r\n", "\n")
+
+
+def test_convert_fwf_to_csv_cancel(tmp_path) -> None:
+    # given large fixed width file
+    fwf_spec = __fwf_spec()
+    csv_spec = CSVSpec(["a", "b", "c"], True, "utf-8")
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    __write_fwf_file(fwf_file, fwf_spec, 100_000)
+    csv_file = tmp_path / __rnd_filename(".csv")
+
+    # when cancelled while converting
+    async def convert_and_cancel() -> None:
+        task = asyncio.ensure_future(
+            convert_fwf_to_csv(fwf_spec, csv_spec, fwf_file, csv_file, block_size=1024)
+        )
+        while not csv_file.exists():
+            await asyncio.sleep(0.001)
+        task.cancel()
+        await task
+
+    # then
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(convert_and_cancel())
+    assert csv_file.stat().st_size < fwf_file.stat().st_size
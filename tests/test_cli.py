@@ -1,16 +1,34 @@
-# import pytest
+import gzip
+import io
+import json
+import lzma
+import os
 import random as rnd
+import shutil
 import string
+import subprocess
 import sys
 
+import pytest
+
+import dck_problem1.benchmark_cli as benchmark_cli
+from dck_problem1.columnar_file_helper import ColumnarReader
 import dck_problem1.csv_cli as csv_cli
 import dck_problem1.fwf_cli as fwf_cli
+import dck_problem1.fwf_encoder_cli as fwf_encoder_cli
+import dck_problem1.index_cli as index_cli
 
 
 def __rnd_filename(ext, length=10) -> str:
     return "".join(rnd.choice(string.ascii_lowercase) for _ in range(length)) + ext
 
 
+@pytest.fixture(autouse=True)
+def spec_cache_home(tmp_path, monkeypatch) -> None:
+    # keep compiled specs of tests out of the user cache
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
 def test_fwf_cli(tmp_path) -> None:
     # given
     fwf_file = tmp_path / __rnd_filename(".txt")
@@ -53,3 +71,638 @@ def test_csv_cli(tmp_path) -> None:
     with open(csv_file) as f:
         lines = f.readlines()
     assert len(lines) == 3
+
+
+def test_csv_cli_workers(tmp_path) -> None:
+    # given
+    csv_file = tmp_path / __rnd_filename(".csv")
+    sys.argv[1:] = [
+        "--spec_file",
+        "tests/resources/spec.json",
+        "--fwf_file",
+        "tests/resources/test_fwf.txt",
+        "--csv_file",
+        str(csv_file),
+        "--workers",
+        "2",
+    ]
+
+    # when
+    csv_cli.main()
+
+    # then
+    with open(csv_file) as f:
+        lines = f.readlines()
+    assert len(lines) == 3
+
+
+def test_csv_cli_mmap_parser(tmp_path) -> None:
+    # given
+    csv_file = tmp_path / __rnd_filename(".csv")
+    sys.argv[1:] = [
+        "--spec_file",
+        "tests/resources/spec.json",
+        "--fwf_file",
+        "tests/resources/test_fwf.txt",
+        "--csv_file",
+        str(csv_file),
+        "--parser",
+        "mmap",
+    ]
+
+    # when
+    csv_cli.main()
+
+    # then
+    with open(csv_file) as f:
+        lines = f.readlines()
+    assert len(lines) == 3
+
+
+def test_csv_cli_fast_writer(tmp_path) -> None:
+    # given
+    csv_file = tmp_path / __rnd_filename(".csv")
+    sys.argv[1:] = [
+        "--spec_file",
+        "tests/resources/spec.json",
+        "--fwf_file",
+        "tests/resources/test_fwf.txt",
+        "--csv_file",
+        str(csv_file),
+        "--writer",
+        "fast",
+    ]
+
+    # when
+    csv_cli.main()
+
+    # then
+    with open(csv_file) as f:
+        lines = f.readlines()
+    assert len(lines) == 3
+
+
+def test_fwf_cli_bulk(tmp_path) -> None:
+    # given
+    fwf_files = [tmp_path / __rnd_filename(".txt") for _ in range(2)]
+    number_of_lines = 10
+
+    # when
+    for fwf_file in fwf_files:
+        sys.argv[1:] = [
+            "--spec_file",
+            "tests/resources/spec.json",
+            "--fwf_file",
+            str(fwf_file),
+            "-n",
+            str(number_of_lines),
+            "--bulk",
+            "--seed",
+            "7",
+        ]
+        fwf_cli.main()
+
+    # then
+    with open(fwf_files[0]) as f:
+        lines = f.readlines()
+    # number of lines + header
+    assert len(lines) == number_of_lines + 1
+    assert fwf_files[0].read_bytes() == fwf_files[1].read_bytes()
+
+
+def test_fwf_cli_workers(tmp_path) -> None:
+    # given
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    number_of_lines = 10
+    sys.argv[1:] = [
+        "--spec_file",
+        "tests/resources/spec.json",
+        "--fwf_file",
+        str(fwf_file),
+        "-n",
+        str(number_of_lines),
+        "--workers",
+        "2",
+    ]
+
+    # when
+    fwf_cli.main()
+
+    # then
+    with open(fwf_file) as f:
+        lines = f.readlines()
+    # number of lines + header
+    assert len(lines) == number_of_lines + 1
+
+
+def test_benchmark_cli(tmp_path) -> None:
+    # given
+    report_file = tmp_path / __rnd_filename(".json")
+    sys.argv[1:] = [
+        "--columns",
+        "2",
+        "--column_lengths",
+        "3",
+        "--rows",
+        "10",
+        "--cases",
+        "parse_fwf_file",
+        "write_csv_file_fast",
+        "--output",
+        str(report_file),
+        "--work_dir",
+        str(tmp_path),
+        "--startup_modules",
+        "dck_problem1.fwf_cli",
+        "--startup_repeat",
+        "1",
+    ]
+
+    # when run twice, the second time against the first report
+    benchmark_cli.main()
+    sys.argv[1:] += ["--baseline", str(report_file)]
+    benchmark_cli.main()
+
+    # then
+    with open(report_file) as f:
+        report = json.load(f)
+    results = report["results"]
+    assert [result["case"] for result in results] == ["parse_fwf_file", "write_csv_file_fast"]
+    assert all(result["rows"] == 10 and result["rows_per_second"] > 0 for result in results)
+    assert [result["module"] for result in report["startup"]] == ["dck_problem1.fwf_cli"]
+    assert report["startup"][0]["import_seconds"] > 0
+
+
+@pytest.mark.parametrize("module", ["dck_problem1.csv_cli", "dck_problem1.fwf_cli"])
+def test_cli_lean_imports(module) -> None:
+    # given modules needed only by validation, compression or multiple workers
+    heavy_modules = {"marshmallow", "multiprocessing", "gzip", "bz2", "lzma", "hashlib"}
+    script = f"import sys, {module}; print(sorted({heavy_modules!r} & sys.modules.keys()))"
+
+    # when
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        check=True,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    ).stdout
+
+    # then
+    assert output.strip() == "[]"
+
+
+def test_csv_cli_stdio(monkeypatch) -> None:
+    # given fixed width file on stdin
+    with open("tests/resources/test_fwf.txt", "rb") as f:
+        monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(f.read())))
+    stdout = io.TextIOWrapper(io.BytesIO())
+    monkeypatch.setattr(sys, "stdout", stdout)
+    sys.argv[1:] = [
+        "--spec_file",
+        "tests/resources/spec.json",
+        "--fwf_file",
+        "-",
+        "--csv_file",
+        "-",
+    ]
+
+    # when
+    csv_cli.main()
+
+    # then CSV is written to stdout
+    stdout.flush()
+    lines = stdout.buffer.getvalue().decode("utf-8").splitlines()
+    assert len(lines) == 3
+    assert lines[0] == "f1,f2,f3,f4,f5,f6,f7,f8,f9,f10"
+
+
+def test_csv_cli_compressed(tmp_path) -> None:
+    # given gzip compressed fixed width file
+    fwf_file = tmp_path / __rnd_filename(".txt.gz")
+    with open("tests/resources/test_fwf.txt", "rb") as source, gzip.open(fwf_file, "wb") as target:
+        target.write(source.read())
+    csv_file = tmp_path / __rnd_filename(".csv.xz")
+    sys.argv[1:] = [
+        "--spec_file",
+        "tests/resources/spec.json",
+        "--fwf_file",
+        str(fwf_file),
+        "--csv_file",
+        str(csv_file),
+        "--compression_level",
+        "1",
+    ]
+
+    # when
+    csv_cli.main()
+
+    # then
+    with lzma.open(csv_file, "rt") as f:
+        lines = f.readlines()
+    assert len(lines) == 3
+
+
+def test_csv_cli_compression_none(tmp_path) -> None:
+    # given plain fixed width and CSV files named like gzip files
+    fwf_file = tmp_path / __rnd_filename(".txt.gz")
+    shutil.copy("tests/resources/test_fwf.txt", fwf_file)
+    csv_file = tmp_path / __rnd_filename(".csv.gz")
+    sys.argv[1:] = [
+        "--spec_file",
+        "tests/resources/spec.json",
+        "--fwf_file",
+        str(fwf_file),
+        "--csv_file",
+        str(csv_file),
+        "--fwf_compression",
+        "none",
+        "--csv_compression",
+        "none",
+    ]
+
+    # when
+    csv_cli.main()
+
+    # then files are read and written as they are
+    lines = csv_file.read_text().splitlines()
+    assert len(lines) == 3
+    assert lines[0] == "f1,f2,f3,f4,f5,f6,f7,f8,f9,f10"
+
+
+def test_csv_cli_columns_where(tmp_path) -> None:
+    # given
+    csv_file = tmp_path / __rnd_filename(".csv")
+    sys.argv[1:] = [
+        "--spec_file",
+        "tests/resources/spec.json",
+        "--fwf_file",
+        "tests/resources/test_fwf.txt",
+        "--csv_file",
+        str(csv_file),
+        "--columns",
+        "f3",
+        "f1",
+        "--where",
+        "f4=gw",
+    ]
+
+    # when
+    csv_cli.main()
+
+    # then
+    with open(csv_file) as f:
+        lines = f.read().splitlines()
+    assert lines == ["f3,f1", "lqw,nhdde"]
+
+
+@pytest.mark.parametrize("option", [["--columns", "f1", "x"], ["--where", "x=1"]])
+def test_csv_cli_unknown_column(tmp_path, capsys, option) -> None:
+    # given
+    csv_file = tmp_path / __rnd_filename(".csv")
+    sys.argv[1:] = [
+        "--spec_file",
+        "tests/resources/spec.json",
+        "--fwf_file",
+        "tests/resources/test_fwf.txt",
+        "--csv_file",
+        str(csv_file),
+    ] + option
+
+    # then expect a usage error
+    with pytest.raises(SystemExit):
+        # when
+        csv_cli.main()
+
+    # and no output file is created
+    assert f"{option[0]} Column x not found" in capsys.readouterr().err
+    assert not csv_file.exists()
+
+
+def test_index_cli(tmp_path) -> None:
+    # given
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    shutil.copy("tests/resources/test_fwf.txt", fwf_file)
+    sys.argv[1:] = [
+        "--spec_file",
+        "tests/resources/spec.json",
+        "--fwf_file",
+        str(fwf_file),
+        "--columns",
+        "f1",
+        "f4",
+    ]
+
+    # when
+    index_cli.main()
+
+    # then
+    assert fwf_file.with_name(fwf_file.name + ".f1.keyidx").exists()
+    assert fwf_file.with_name(fwf_file.name + ".f4.keyidx").exists()
+
+
+def test_fwf_encoder_cli(tmp_path, capsys) -> None:
+    # given CSV file with a value longer than its column
+    csv_file = tmp_path / __rnd_filename(".csv")
+    csv_file.write_text("f1,f2\nabcdefg,x\nab,y\n", encoding="utf-8")
+    spec_file = tmp_path / "spec.json"
+    spec_file.write_text(
+        json.dumps(
+            {
+                "ColumnNames": ["f1", "f2"],
+                "Offsets": ["5", "2"],
+                "FixedWidthEncoding": "windows-1252",
+                "IncludeHeader": "True",
+                "DelimitedEncoding": "utf-8",
+            }
+        )
+    )
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    args = [
+        "--spec_file",
+        str(spec_file),
+        "--csv_file",
+        str(csv_file),
+        "--fwf_file",
+        str(fwf_file),
+    ]
+
+    # when
+    sys.argv[1:] = args
+    failed = fwf_encoder_cli.main()
+    sys.argv[1:] = args + ["--overflow", "report"]
+    reported = fwf_encoder_cli.main()
+
+    # then the value fails the default conversion and is truncated and reported
+    assert failed != 0
+    assert reported == 0
+    assert fwf_file.read_text(encoding="windows-1252") == "f1   f2\nabcdex \nab   y \n"
+    err = capsys.readouterr().err
+    assert "longer than 5" in err
+    assert "Truncated value 'abcdefg' of column f1 in record 0" in err
+
+
+def test_fwf_encoder_cli_csv_cli_round_trip(tmp_path) -> None:
+    # given CSV file with an empty fixed value and spec of typed columns
+    csv_file = tmp_path / __rnd_filename(".csv")
+    csv_file.write_text("f1,f2,f3\r\na,000125,7\r\nb,,\r\n", encoding="utf-8")
+    spec_file = tmp_path / "spec.json"
+    spec_file.write_text(
+        json.dumps(
+            {
+                "ColumnNames": ["f1", "f2", "f3"],
+                "Offsets": ["2", "6", "3"],
+                "ColumnTypes": ["str", "fixed", "int"],
+                "ColumnScales": [0, 2, 0],
+                "FixedWidthEncoding": "windows-1252",
+                "IncludeHeader": "True",
+                "DelimitedEncoding": "utf-8",
+            }
+        )
+    )
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    round_trip_file = tmp_path / __rnd_filename(".csv")
+    arguments = ["--spec_file", str(spec_file), "--fwf_file", str(fwf_file), "--csv_file"]
+
+    # when
+    sys.argv[1:] = arguments + [str(csv_file)]
+    fwf_encoder_cli.main()
+    sys.argv[1:] = arguments + [str(round_trip_file)]
+    csv_cli.main()
+
+    # then the empty fixed value is blank and stays empty
+    assert fwf_file.read_text(encoding="windows-1252").splitlines() == [
+        "f1f2    f3 ",
+        "a 000125  7",
+        "b" + " " * 10,
+    ]
+    assert round_trip_file.read_bytes() == csv_file.read_bytes()
+
+
+def test_csv_cli_columnar(tmp_path) -> None:
+    # given
+    columnar_file = tmp_path / __rnd_filename(".fwfc")
+    sys.argv[1:] = [
+        "--spec_file",
+        "tests/resources/spec.json",
+        "--fwf_file",
+        "tests/resources/test_fwf.txt",
+        "--csv_file",
+        str(columnar_file),
+        "--output_format",
+        "columnar",
+        "--columns",
+        "f2",
+        "f1",
+    ]
+
+    # when
+    csv_cli.main()
+
+    # then
+    with ColumnarReader(columnar_file) as reader:
+        rows = list(reader)
+    assert rows == [["cfvhlifswzbe", "nhdde"], ["hgfzqxudcuua", "bhrsk"]]
+
+
+def test_csv_cli_batch(tmp_path, capsys) -> None:
+    # given directory of fixed width files and a manifest
+    fwf_dir = tmp_path / "fwf"
+    fwf_dir.mkdir()
+    for name in ["a.txt", "b.txt"]:
+        shutil.copy("tests/resources/test_fwf.txt", fwf_dir / name)
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text("fwf/a.txt,manifest_out/a.csv\nfwf/missing.txt,manifest_out/m.csv\n")
+    arguments = ["--spec_file", "tests/resources/spec.json", "--workers", "2"]
+
+    # when
+    sys.argv[1:] = arguments + ["--batch", str(fwf_dir), "--output_dir", str(tmp_path / "out")]
+    directory_status = csv_cli.main()
+    sys.argv[1:] = arguments + ["--batch", str(manifest), "--manifest"]
+    manifest_status = csv_cli.main()
+
+    # then
+    assert directory_status == 0
+    for name in ["a.csv", "b.csv"]:
+        with open(tmp_path / "out" / name) as f:
+            assert len(f.readlines()) == 3
+    assert manifest_status == 1
+    assert (tmp_path / "manifest_out" / "a.csv").exists()
+    assert "FAILED" in capsys.readouterr().err
+
+
+def test_csv_cli_batch_file(tmp_path) -> None:
+    # given a single fixed width file as the batch source
+    fwf_file = tmp_path / "data.txt"
+    shutil.copy("tests/resources/test_fwf.txt", fwf_file)
+    sys.argv[1:] = [
+        "--spec_file",
+        "tests/resources/spec.json",
+        "--batch",
+        str(fwf_file),
+        "--output_dir",
+        str(tmp_path / "out"),
+    ]
+
+    # when
+    status = csv_cli.main()
+
+    # then the file is converted instead of being read as a manifest
+    assert status == 0
+    with open(tmp_path / "out" / "data.csv") as f:
+        assert len(f.readlines()) == 3
+
+
+def test_csv_cli_incremental(tmp_path, capsys) -> None:
+    # given
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    shutil.copy("tests/resources/test_fwf.txt", fwf_file)
+    csv_file = tmp_path / __rnd_filename(".csv")
+    sys.argv[1:] = [
+        "--spec_file",
+        "tests/resources/spec.json",
+        "--fwf_file",
+        str(fwf_file),
+        "--csv_file",
+        str(csv_file),
+        "--incremental",
+    ]
+
+    # when run twice without new records
+    csv_cli.main()
+    csv_cli.main()
+
+    # then
+    with open(csv_file) as f:
+        assert len(f.readlines()) == 3
+    assert "0 new records" in capsys.readouterr().out
+
+
+def test_csv_cli_transcode(tmp_path) -> None:
+    # given
+    csv_file = tmp_path / __rnd_filename(".csv")
+    expected_file = tmp_path / __rnd_filename(".csv")
+    arguments = ["--spec_file", "tests/resources/spec.json", "--fwf_file"]
+    arguments.append("tests/resources/test_fwf.txt")
+
+    # when
+    sys.argv[1:] = arguments + ["--csv_file", str(csv_file), "--transcode"]
+    csv_cli.main()
+    sys.argv[1:] = arguments + ["--csv_file", str(expected_file)]
+    csv_cli.main()
+
+    # then
+    assert csv_file.read_bytes() == expected_file.read_bytes()
+
+
+def test_csv_cli_stats_profile(tmp_path, capsys) -> None:
+    # given
+    csv_file = tmp_path / __rnd_filename(".csv")
+    profile_file = tmp_path / __rnd_filename(".prof")
+    sys.argv[1:] = [
+        "--spec_file",
+        "tests/resources/spec.json",
+        "--fwf_file",
+        "tests/resources/test_fwf.txt",
+        "--csv_file",
+        str(csv_file),
+        "--stats",
+        "--profile",
+        str(profile_file),
+    ]
+
+    # when
+    csv_cli.main()
+
+    # then
+    with open(csv_file) as f:
+        assert len(f.readlines()) == 3
+    assert "2 rows in" in capsys.readouterr().err
+    assert profile_file.exists()
+
+
+def test_csv_cli_incremental_resume(tmp_path, capsys) -> None:
+    # given CSV file of an interrupted incremental conversion with a checkpoint after
+    # the first record
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    shutil.copy("tests/resources/test_fwf.txt", fwf_file)
+    csv_file = tmp_path / __rnd_filename(".csv")
+    sys.argv[1:] = [
+        "--spec_file",
+        "tests/resources/spec.json",
+        "--fwf_file",
+        str(fwf_file),
+        "--csv_file",
+        str(csv_file),
+        "--incremental",
+        "--checkpoint_interval",
+        "1",
+    ]
+    csv_cli.main()
+    expected = csv_file.read_text()
+    with open(csv_file, "a") as f:
+        f.write("partial,row")
+
+    # when
+    csv_cli.main()
+
+    # then
+    assert csv_file.read_text() == expected
+    assert "0 new records" in capsys.readouterr().out
+
+
+def test_csv_cli_resume(tmp_path, capsys) -> None:
+    # given CSV file of a conversion interrupted after a checkpoint of the first record
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    shutil.copy("tests/resources/test_fwf.txt", fwf_file)
+    csv_file = tmp_path / __rnd_filename(".csv")
+    sys.argv[1:] = [
+        "--spec_file",
+        "tests/resources/spec.json",
+        "--fwf_file",
+        str(fwf_file),
+        "--csv_file",
+        str(csv_file),
+        "--resume",
+        "--checkpoint_interval",
+        "1",
+    ]
+    csv_cli.main()
+    expected = csv_file.read_text()
+    checkpoint_file = tmp_path / (csv_file.name + ".checkpoint")
+    first_checkpoint = checkpoint_file.read_bytes()
+    with open(csv_file, "a") as f:
+        f.write("partial,row")
+
+    # when
+    csv_cli.main()
+
+    # then the partial row is dropped and nothing is converted again
+    assert csv_file.read_text() == expected
+    assert checkpoint_file.read_bytes() == first_checkpoint
+    assert "0 records converted" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("mode", ["--incremental", "--resume"])
+@pytest.mark.parametrize("option", [["--parser", "mmap"], ["--writer", "fast"]])
+def test_csv_cli_incremental_engines(tmp_path, capsys, mode, option) -> None:
+    # given
+    csv_file = tmp_path / __rnd_filename(".csv")
+    sys.argv[1:] = [
+        "--spec_file",
+        "tests/resources/spec.json",
+        "--fwf_file",
+        "tests/resources/test_fwf.txt",
+        "--csv_file",
+        str(csv_file),
+        mode,
+    ] + option
+
+    # then expect a usage error
+    with pytest.raises(SystemExit):
+        # when
+        csv_cli.main()
+
+    # and no output file is created
+    assert "--incremental and --resume support" in capsys.readouterr().err
+    assert not csv_file.exists()
@@ -0,0 +1,117 @@
+import datetime
+from decimal import Decimal
+import random as rnd
+import string
+from typing import Any, List
+
+import pytest
+
+from dck_problem1.columnar_file_helper import ColumnarReader, write_columnar_file
+from dck_problem1.fixed_width_file_helper import parse_fwf_batches, parse_fwf_file
+from dck_problem1.models import FWFColumnSpec, FWFSpec
+
+
+def __rnd_filename(ext, length=10) -> str:
+    return "".join(rnd.choice(string.ascii_lowercase) for _ in range(length)) + ext
+
+
+def __fwf_spec() -> FWFSpec:
+    return FWFSpec(
+        [
+            FWFColumnSpec("country", 0, 3),
+            FWFColumnSpec("name", 3, 6),
+            FWFColumnSpec("id", 9, 4, "int"),
+            FWFColumnSpec("price", 13, 6, "decimal"),
+            FWFColumnSpec("amount", 19, 5, "fixed", 2),
+            FWFColumnSpec("day", 24, 8, "date"),
+        ],
+        True,
+        "utf-8",
+    )
+
+
+def test_write_columnar_file(tmp_path) -> None:
+    # given fwf file with repeated, multi-byte and empty values
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    with open(fwf_file, "w", encoding="utf-8") as f:
+        f.write("countrnameidpricemountday     \n")
+        for i in range(25):
+            price, day = ("", "") if i % 5 == 0 else (f"{i}.5", f"202001{i:02d}")
+            f.write(f"{'DE' if i % 2 else 'FR':<3}né{i:<4}{i:>4}{price:>6}{i * 7:05d}{day:<8}\n")
+    spec = __fwf_spec()
+    expected = [list(line) for line in parse_fwf_file(spec, fwf_file, typed=True)]
+    columnar_file = tmp_path / __rnd_filename(".fwfc")
+
+    # when written in row groups of 10 rows
+    write_columnar_file(spec, parse_fwf_batches(spec, fwf_file, 10, typed=True), columnar_file)
+    with ColumnarReader(columnar_file) as reader:
+        length, names, rows = len(reader), reader.column_names, list(reader)
+        countries, prices = reader.read_column("country"), reader.read_column("price")
+        batches = list(reader.read_batches(["day", "id"]))
+
+    # then typed values are read back without parsing text
+    assert length == 25
+    assert names == ["country", "name", "id", "price", "amount", "day"]
+    assert rows == expected
+    assert rows[1] == ["DE", "né1", 1, Decimal("1.5"), Decimal("0.07"), datetime.date(2020, 1, 1)]
+    assert rows[5][3:] == [None, Decimal("0.35"), None]
+    assert countries == [row[0] for row in expected]
+    # dictionary encoded values are shared
+    assert countries[1] is countries[3]
+    assert prices == [row[3] for row in expected]
+    assert [len(batch[0]) for batch in batches] == [10, 10, 5]
+    assert batches[0][1] == list(range(10))
+
+
+def test_write_columnar_file_projected_large_values(tmp_path) -> None:
+    # given columns which do not fit int64
+    spec = FWFSpec(
+        [FWFColumnSpec("a", 0, 20, "int"), FWFColumnSpec("b", 20, 20, "fixed", 3)], False, "utf-8"
+    )
+    batches: List[List[List[Any]]] = [
+        [[10**19, None, 1], [Decimal(10**17), Decimal("-0.001"), None]]
+    ]
+    columnar_file = tmp_path / __rnd_filename(".fwfc")
+
+    # when
+    write_columnar_file(spec, batches, columnar_file)
+    with ColumnarReader(columnar_file) as reader:
+        rows = list(reader)
+
+    # then values are stored as strings
+    assert rows == [[10**19, Decimal(10**17)], [None, Decimal("-0.001")], [1, None]]
+
+
+def test_columnar_reader_invalid_file(tmp_path) -> None:
+    # given
+    spec = FWFSpec([FWFColumnSpec("a", 0, 2)], False, "utf-8")
+    invalid_file = tmp_path / __rnd_filename(".txt")
+    invalid_file.write_text("a\n" * 20)
+    columnar_file = tmp_path / __rnd_filename(".fwfc")
+    write_columnar_file(spec, [[["x"]]], columnar_file)
+
+    # then expect exceptions
+    with pytest.raises(ValueError, match="is not a columnar file"):
+        # when
+        ColumnarReader(invalid_file)
+    with ColumnarReader(columnar_file) as reader, pytest.raises(ValueError, match="not found"):
+        reader.read_column("b")
+    with pytest.raises(ValueError, match="expected 1 columns"):
+        write_columnar_file(spec, [[["x"], ["y"]]], columnar_file)
+
+
+def test_write_columnar_file_dictionary_columns(tmp_path) -> None:
+    # given fwf file parsed into dictionary encoded blocks
+    spec = FWFSpec([FWFColumnSpec("a", 0, 2), FWFColumnSpec("b", 2, 3, "int")], False, "utf-8")
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    fwf_file.write_text("".join(f"{'xy'[i % 2]:<2}{i % 3:>3}\n" for i in range(30)))
+    batches = parse_fwf_batches(spec, fwf_file, 7, typed=True, dictionary_size=4)
+    columnar_file = tmp_path / __rnd_filename(".fwfc")
+
+    # when
+    write_columnar_file(spec, batches, columnar_file)
+    with ColumnarReader(columnar_file) as reader:
+        rows = list(reader)
+
+    # then
+    assert rows == [list(line) for line in parse_fwf_file(spec, fwf_file, typed=True)]
@@ -0,0 +1,95 @@
+import random as rnd
+import string
+
+import pytest
+
+from dck_problem1.compression_helper import (
+    COMPRESSIONS,
+    compression_from_extension,
+    detect_compression,
+    open_input,
+    open_output,
+)
+
+
+def __rnd_filename(ext, length=10) -> str:
+    return "".join(rnd.choice(string.ascii_lowercase) for _ in range(length)) + ext
+
+
+@pytest.mark.parametrize("compression", [c for c in COMPRESSIONS if c != "auto"])
+def test_open_output_open_input(compression, tmp_path) -> None:
+    # given
+    path = tmp_path / __rnd_filename(".bin")
+    data = "".join(rnd.choice(string.ascii_lowercase) for _ in range(100_000)).encode("ascii")
+
+    # when written and read in small blocks
+    with open_output(path, compression, level=1, block_size=1000) as f:
+        f.write(data)
+    with open_input(path, compression, block_size=1000) as f:
+        result = f.read()
+
+    # then
+    assert result == data
+    assert detect_compression(path) == (None if compression == "none" else compression)
+
+
+@pytest.mark.parametrize(
+    "filename,compression",
+    [("a.txt", None), ("a.txt.gz", "gzip"), ("a.csv.bz2", "bz2"), ("a.XZ", "xz")],
+)
+def test_compression_from_extension(filename, compression, tmp_path) -> None:
+    # when
+    result = compression_from_extension(tmp_path / filename)
+
+    # then
+    assert result == compression
+
+
+def test_open_input_auto(tmp_path) -> None:
+    # given gzip file without an extension
+    path = tmp_path / __rnd_filename("")
+    with open_output(path, "gzip") as f:
+        f.write(b"abc\n")
+
+    # when compression is detected from the magic bytes
+    with open_input(path) as f:
+        result = f.readlines()
+
+    # then
+    assert result == [b"abc\n"]
+
+
+@pytest.mark.parametrize("compression", [c for c in COMPRESSIONS if c not in ("auto", "none")])
+def test_detect_compression_empty(compression, tmp_path) -> None:
+    # given compressed file of empty data without an extension
+    path = tmp_path / __rnd_filename("")
+    with open_output(path, compression) as f:
+        f.write(b"")
+
+    # when
+    result = detect_compression(path)
+
+    # then
+    assert result == compression
+
+
+@pytest.mark.parametrize(
+    "head", [b"BZh", b"BZhang  ab", b"BZh91AY&S", b"\x1f\x8b", b"\x1f\x8b\x09"]
+)
+def test_detect_compression_plain_file_with_magic_prefix(head, tmp_path) -> None:
+    # given plain file starting with a prefix of a compressed file header
+    path = tmp_path / __rnd_filename("")
+    path.write_bytes(head + b"\nabc\n")
+
+    # when
+    result = detect_compression(path)
+
+    # then
+    assert result is None
+
+
+def test_open_output_unsupported_compression(tmp_path) -> None:
+    # then expect an exception
+    with pytest.raises(ValueError, match="Compression lz4 is not supported"):
+        # when
+        open_output(tmp_path / __rnd_filename(".bin"), "lz4")
@@ -0,0 +1,456 @@
+import io
+import random as rnd
+import string
+
+import pytest
+
+from dck_problem1.converter import (
+    checkpoint_path,
+    convert_csv_file,
+    convert_fwf_blocks,
+    convert_fwf_file_incremental,
+    convert_fwf_file_parallel,
+    convert_fwf_files,
+    convert_fwf_lines,
+    convert_fwf_stream,
+    split_fwf_file,
+    transcode_fwf_stream,
+)
+from dck_problem1.csv_file_writer import write_csv_file
+from dck_problem1.fixed_width_file_helper import (
+    equals_predicate,
+    generate_fwf_file,
+    parse_fwf_file,
+)
+from dck_problem1.models import CSVSpec, FWFColumnSpec, FWFSpec
+from dck_problem1.transcoding import Transcoder
+
+
+def __rnd_filename(ext, length=10) -> str:
+    return "".join(rnd.choice(string.ascii_lowercase) for _ in range(length)) + ext
+
+
+def test_split_fwf_file(tmp_path) -> None:
+    # given fwf file with a header and 10 records of 4 characters
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    spec = FWFSpec([FWFColumnSpec("a", 0, 2), FWFColumnSpec("b", 2, 2)], True, "windows-1252")
+    generate_fwf_file(spec, 10, fwf_file, lambda col: "s" * col.length)
+
+    # when ranges of 3 records are requested
+    ranges = split_fwf_file(spec, fwf_file, chunk_size=16)
+
+    # then ranges are aligned to record boundaries and skip the header
+    assert ranges == [(5, 20), (20, 35), (35, 50), (50, 55)]
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"], ids=["lf", "crlf"])
+def test_convert_fwf_file_parallel(newline, tmp_path) -> None:
+    # given fwf file with a header
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    with open(fwf_file, "w", encoding="windows-1252", newline="") as f:
+        f.write("a   b    " + newline)
+        f.writelines((f"{i:<4}é{i:>4}" + newline for i in range(100)))
+    fwf_spec = FWFSpec([FWFColumnSpec("a", 0, 4), FWFColumnSpec("b", 4, 5)], True, "windows-1252")
+    csv_spec = CSVSpec(["a", "b"], True, "utf-8")
+    expected_file = tmp_path / __rnd_filename(".csv")
+    write_csv_file(csv_spec, parse_fwf_file(fwf_spec, fwf_file), expected_file)
+    csv_file = tmp_path / __rnd_filename(".csv")
+
+    # when converted with small chunks
+    convert_fwf_file_parallel(fwf_spec, csv_spec, fwf_file, csv_file, workers=2, chunk_size=64)
+
+    # then output is the same as the sequential one
+    assert csv_file.read_bytes() == expected_file.read_bytes()
+
+
+@pytest.mark.parametrize("header", [True, False])
+@pytest.mark.parametrize("csv_encoding", ["utf-16", "utf-8-sig"])
+def test_convert_fwf_file_parallel_signature(tmp_path, csv_encoding, header) -> None:
+    # given CSV encoding which starts a file with a byte order mark or signature
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    fwf_file.write_text("".join(f"{i:<4}é{i:>4}\n" for i in range(100)), encoding="latin-1")
+    fwf_spec = FWFSpec([FWFColumnSpec("a", 0, 4), FWFColumnSpec("b", 4, 5)], False, "latin-1")
+    csv_spec = CSVSpec(["a", "b"], header, csv_encoding)
+    expected_file = tmp_path / __rnd_filename(".csv")
+    write_csv_file(csv_spec, parse_fwf_file(fwf_spec, fwf_file), expected_file)
+    csv_file = tmp_path / __rnd_filename(".csv")
+
+    # when converted in many chunks
+    convert_fwf_file_parallel(fwf_spec, csv_spec, fwf_file, csv_file, workers=2, chunk_size=64)
+
+    # then the signature is written once, like by the sequential conversion
+    assert csv_file.read_bytes() == expected_file.read_bytes()
+
+
+def test_convert_fwf_file_parallel_trimmed_lines(tmp_path) -> None:
+    # given fwf file with a trimmed line and a longer line, so records have different sizes
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    lines = [f"a{i}  b{i}  " for i in range(10)]
+    lines[3] = "aa"
+    lines[7] = "a7  b7    x"
+    fwf_file.write_text("".join(line + "\n" for line in lines), encoding="windows-1252")
+    fwf_spec = FWFSpec([FWFColumnSpec("a", 0, 4), FWFColumnSpec("b", 4, 4)], False, "windows-1252")
+    csv_spec = CSVSpec(["a", "b"], False, "utf-8")
+    expected_file = tmp_path / __rnd_filename(".csv")
+    write_csv_file(csv_spec, parse_fwf_file(fwf_spec, fwf_file), expected_file)
+    csv_file = tmp_path / __rnd_filename(".csv")
+
+    # when range boundaries estimated from the first record fall inside records
+    ranges = split_fwf_file(fwf_spec, fwf_file, chunk_size=18)
+    convert_fwf_file_parallel(fwf_spec, csv_spec, fwf_file, csv_file, workers=2, chunk_size=18)
+
+    # then ranges start at line starts and output is the same as the sequential one
+    content = fwf_file.read_bytes()
+    assert all(start == 0 or content[start - 1 : start] == b"\n" for start, _ in ranges)
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(content)
+    assert csv_file.read_bytes() == expected_file.read_bytes()
+    assert len(csv_file.read_bytes().splitlines()) == 10
+
+
+def test_convert_fwf_file_parallel_multibyte_encoding(tmp_path) -> None:
+    # given utf-8 fwf file
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    fwf_spec = FWFSpec([FWFColumnSpec("a", 0, 4)], False, "utf-8")
+    generate_fwf_file(fwf_spec, 1, fwf_file, lambda col: "s" * col.length)
+
+    # then expect an exception
+    with pytest.raises(ValueError, match="not a single-byte encoding"):
+        # when
+        convert_fwf_file_parallel(
+            fwf_spec, CSVSpec(["a"], False, "utf-8"), fwf_file, tmp_path / "o.csv", workers=2
+        )
+
+
+def test_convert_fwf_byte_widths(tmp_path) -> None:
+    # given utf-8 fwf file with multi-byte characters and byte widths
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    with open(fwf_file, "wb") as f:
+        f.write(b"a   b    \r\n")
+        f.writelines(f"{i:<4}".encode() + f"\u00e9{i:>3}\r\n".encode() for i in range(100))
+    fwf_spec = FWFSpec(
+        [FWFColumnSpec("a", 0, 4), FWFColumnSpec("b", 4, 5)], True, "utf-8", "bytes"
+    )
+    csv_spec = CSVSpec(["a", "b"], True, "windows-1252")
+    expected_file = tmp_path / __rnd_filename(".csv")
+    write_csv_file(csv_spec, parse_fwf_file(fwf_spec, fwf_file), expected_file)
+    csv_file = tmp_path / __rnd_filename(".csv")
+    output = io.BytesIO()
+
+    # when converted in parallel, as a stream and by blocks of whole lines
+    convert_fwf_file_parallel(fwf_spec, csv_spec, fwf_file, csv_file, workers=2, chunk_size=64)
+    with open(fwf_file, "rb") as f:
+        convert_fwf_stream(fwf_spec, csv_spec, f, output, batch_size=4, queue_size=1)
+    transcoded = io.BytesIO()
+    with open(fwf_file, "rb") as f:
+        transcode_fwf_stream(fwf_spec, csv_spec, f, transcoded, block_size=13)
+
+    # then outputs are the same as the sequential one
+    expected = expected_file.read_bytes()
+    assert expected.splitlines()[1] == "0,\u00e9  0".encode("windows-1252")
+    assert csv_file.read_bytes() == expected
+    assert output.getvalue() == expected
+    assert transcoded.getvalue() == expected
+
+
+def test_convert_fwf_stream(tmp_path) -> None:
+    # given fwf file with a header
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    fwf_spec = FWFSpec([FWFColumnSpec("a", 0, 4), FWFColumnSpec("b", 4, 5)], True, "windows-1252")
+    generate_fwf_file(fwf_spec, 25, fwf_file, lambda col: "é" * (col.length - 1) + " ")
+    csv_spec = CSVSpec(["a", "b"], True, "utf-8")
+    expected_file = tmp_path / __rnd_filename(".csv")
+    write_csv_file(csv_spec, parse_fwf_file(fwf_spec, fwf_file), expected_file)
+    output = io.BytesIO()
+
+    # when converted in small batches
+    with open(fwf_file, "rb") as f:
+        convert_fwf_stream(fwf_spec, csv_spec, f, output, batch_size=4, queue_size=1)
+
+    # then output is the same as the file based one and streams are not closed
+    assert not output.closed
+    assert output.getvalue() == expected_file.read_bytes()
+
+
+def test_convert_fwf_columns_where(tmp_path) -> None:
+    # given fwf file without a header
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    with open(fwf_file, "w", encoding="windows-1252") as f:
+        f.writelines((f"{i:<4}{i % 3:<2}x{i:>3}\n" for i in range(60)))
+    fwf_spec = FWFSpec(
+        [FWFColumnSpec("a", 0, 4), FWFColumnSpec("b", 4, 2), FWFColumnSpec("c", 6, 4)],
+        False,
+        "windows-1252",
+    )
+    csv_spec = CSVSpec(["c", "a"], False, "utf-8")
+    columns, where = ["c", "a"], {"b": equals_predicate("1")}
+    expected = "".join(f"x{i:>3},{i}\r\n" for i in range(1, 60, 3)).encode("utf-8")
+    csv_file = tmp_path / __rnd_filename(".csv")
+    output = io.BytesIO()
+
+    # when
+    convert_fwf_file_parallel(
+        fwf_spec, csv_spec, fwf_file, csv_file, 2, chunk_size=50, columns=columns, where=where
+    )
+    with open(fwf_file, "rb") as f:
+        convert_fwf_stream(fwf_spec, csv_spec, f, output, columns=columns, where=where)
+
+    # then
+    assert csv_file.read_bytes() == expected
+    assert output.getvalue() == expected
+
+
+def test_convert_csv_file(tmp_path) -> None:
+    # given CSV file converted from fixed width file with a header
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    fwf_spec = FWFSpec(
+        [FWFColumnSpec("a", 0, 4), FWFColumnSpec("b", 4, 5, "int")], True, "windows-1252"
+    )
+    with open(fwf_file, "w", encoding="windows-1252") as f:
+        f.write("a   b    \n")
+        f.writelines(f"é{i:<3}{i:>5}\n" for i in range(100))
+    csv_spec = CSVSpec(["a", "b"], True, "utf-8")
+    csv_file = tmp_path / __rnd_filename(".csv")
+    write_csv_file(csv_spec, parse_fwf_file(fwf_spec, fwf_file), csv_file)
+    output_file = tmp_path / __rnd_filename(".txt")
+
+    # when converted back in small batches
+    overflows = convert_csv_file(csv_spec, fwf_spec, csv_file, output_file, batch_size=7)
+
+    # then the fixed width file is the same
+    assert output_file.read_bytes() == fwf_file.read_bytes()
+    assert overflows == []
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_convert_fwf_files(tmp_path, workers) -> None:
+    # given fixed width files sharing a spec and a missing file
+    fwf_spec = FWFSpec([FWFColumnSpec("a", 0, 2), FWFColumnSpec("b", 2, 3)], False, "utf-8")
+    csv_spec = CSVSpec(["a", "b"], True, "utf-8")
+    files = []
+    for i in range(4):
+        fwf_file = tmp_path / f"in{i}.txt"
+        fwf_file.write_text(f"{i:<2}x{i}\n")
+        files.append((fwf_file, tmp_path / "out" / f"out{i}.csv"))
+    files.append((tmp_path / "missing.txt", tmp_path / "out" / "missing.csv"))
+
+    # when
+    results = list(convert_fwf_files(fwf_spec, csv_spec, files, workers))
+
+    # then every file is reported, the missing file fails
+    results_by_input = {result.input_file: result for result in results}
+    assert len(results) == len(files)
+    for i, (fwf_file, csv_file) in enumerate(files[:-1]):
+        assert results_by_input[fwf_file].error is None
+        assert csv_file.read_text() == f"a,b\n{i},x{i}\n"
+    error = results_by_input[tmp_path / "missing.txt"].error
+    assert error is not None
+    assert error.startswith("FileNotFoundError")
+
+
+def test_convert_fwf_file_incremental(tmp_path) -> None:
+    # given fixed width file with a header and a line which is being appended
+    fwf_spec = FWFSpec([FWFColumnSpec("a", 0, 3), FWFColumnSpec("b", 3, 4)], True, "utf-8")
+    csv_spec = CSVSpec(["a", "b"], True, "utf-8")
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    csv_file = tmp_path / __rnd_filename(".csv")
+    fwf_file.write_text("a  b   \n1  x   \n2  y   \n3  ")
+
+    # when the file grows between runs
+    first = convert_fwf_file_incremental(fwf_spec, csv_spec, fwf_file, csv_file)
+    first_csv = csv_file.read_text()
+    with open(fwf_file, "a") as f:
+        f.write("z   \n4  w   \n")
+    second = convert_fwf_file_incremental(fwf_spec, csv_spec, fwf_file, csv_file)
+    third = convert_fwf_file_incremental(fwf_spec, csv_spec, fwf_file, csv_file)
+
+    # then only complete new records are converted and appended
+    assert (first, second, third) == (2, 2, 0)
+    assert first_csv == "a,b\n1,x\n2,y\n"
+    assert csv_file.read_text() == "a,b\n1,x\n2,y\n3,z\n4,w\n"
+    assert checkpoint_path(csv_file).exists()
+
+
+@pytest.mark.parametrize("header", [True, False])
+def test_convert_fwf_file_incremental_signature(tmp_path, header) -> None:
+    # given utf-16 CSV file converted from a growing fixed width file
+    fwf_spec = FWFSpec([FWFColumnSpec("a", 0, 3)], False, "utf-8")
+    csv_spec = CSVSpec(["a"], header, "utf-16")
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    csv_file = tmp_path / __rnd_filename(".csv")
+    fwf_file.write_text("".join(f"{i:<3}\n" for i in range(50)))
+    convert_fwf_file_incremental(fwf_spec, csv_spec, fwf_file, csv_file, block_size=16)
+
+    # when new records are appended in small blocks
+    with open(fwf_file, "a") as f:
+        f.write("".join(f"{i:<3}\n" for i in range(50, 100)))
+    convert_fwf_file_incremental(fwf_spec, csv_spec, fwf_file, csv_file, block_size=16)
+
+    # then the CSV file starts with the only byte order mark
+    expected_file = tmp_path / __rnd_filename(".csv")
+    write_csv_file(csv_spec, parse_fwf_file(fwf_spec, fwf_file), expected_file)
+    assert csv_file.read_bytes() == expected_file.read_bytes()
+
+
+def test_convert_fwf_file_incremental_rewritten(tmp_path) -> None:
+    # given converted fixed width file
+    fwf_spec = FWFSpec([FWFColumnSpec("a", 0, 3)], False, "utf-8")
+    csv_spec = CSVSpec(["a"], False, "utf-8")
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    csv_file = tmp_path / __rnd_filename(".csv")
+    fwf_file.write_text("1\n2\n3\n")
+    convert_fwf_file_incremental(fwf_spec, csv_spec, fwf_file, csv_file)
+
+    # when the head is rewritten, then the file is truncated
+    fwf_file.write_text("7\n8\n9\n10\n")
+    rewritten = convert_fwf_file_incremental(fwf_spec, csv_spec, fwf_file, csv_file)
+    rewritten_csv = csv_file.read_text()
+    fwf_file.write_text("7\n")
+    truncated = convert_fwf_file_incremental(fwf_spec, csv_spec, fwf_file, csv_file)
+
+    # then the whole file is converted again
+    assert rewritten == 4
+    assert rewritten_csv == "7\n8\n9\n10\n"
+    assert truncated == 1
+    assert csv_file.read_text() == "7\n"
+
+
+def test_convert_fwf_file_incremental_interrupted(tmp_path) -> None:
+    # given CSV rows appended by an interrupted run after the checkpoint
+    fwf_spec = FWFSpec([FWFColumnSpec("a", 0, 3)], False, "utf-8")
+    csv_spec = CSVSpec(["a"], False, "utf-8")
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    csv_file = tmp_path / __rnd_filename(".csv")
+    fwf_file.write_text("1\n")
+    convert_fwf_file_incremental(fwf_spec, csv_spec, fwf_file, csv_file)
+    with open(fwf_file, "a") as f:
+        f.write("2\n")
+    with open(csv_file, "a") as f:
+        f.write("2\n")
+
+    # when
+    convert_fwf_file_incremental(fwf_spec, csv_spec, fwf_file, csv_file)
+
+    # then rows are not duplicated
+    assert csv_file.read_text() == "1\n2\n"
+
+
+def test_convert_fwf_file_incremental_resume(tmp_path) -> None:
+    # given a conversion which crashes at the third record after a checkpoint per block
+    fwf_spec = FWFSpec([FWFColumnSpec("a", 0, 3)], False, "utf-8")
+    csv_spec = CSVSpec(["a"], False, "utf-8")
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    csv_file = tmp_path / __rnd_filename(".csv")
+    fwf_file.write_text("1\n2\n3\n4\n")
+
+    def crash(value: str) -> bool:
+        if value.strip() == "3":
+            raise KeyboardInterrupt
+        return True
+
+    with pytest.raises(KeyboardInterrupt):
+        convert_fwf_file_incremental(
+            fwf_spec,
+            csv_spec,
+            fwf_file,
+            csv_file,
+            where={"a": crash},
+            block_size=2,
+            checkpoint_interval=1,
+        )
+    with open(csv_file, "a") as f:
+        f.write("3")
+
+    # when
+    resumed = convert_fwf_file_incremental(fwf_spec, csv_spec, fwf_file, csv_file)
+
+    # then the partial row is truncated and the conversion continues after the checkpoint
+    assert resumed == 2
+    assert csv_file.read_text() == "1\n2\n3\n4\n"
+
+
+@pytest.mark.parametrize(
+    "content,fwf_encoding,csv_encoding,columns,where",
+    [
+        ("ab  cd  \nef  gh  \n", "windows-1252", "utf-8", None, None),
+        ("ab  cd  \néf  gh  \nij  kl", "windows-1252", "utf-8", None, None),
+        ('a,b cd  \na"b gh  \n\x1cb  ij\r\n', "utf-8", "utf-8", None, None),
+        ("ab  cd  \n    gh  \n", "utf-8", "utf-16", None, None),
+        ("ab  cd  \n    gh  \n", "ascii", "utf-8", ["a"], None),
+        ("ab  cd  \nef  gh  \n", "latin-1", "windows-1252", None, {"b": equals_predicate("gh")}),
+        ("éf  ßd  \nef  g\xa0  \n\x85b  cd  \n", "latin-1", "latin-1", None, None),
+        ("éf  ßd  \n€b  gh  \n", "windows-1252", "windows-1252", None, None),
+        ("กข  ค   \nab  cd  \n", "tis-620", "iso8859-11", None, None),
+    ],
+)
+def test_convert_fwf_blocks(content, fwf_encoding, csv_encoding, columns, where) -> None:
+    # given fixed width lines with a header split into blocks of whole lines
+    fwf_spec = FWFSpec([FWFColumnSpec("a", 0, 4), FWFColumnSpec("b", 4, 4)], True, fwf_encoding)
+    csv_spec = CSVSpec(["a", "b"] if columns is None else columns, True, csv_encoding)
+    data = ("a   b   \n" + content).encode(fwf_encoding)
+    lines = data.split(b"\n")
+    blocks = [line + b"\n" for line in lines[:-1]] + [lines[-1]]
+    header = "a,b\r\n" if columns is None else "a\r\n"
+    expected = header.encode(csv_encoding) + convert_fwf_lines(
+        fwf_spec, csv_spec, io.StringIO(content, newline=None), columns, where
+    )
+
+    # when
+    converted = b"".join(convert_fwf_blocks(fwf_spec, csv_spec, blocks, columns, where))
+
+    # then the output is the same as converted from decoded lines
+    assert converted == expected
+
+
+def test_convert_fwf_blocks_single_byte(monkeypatch) -> None:
+    # given non-ASCII latin-1 lines converted into latin-1
+    fwf_spec = FWFSpec([FWFColumnSpec("a", 0, 4), FWFColumnSpec("b", 4, 4)], False, "latin-1")
+    csv_spec = CSVSpec(["a", "b"], False, "latin-1")
+    content = "".join(f"é{i:<3}ß{i:>3}\n" for i in range(100))
+    expected = convert_fwf_lines(fwf_spec, csv_spec, io.StringIO(content))
+    monkeypatch.setattr(Transcoder, "decode", __fail_decode)
+
+    # when
+    converted = b"".join(convert_fwf_blocks(fwf_spec, csv_spec, [content.encode("latin-1")]))
+
+    # then blocks are sliced as bytes without decoding
+    assert converted == expected
+
+
+def test_convert_fwf_blocks_undefined_byte() -> None:
+    # given windows-1252 line with an undefined byte
+    fwf_spec = FWFSpec([FWFColumnSpec("a", 0, 4)], False, "windows-1252")
+    csv_spec = CSVSpec(["a"], False, "windows-1252")
+
+    # when, then the error of the codec is raised
+    with pytest.raises(UnicodeDecodeError):
+        list(convert_fwf_blocks(fwf_spec, csv_spec, [b"a\x81  \n"]))
+
+
+def __fail_decode(transcoder, block: bytes, final: bool = False) -> str:
+    if block:
+        raise AssertionError("the block is decoded")
+    return ""
+
+
+def test_transcode_fwf_stream() -> None:
+    # given
+    fwf_spec = FWFSpec([FWFColumnSpec("a", 0, 3), FWFColumnSpec("b", 3, 3)], False, "windows-1252")
+    csv_spec = CSVSpec(["a", "b"], False, "utf-8")
+    input_stream = io.BytesIO("1  x  \n2  é  \n3  z".encode("windows-1252"))
+    output_stream = io.BytesIO()
+
+    # when
+    transcode_fwf_stream(fwf_spec, csv_spec, input_stream, output_stream, block_size=4)
+
+    # then
+    assert output_stream.getvalue().decode("utf-8") == "1,x\r\n2,é\r\n3,z\r\n"
+
+
+def test_convert_fwf_blocks_utf_16() -> None:
+    # given
+    fwf_spec = FWFSpec([FWFColumnSpec("a", 0, 3)], False, "utf-16")
+    csv_spec = CSVSpec(["a"], False, "utf-8")
+
+    # when, then
+    with pytest.raises(ValueError):
+        list(convert_fwf_blocks(fwf_spec, csv_spec, []))
@@ -0,0 +1,43 @@
+import gzip
+import random as rnd
+import string
+
+import pytest
+
+from dck_problem1.csv_file_reader import read_csv_file
+from dck_problem1.csv_file_writer import write_csv_file
+from dck_problem1.models import CSVSpec
+
+
+def __rnd_filename(ext, length=10) -> str:
+    return "".join(rnd.choice(string.ascii_lowercase) for _ in range(length)) + ext
+
+
+@pytest.mark.parametrize("header", [True, False])
+def test_read_csv_file(header, tmp_path) -> None:
+    # given CSV file with quoted values and an empty line
+    spec = CSVSpec(["a", "b"], header, "windows-1252", ";")
+    rows = [["é", "x;y"], ['"q"', ""], ["", "z"]]
+    csv_file = tmp_path / __rnd_filename(".csv")
+    write_csv_file(spec, rows, csv_file)
+    with open(csv_file, "a", encoding=spec.encoding) as f:
+        f.write("\n")
+
+    # when
+    records = list(read_csv_file(spec, csv_file))
+
+    # then rows are the written ones
+    assert records == rows
+
+
+def test_read_csv_file_compressed(tmp_path) -> None:
+    # given
+    spec = CSVSpec(["a"], True, "utf-8")
+    csv_file = tmp_path / __rnd_filename(".csv.gz")
+    csv_file.write_bytes(gzip.compress(b"a\r\n1\r\n2\r\n"))
+
+    # when
+    records = list(read_csv_file(spec, csv_file))
+
+    # then
+    assert records == [["1"], ["2"]]
@@ -1,10 +1,17 @@
 # import pytest
+import bz2
 import random as rnd
 import string
+from typing import Any, List
 
 import pytest
 
-from dck_problem1.csv_file_writer import write_csv_file
+from dck_problem1.csv_file_writer import (
+    write_csv_batches,
+    write_csv_file,
+    write_csv_file_fast,
+)
+from dck_problem1.instrumentation import Instrumentation
 from dck_problem1.models import CSVSpec
 
 
@@ -39,3 +46,95 @@ def test_write_csv_file(header, output, tmp_path) -> None:
     with open(output_file) as f:
         csv_output = f.read()
     assert csv_output == output
+
+
+@pytest.mark.parametrize(
+    "lines",
+    [
+        [["aaa", "bbb"], ["ccc", "ddd"]],
+        [["a,a", "bbb"], ["ccc", 'd"d'], ["e\ne", "f\rf"]],
+        [[""], ["a"], [], ["", ""]],
+        [[1, None], [2.5, "b"]],
+    ],
+    ids=["plain", "quoted", "empty", "not_str"],
+)
+def test_write_csv_file_fast(lines, tmp_path) -> None:
+    # given
+    spec = CSVSpec(["f1", "f2"], True, "utf-8")
+    expected_file = tmp_path / __rnd_filename(".csv")
+    write_csv_file(spec, lines, expected_file)
+    output_file = tmp_path / __rnd_filename(".csv")
+
+    # when
+    write_csv_file_fast(spec, lines, output_file, batch_size=2)
+
+    # then
+    assert output_file.read_bytes() == expected_file.read_bytes()
+
+
+def test_write_csv_file_fast_random_values(tmp_path) -> None:
+    # given random values with occasional delimiters, quotes and new lines
+    alphabet = string.ascii_lowercase * 10 + ',"\r\n ;'
+    lines = [
+        ["".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 8))) for _ in range(3)]
+        for _ in range(500)
+    ]
+    spec = CSVSpec(["f1", "f2", "f3"], False, "utf-8", delimiter=";")
+    expected_file = tmp_path / __rnd_filename(".csv")
+    write_csv_file(spec, lines, expected_file)
+    output_file = tmp_path / __rnd_filename(".csv")
+
+    # when
+    write_csv_file_fast(spec, lines, output_file, batch_size=3)
+
+    # then
+    assert output_file.read_bytes() == expected_file.read_bytes()
+
+
+def test_write_csv_batches(tmp_path) -> None:
+    # given
+    spec = CSVSpec(["f1", "f2"], True, "utf-8")
+    batches = [[["a", "b"], ["c", "d,d"]], [["e"], ["f"]]]
+    output_file = tmp_path / __rnd_filename(".csv")
+
+    # when
+    write_csv_batches(spec, batches, output_file)
+
+    # then
+    with open(output_file, newline="") as f:
+        csv_output = f.read()
+    assert csv_output == 'f1,f2\r\na,c\r\nb,"d,d"\r\ne,f\r\n'
+
+
+def test_write_csv_file_compressed(tmp_path) -> None:
+    # given
+    output_file = tmp_path / __rnd_filename(".csv.bz2")
+    spec = CSVSpec(["f1", "f2"], True, "utf-8")
+    lines = (("s" * 5 for _ in range(2)) for _ in range(4))
+
+    # when
+    write_csv_file(spec, lines, output_file)
+
+    # then
+    with bz2.open(output_file, "rt", newline="") as f:
+        csv_output = f.read()
+    assert csv_output == "f1,f2\r\n" + "sssss,sssss\r\n" * 4
+
+
+def test_write_csv_file_instrumented(tmp_path) -> None:
+    # given lines with values which need quoting
+    output_file = tmp_path / __rnd_filename(".csv")
+    expected_file = tmp_path / __rnd_filename(".csv")
+    spec = CSVSpec(["f1", "f2"], True, "utf-8")
+    lines: List[List[Any]] = [["a,b", "c"], ['"', "ä"], [1, None]]
+    instrumentation = Instrumentation()
+
+    # when
+    write_csv_file(spec, lines, output_file, instrumentation)
+    write_csv_file(spec, lines, expected_file)
+
+    # then
+    assert output_file.read_bytes() == expected_file.read_bytes()
+    stats = instrumentation.stats()
+    assert stats.rows_written == 3
+    assert stats.bytes_written == output_file.stat().st_size
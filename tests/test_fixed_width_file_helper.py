@@ -1,13 +1,31 @@
+import datetime
+from decimal import Decimal
+import gzip
+import lzma
 import random as rnd
 import string
 
 import pytest
 
 from dck_problem1.fixed_width_file_helper import (
+    DictionaryColumn,
+    FixedWidthReader,
+    FWFOverflow,
+    build_fwf_key_index,
+    equals_predicate,
+    fwf_index_path,
+    fwf_key_index_path,
     generate_fwf_file,
+    generate_fwf_file_bulk,
+    generate_fwf_file_parallel,
     generate_fwf_lines,
+    lookup_fwf_records,
+    parse_fwf_batches,
     parse_fwf_file,
+    parse_fwf_file_mmap,
+    write_fwf_file,
 )
+from dck_problem1.instrumentation import Instrumentation
 from dck_problem1.models import FWFColumnSpec, FWFSpec
 
 
@@ -15,6 +33,10 @@ def __rnd_filename(ext, length=10) -> str:
     return "".join(rnd.choice(string.ascii_lowercase) for _ in range(length)) + ext
 
 
+def __fail_scan(*args) -> None:
+    raise AssertionError("the whole fixed width file is scanned")
+
+
 def test_generate_fwf_lines_line_length() -> None:
     # given number of lines and spec with header=False
     number_of_lines = 1
@@ -164,3 +186,816 @@ def test_pasrse_fwf_file_utf_16(tmp_path) -> None:
     # then
     assert len(lines) == number_of_lines
     assert list(lines[0]) == ["wyjście", "bbbb"]
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"], ids=["lf", "crlf"])
+def test_parse_fwf_file_mmap(newline, tmp_path) -> None:
+    # given windows-1252 fwf file with a header, non-breaking spaces and a short last line
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    with open(fwf_file, "w", encoding="windows-1252", newline="") as f:
+        f.write("f1  f2" + newline)
+        f.write("aé  bbbb " + newline)
+        f.write("\xa0a\xa0 b b  " + newline)
+        f.write("ccc")
+    spec = FWFSpec(
+        [FWFColumnSpec("a", 0, 4), FWFColumnSpec("b", 4, 5)],
+        True,
+        "windows-1252",
+    )
+
+    # when
+    lines = [list(line) for line in parse_fwf_file_mmap(spec, fwf_file)]
+
+    # then rows are the same as produced by the text parser
+    assert lines == [["aé", "bbbb"], ["a", "b b"], ["ccc", ""]]
+    assert lines == [list(line) for line in parse_fwf_file(spec, fwf_file)]
+
+
+def test_parse_fwf_file_mmap_blocks(tmp_path) -> None:
+    # given fwf file with lines of different length, some longer than a block
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    with open(fwf_file, "w", encoding="windows-1252", newline="") as f:
+        f.write("f1  f2\n")
+        f.writelines(("x" * rnd.randint(0, 12) + rnd.choice(["\n", "\r\n"]) for _ in range(200)))
+        f.write("\n\nlast")
+    spec = FWFSpec([FWFColumnSpec("a", 0, 4), FWFColumnSpec("b", 4, 5)], True, "windows-1252")
+
+    # when decoded in small blocks
+    lines = list(parse_fwf_file_mmap(spec, fwf_file, block_size=7))
+
+    # then rows are the same as produced by the text parser
+    assert lines == [list(line) for line in parse_fwf_file(spec, fwf_file)]
+
+
+def test_parse_fwf_file_mmap_empty_file(tmp_path) -> None:
+    # given
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    fwf_file.touch()
+    spec = FWFSpec([FWFColumnSpec("a", 0, 4)], True, "windows-1252")
+
+    # when
+    lines = list(parse_fwf_file_mmap(spec, fwf_file))
+
+    # then
+    assert lines == []
+
+
+def test_parse_fwf_file_mmap_multibyte_encoding(tmp_path) -> None:
+    # given
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    spec = FWFSpec([FWFColumnSpec("a", 0, 4)], False, "utf-8")
+
+    # then expect an exception
+    with pytest.raises(ValueError, match="not a single-byte encoding"):
+        # when
+        list(parse_fwf_file_mmap(spec, fwf_file))
+
+
+def test_parse_fwf_batches(tmp_path) -> None:
+    # given fwf file with a header and 5 lines
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    with open(fwf_file, "w") as f:
+        f.write("f1  f2\n")
+        f.writelines((f"a{i}  b{i}  \n" for i in range(5)))
+    spec = FWFSpec([FWFColumnSpec("a", 0, 4), FWFColumnSpec("b", 4, 4)], True, "utf-8")
+
+    # when
+    batches = list(parse_fwf_batches(spec, fwf_file, batch_size=2))
+
+    # then
+    assert batches == [
+        [["a0", "a1"], ["b0", "b1"]],
+        [["a2", "a3"], ["b2", "b3"]],
+        [["a4"], ["b4"]],
+    ]
+    rows = [list(zip(*batch)) for batch in batches]
+    assert [list(row) for batch in rows for row in batch] == [
+        list(line) for line in parse_fwf_file(spec, fwf_file)
+    ]
+
+
+@pytest.mark.parametrize("encoding", ["windows-1252", "utf-16"])
+def test_generate_fwf_file_bulk(encoding, tmp_path) -> None:
+    # given
+    number_of_lines = 50
+    output_file = tmp_path / __rnd_filename(".txt")
+    spec = FWFSpec([FWFColumnSpec("a", 0, 4), FWFColumnSpec("b", 4, 5)], True, encoding)
+
+    # when generated in blocks of a few lines
+    generate_fwf_file_bulk(spec, number_of_lines, output_file, seed=1, block_size=64)
+
+    # then
+    with open(output_file, encoding=encoding) as f:
+        lines = f.read().split("\n")
+    assert lines[0] == "a   b    ", "header should be present"
+    assert lines[-1] == "", "last line should end with a new line"
+    assert len(lines[1:-1]) == number_of_lines, "number of lines should be correct"
+    assert all(len(line) == 9 and line.isalpha() and line.islower() for line in lines[1:-1])
+
+
+def test_generate_fwf_file_bulk_seed(tmp_path) -> None:
+    # given
+    spec = FWFSpec([FWFColumnSpec("a", 0, 10)], False, "utf-8")
+    files = [tmp_path / __rnd_filename(".txt") for _ in range(3)]
+
+    # when
+    generate_fwf_file_bulk(spec, 100, files[0], seed=42)
+    generate_fwf_file_bulk(spec, 100, files[1], seed=42)
+    generate_fwf_file_bulk(spec, 100, files[2], seed=43)
+
+    # then
+    assert files[0].read_bytes() == files[1].read_bytes(), "same seed should give same file"
+    assert files[0].read_bytes() != files[2].read_bytes()
+
+
+def test_generate_fwf_file_parallel(tmp_path) -> None:
+    # given
+    number_of_lines = 95
+    spec = FWFSpec([FWFColumnSpec("a", 0, 4), FWFColumnSpec("b", 4, 5)], True, "utf-8")
+    files = [tmp_path / __rnd_filename(".txt") for _ in range(2)]
+
+    # when generated with different number of workers
+    generate_fwf_file_parallel(spec, number_of_lines, files[0], 1, seed=3, shard_lines=10)
+    generate_fwf_file_parallel(spec, number_of_lines, files[1], 3, seed=3, shard_lines=10)
+
+    # then
+    with open(files[0]) as f:
+        lines = f.read().split("\n")
+    assert lines[0] == "a   b    ", "header should be present once"
+    assert lines[-1] == "", "last line should end with a new line"
+    assert len(lines[1:-1]) == number_of_lines, "number of lines should be correct"
+    assert all(len(line) == 9 and line.isalpha() and line.islower() for line in lines[1:-1])
+    assert len(set(lines[1:-1])) == number_of_lines, "shards should not repeat lines"
+    assert files[0].read_bytes() == files[1].read_bytes(), "output should not depend on workers"
+
+
+def test_generate_fwf_file_parallel_encoding(tmp_path) -> None:
+    # given
+    spec = FWFSpec([FWFColumnSpec("a", 0, 4)], False, "utf-16")
+
+    # then expect an exception
+    with pytest.raises(ValueError, match="not ascii compatible"):
+        # when
+        generate_fwf_file_parallel(spec, 1, tmp_path / __rnd_filename(".txt"), 2)
+
+
+def test_parse_fwf_file_typed(tmp_path) -> None:
+    # given fwf file with typed columns
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    with open(fwf_file, "w", encoding="windows-1252") as f:
+        f.write("abc   42 20201231012345\n")
+        f.write("       7         000000\n")
+    spec = FWFSpec(
+        [
+            FWFColumnSpec("a", 0, 4),
+            FWFColumnSpec("b", 4, 4, "int"),
+            FWFColumnSpec("c", 8, 9, "date"),
+            FWFColumnSpec("d", 17, 6, "fixed", 2),
+        ],
+        False,
+        "windows-1252",
+    )
+    expected = [
+        ["abc", 42, datetime.date(2020, 12, 31), Decimal("123.45")],
+        ["", 7, None, Decimal("0.00")],
+    ]
+
+    # when
+    lines = [list(line) for line in parse_fwf_file(spec, fwf_file, typed=True)]
+    mmap_lines = list(parse_fwf_file_mmap(spec, fwf_file, typed=True))
+    batches = list(parse_fwf_batches(spec, fwf_file, typed=True))
+
+    # then
+    assert lines == expected
+    assert mmap_lines == expected
+    assert batches == [[list(column) for column in zip(*expected)]]
+
+
+def test_generate_fwf_file_bulk_numeric(tmp_path) -> None:
+    # given
+    output_file = tmp_path / __rnd_filename(".txt")
+    spec = FWFSpec(
+        [
+            FWFColumnSpec("a", 0, 3),
+            FWFColumnSpec("b", 3, 4, "int"),
+            FWFColumnSpec("c", 7, 6, "decimal", 2),
+            FWFColumnSpec("d", 13, 5, "fixed", 1),
+        ],
+        False,
+        "utf-8",
+    )
+
+    # when
+    generate_fwf_file_bulk(spec, 20, output_file, seed=5)
+
+    # then values can be converted to column dtypes
+    lines = list(parse_fwf_file(spec, output_file, typed=True))
+    assert len(lines) == 20
+    for line in lines:
+        assert [type(value) for value in line] == [str, int, Decimal, Decimal]
+
+
+def test_generate_fwf_file_bulk_date(tmp_path) -> None:
+    # given
+    spec = FWFSpec([FWFColumnSpec("a", 0, 8, "date")], False, "utf-8")
+
+    # then expect an exception
+    with pytest.raises(
+        ValueError, match="Datatype date of column a is not supported by bulk generation"
+    ):
+        # when
+        generate_fwf_file_bulk(spec, 1, tmp_path / __rnd_filename(".txt"))
+
+
+def test_parse_fwf_file_compressed(tmp_path) -> None:
+    # given the same fwf file plain and compressed
+    spec = FWFSpec([FWFColumnSpec("a", 0, 4), FWFColumnSpec("b", 4, 5)], True, "windows-1252")
+    plain_file = tmp_path / __rnd_filename(".txt")
+    compressed_file = tmp_path / __rnd_filename(".txt.xz")
+    generate_fwf_file(spec, 100, plain_file)
+    with open(plain_file, "rb") as source, lzma.open(compressed_file, "wb") as target:
+        target.write(source.read())
+
+    # when
+    lines = [list(line) for line in parse_fwf_file(spec, compressed_file)]
+    batches = list(parse_fwf_batches(spec, compressed_file))
+
+    # then
+    assert lines == [list(line) for line in parse_fwf_file(spec, plain_file)]
+    assert batches == list(parse_fwf_batches(spec, plain_file))
+    with pytest.raises(ValueError, match="can not be memory mapped"):
+        list(parse_fwf_file_mmap(spec, compressed_file))
+
+
+def test_parse_fwf_file_plain_file_with_bz2_magic(tmp_path) -> None:
+    # given plain file starting with the bz2 magic bytes
+    spec = FWFSpec([FWFColumnSpec("a", 0, 8), FWFColumnSpec("b", 8, 2)], False, "utf-8")
+    input_file = tmp_path / __rnd_filename(".txt")
+    input_file.write_text("BZhang  ab\nLi      cd\n", encoding="utf-8")
+
+    # when
+    lines = [list(line) for line in parse_fwf_file(spec, input_file)]
+
+    # then
+    assert lines == [["BZhang", "ab"], ["Li", "cd"]]
+
+
+def test_generate_fwf_file_bulk_compressed(tmp_path) -> None:
+    # given
+    spec = FWFSpec([FWFColumnSpec("a", 0, 4)], False, "utf-8")
+    output_file = tmp_path / __rnd_filename(".txt.gz")
+
+    # when
+    generate_fwf_file_bulk(spec, 10, output_file, seed=1)
+
+    # then
+    with gzip.open(output_file, "rt") as f:
+        lines = f.readlines()
+    assert len(lines) == 10
+
+
+def test_parse_fwf_file_columns_where(tmp_path) -> None:
+    # given fwf file with a status column
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    with open(fwf_file, "w", encoding="windows-1252") as f:
+        f.write("id status name \n")
+        f.write("1  A     anna \n")
+        f.write("2  B     bob  \n")
+        f.write("3  A     carl \n")
+    spec = FWFSpec(
+        [
+            FWFColumnSpec("id", 0, 3, "int"),
+            FWFColumnSpec("status", 3, 6),
+            FWFColumnSpec("name", 9, 6),
+        ],
+        True,
+        "windows-1252",
+    )
+    columns = ["name", "id"]
+    where = {"status": equals_predicate("A")}
+
+    # when
+    lines = [list(line) for line in parse_fwf_file(spec, fwf_file, columns=columns, where=where)]
+    mmap_lines = list(parse_fwf_file_mmap(spec, fwf_file, columns=columns, where=where))
+    typed_lines = list(parse_fwf_file(spec, fwf_file, typed=True, columns=columns, where=where))
+    batches = list(parse_fwf_batches(spec, fwf_file, columns=columns, where=where))
+
+    # then only projected columns of matching lines are returned
+    assert lines == [["anna", "1"], ["carl", "3"]]
+    assert mmap_lines == lines
+    assert typed_lines == [["anna", 1], ["carl", 3]]
+    assert batches == [[["anna", "carl"], ["1", "3"]]]
+
+
+def test_parse_fwf_file_unknown_column(tmp_path) -> None:
+    # given
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    fwf_file.touch()
+    spec = FWFSpec([FWFColumnSpec("a", 0, 4)], False, "utf-8")
+
+    # then expect an exception
+    with pytest.raises(ValueError, match="Column b not found"):
+        # when
+        list(parse_fwf_file(spec, fwf_file, where={"b": equals_predicate("x")}))
+
+
+@pytest.mark.parametrize("terminator", ["\n", "\r\n"])
+def test_fixed_width_reader_fixed_stride(tmp_path, monkeypatch, terminator) -> None:
+    # given fwf file with a header where every record has the same size
+    spec = FWFSpec(
+        [FWFColumnSpec("a", 0, 4, "int"), FWFColumnSpec("b", 4, 5)], True, "windows-1252"
+    )
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    with open(fwf_file, "w", encoding=spec.encoding, newline="") as f:
+        f.write(f"a   b    {terminator}")
+        f.writelines(f"{i:<4}v{i:<4}{terminator}" for i in range(100))
+    expected = [[str(i), f"v{i}"] for i in range(100)]
+    monkeypatch.setattr(FixedWidthReader, "_FixedWidthReader__build_index", __fail_scan)
+
+    # when
+    with FixedWidthReader(spec, fwf_file) as reader:
+        length, first, last, records = len(reader), reader[0], reader[-1], reader[10:20]
+        every_other, all_records = reader[1:10:2], list(reader)
+        with pytest.raises(IndexError):
+            reader[100]
+    with FixedWidthReader(spec, fwf_file, typed=True, columns=["a"]) as reader:
+        typed = reader[42]
+
+    # then records are found without an index
+    assert length == 100
+    assert first == expected[0]
+    assert last == expected[-1]
+    assert records == expected[10:20]
+    assert every_other == expected[1:10:2]
+    assert all_records == expected
+    assert typed == [42]
+    assert fwf_index_path(fwf_file).exists()
+
+
+def test_fixed_width_reader_sparse_index(tmp_path) -> None:
+    # given utf-8 fwf file with trimmed lines and mixed line terminators
+    spec = FWFSpec([FWFColumnSpec("a", 0, 4), FWFColumnSpec("b", 4, 5)], False, "utf-8")
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    with open(fwf_file, "w", encoding=spec.encoding, newline="") as f:
+        for i in range(50):
+            f.write(f"{i:<4}\u00e9{i}" + ("\r\n" if i % 3 else "\n"))
+        f.write("last")
+    expected = [[str(i), f"\u00e9{i}"] for i in range(50)] + [["last", ""]]
+
+    # when
+    with FixedWidthReader(spec, fwf_file, index_step=7) as reader:
+        records = [reader[i] for i in range(len(reader))]
+        sliced = reader[5:30]
+    index_file = fwf_index_path(fwf_file)
+    index_size = index_file.stat().st_size
+    with FixedWidthReader(spec, fwf_file, index_step=7) as reader:
+        reloaded = reader[49:]
+
+    # then sidecar index stores every 7th offset and is reused
+    assert records == expected
+    assert sliced == expected[5:30]
+    assert reloaded == expected[49:]
+    assert index_file.stat().st_size == index_size
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        # blank and trimmed lines of the same total size as fixed size records
+        "abc\n\nab\nabc\n",
+        "\r\n\u00ff\r\na\r\n",
+        "abc\rab\rabc\r",
+        "abc\r\nab\rc\r\n",
+        "abc\n\n",
+        "abc\nab",
+        "\n",
+        "",
+    ],
+)
+@pytest.mark.parametrize("header", [False, True])
+@pytest.mark.parametrize("widths", ["chars", "bytes"])
+def test_fixed_width_reader_parse_fwf_file_records(tmp_path, content, header, widths) -> None:
+    # given fwf file with blank lines, trimmed lines or mixed line terminators
+    spec = FWFSpec(
+        [FWFColumnSpec("a", 0, 2), FWFColumnSpec("b", 2, 1)], header, "windows-1252", widths
+    )
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    fwf_file.write_bytes(("h\n" if header else "").encode() + content.encode(spec.encoding))
+    expected = [list(line) for line in parse_fwf_file(spec, fwf_file)]
+
+    # when
+    with FixedWidthReader(spec, fwf_file, index_step=2) as reader:
+        length, records = len(reader), list(reader)
+        indexed = [reader[i] for i in range(length)]
+
+    # then records are the lines parse_fwf_file parses
+    assert length == len(expected)
+    assert records == expected
+    assert indexed == expected
+
+
+@pytest.mark.parametrize("content", ["abc\nabc\n" * 20, "abc\nab\n" * 20])
+def test_fixed_width_reader_reuses_layout(tmp_path, monkeypatch, content) -> None:
+    # given fwf file opened once, so its layout is checked and recorded in the sidecar
+    spec = FWFSpec([FWFColumnSpec("a", 0, 3)], False, "windows-1252")
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    fwf_file.write_text(content, encoding=spec.encoding)
+    with FixedWidthReader(spec, fwf_file, index_step=3) as reader:
+        expected = list(reader)
+
+    # when opened again without scanning the file
+    monkeypatch.setattr(FixedWidthReader, "_FixedWidthReader__fixed_stride_length", __fail_scan)
+    monkeypatch.setattr(FixedWidthReader, "_FixedWidthReader__build_index", __fail_scan)
+    with FixedWidthReader(spec, fwf_file, index_step=3) as reader:
+        records = list(reader)
+
+    # then
+    assert records == expected
+
+
+def test_fixed_width_reader_partial_index(tmp_path) -> None:
+    # given index of trimmed lines truncated by a crash while it was written
+    spec = FWFSpec([FWFColumnSpec("a", 0, 3)], False, "windows-1252")
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    fwf_file.write_text("abc\nab\n" * 20, encoding=spec.encoding)
+    with FixedWidthReader(spec, fwf_file, index_step=3) as reader:
+        expected = list(reader)
+    index_file = fwf_index_path(fwf_file)
+    index_file.write_bytes(index_file.read_bytes()[:-8])
+
+    # when
+    with FixedWidthReader(spec, fwf_file, index_step=3) as reader:
+        records = [reader[i] for i in range(len(reader))]
+
+    # then the index is rebuilt
+    assert records == expected
+    assert len(list(tmp_path.glob("*.tmp"))) == 0
+
+
+def test_fixed_width_reader_stale_index(tmp_path) -> None:
+    # given indexed fwf file
+    spec = FWFSpec([FWFColumnSpec("a", 0, 4)], False, "utf-8")
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    fwf_file.write_text("a\nbb\n", encoding="utf-8")
+    with FixedWidthReader(spec, fwf_file) as reader:
+        assert len(reader) == 2
+
+    # when the file changes
+    fwf_file.write_text("a\nbb\nccc\n", encoding="utf-8")
+    with FixedWidthReader(spec, fwf_file) as reader:
+        records = list(reader)
+
+    # then the index is rebuilt
+    assert records == [["a"], ["bb"], ["ccc"]]
+
+
+def test_lookup_fwf_records(tmp_path) -> None:
+    # given fwf file with a repeated key
+    spec = FWFSpec(
+        [FWFColumnSpec("id", 0, 3, "int"), FWFColumnSpec("city", 3, 6)], True, "windows-1252"
+    )
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    cities = ["oslo", "rome", "paris", "oslo", "bern", "rome", "oslo"]
+    with open(fwf_file, "w", encoding=spec.encoding) as f:
+        f.write("id city  \n")
+        f.writelines(f"{i:<3}{city:<6}\n" for i, city in enumerate(cities))
+
+    # when
+    index_file = build_fwf_key_index(spec, fwf_file, "city")
+    oslo = lookup_fwf_records(spec, fwf_file, "city", "oslo")
+    rome_ids = lookup_fwf_records(spec, fwf_file, "city", "rome", typed=True, columns=["id"])
+    missing = lookup_fwf_records(spec, fwf_file, "city", "madrid")
+    first = lookup_fwf_records(spec, fwf_file, "id", "0")
+
+    # then
+    assert index_file == fwf_key_index_path(fwf_file, "city")
+    assert oslo == [["0", "oslo"], ["3", "oslo"], ["6", "oslo"]]
+    assert rome_ids == [[1], [5]]
+    assert missing == []
+    assert first == [["0", "oslo"]]
+
+
+def test_lookup_fwf_records_stale_index(tmp_path) -> None:
+    # given indexed fwf file
+    spec = FWFSpec([FWFColumnSpec("a", 0, 4)], False, "utf-8")
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    fwf_file.write_text("x\ny\n", encoding="utf-8")
+    build_fwf_key_index(spec, fwf_file, "a")
+
+    # when the file changes
+    fwf_file.write_text("x\ny\nzz\nx\n", encoding="utf-8")
+    records = lookup_fwf_records(spec, fwf_file, "a", "x")
+
+    # then the index is rebuilt
+    assert records == [["x"], ["x"]]
+
+
+@pytest.mark.parametrize("trimmed", [False, True])
+def test_lookup_fwf_records_without_scan(tmp_path, monkeypatch, trimmed) -> None:
+    # given indexed fwf file of fixed size or trimmed records
+    spec = FWFSpec([FWFColumnSpec("id", 0, 4), FWFColumnSpec("city", 4, 6)], False, "utf-8")
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    with open(fwf_file, "w", encoding=spec.encoding) as f:
+        f.writelines(f"{i:<4}{'rome' if i % 2 else 'paris':<6}\n" for i in range(1000))
+    if trimmed:
+        fwf_file.write_text(fwf_file.read_text().replace(" \n", "\n"))
+    build_fwf_key_index(spec, fwf_file, "id")
+
+    # when records are looked up without reading the whole file
+    monkeypatch.setattr(FixedWidthReader, "_FixedWidthReader__fixed_stride_length", __fail_scan)
+    monkeypatch.setattr(FixedWidthReader, "_FixedWidthReader__build_index", __fail_scan)
+    monkeypatch.setattr(FixedWidthReader, "__iter__", __fail_scan)
+    records = [lookup_fwf_records(spec, fwf_file, "id", str(i)) for i in (0, 501, 999)]
+
+    # then
+    assert records == [[["0", "paris"]], [["501", "rome"]], [["999", "rome"]]]
+
+
+def test_lookup_fwf_records_partial_index(tmp_path) -> None:
+    # given key index truncated by a crash while it was written
+    spec = FWFSpec([FWFColumnSpec("a", 0, 4)], False, "utf-8")
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    fwf_file.write_text("x\ny\nzz\nx\n", encoding="utf-8")
+    index_file = build_fwf_key_index(spec, fwf_file, "a")
+    index_file.write_bytes(index_file.read_bytes()[:-5])
+
+    # when
+    records = lookup_fwf_records(spec, fwf_file, "a", "zz")
+
+    # then the index is rebuilt
+    assert records == [["zz"]]
+    assert len(list(tmp_path.glob("*.tmp"))) == 0
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_parse_fwf_file_instrumented(newline, tmp_path) -> None:
+    # given fwf file with a header and a last line without a line terminator
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    with open(fwf_file, "w", encoding="utf-8", newline=newline) as f:
+        f.write("a   b   \nä1  42  \nb2  7   \nc3  9")
+    spec = FWFSpec([FWFColumnSpec("a", 0, 4), FWFColumnSpec("b", 4, 4, "int")], True, "utf-8")
+    instrumentation = Instrumentation()
+
+    # when
+    lines = list(parse_fwf_file(spec, fwf_file, typed=True, instrumentation=instrumentation))
+    filtered = list(
+        parse_fwf_file(
+            spec, fwf_file, where={"a": equals_predicate("b2")}, instrumentation=Instrumentation()
+        )
+    )
+
+    # then values are the same as parsed without instrumentation
+    assert lines == [list(line) for line in parse_fwf_file(spec, fwf_file, typed=True)]
+    assert filtered == [["b2", "7"]]
+    stats = instrumentation.stats()
+    assert stats.rows_read == 3
+    assert stats.bytes_read == fwf_file.stat().st_size
+    assert all(stats.stage_seconds[stage] > 0 for stage in ("read", "decode", "slice", "strip"))
+
+
+def test_generate_fwf_file_instrumented(tmp_path) -> None:
+    # given
+    output_file = tmp_path / __rnd_filename(".txt")
+    spec = FWFSpec([FWFColumnSpec("a", 0, 10)], True, "utf-16")
+    instrumentation = Instrumentation()
+
+    # when
+    generate_fwf_file(spec, 4, output_file, lambda col: "s" * col.length, instrumentation)
+
+    # then
+    with open(output_file, encoding="utf-16") as f:
+        assert f.read() == "a         \n" + "ssssssssss\n" * 4
+    stats = instrumentation.stats()
+    assert stats.rows_written == 5
+    assert stats.bytes_written == output_file.stat().st_size
+
+
+def __write_fwf_byte_file(path, number_of_lines: int, newline: bytes = b"\n") -> None:
+    # "é" is encoded as 2 bytes, so values are padded to byte lengths
+    with open(path, "wb") as f:
+        f.write(b"a   b    " + newline)
+        for i in range(number_of_lines):
+            f.write(f"{i:<4}".encode() + f"é{i:<3}".encode() + newline)
+
+
+@pytest.mark.parametrize("newline", [b"\n", b"\r\n"], ids=["lf", "crlf"])
+def test_parse_fwf_file_byte_widths(newline, tmp_path) -> None:
+    # given utf-8 fwf file with multi-byte characters and byte widths
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    __write_fwf_byte_file(fwf_file, 30, newline)
+    spec = FWFSpec(
+        [FWFColumnSpec("a", 0, 4, "int"), FWFColumnSpec("b", 4, 5)], True, "utf-8", "bytes"
+    )
+    expected = [[str(i), f"é{i}"] for i in range(30)]
+
+    # when
+    lines = [list(line) for line in parse_fwf_file(spec, fwf_file)]
+    typed = [list(line) for line in parse_fwf_file(spec, fwf_file, typed=True, columns=["a"])]
+    filtered = [
+        list(line) for line in parse_fwf_file(spec, fwf_file, where={"b": equals_predicate("é7")})
+    ]
+    instrumented = list(parse_fwf_file(spec, fwf_file, instrumentation=Instrumentation()))
+    mmapped = [list(line) for line in parse_fwf_file_mmap(spec, fwf_file, block_size=32)]
+    batches = list(parse_fwf_batches(spec, fwf_file, batch_size=7))
+
+    # then values are decoded on their own and match character values
+    assert lines == expected
+    assert typed == [[i] for i in range(30)]
+    assert filtered == [["7", "é7"]]
+    assert instrumented == expected
+    assert mmapped == expected
+    assert [row for columns in batches for row in map(list, zip(*columns))] == expected
+
+
+def test_fixed_width_reader_byte_widths(tmp_path, monkeypatch) -> None:
+    # given utf-8 fwf file with byte widths, every record has the same size in bytes
+    spec = FWFSpec([FWFColumnSpec("a", 0, 4), FWFColumnSpec("b", 4, 5)], True, "utf-8", "bytes")
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    __write_fwf_byte_file(fwf_file, 100)
+    trimmed_file = tmp_path / __rnd_filename(".txt")
+    trimmed_file.write_bytes(fwf_file.read_bytes().replace(b" \n", b"\n"))
+    expected = [[str(i), f"é{i}"] for i in range(100)]
+
+    # when
+    with monkeypatch.context() as patched:
+        patched.setattr(FixedWidthReader, "_FixedWidthReader__build_index", __fail_scan)
+        with FixedWidthReader(spec, fwf_file) as reader:
+            records = [reader[0], reader[-1]] + reader[10:20]
+    with FixedWidthReader(spec, trimmed_file, index_step=7) as reader:
+        trimmed = list(reader)
+
+    # then records are found without an index and by the line index of trimmed lines
+    assert records == [expected[0], expected[-1]] + expected[10:20]
+    assert trimmed == expected
+
+
+def test_write_fwf_file(tmp_path) -> None:
+    # given spec with aligned columns and rows of a small batch size
+    spec = FWFSpec(
+        [
+            FWFColumnSpec("s", 0, 4),
+            FWFColumnSpec("i", 4, 4, "int"),
+            FWFColumnSpec("f", 8, 5, "fixed", 2),
+            FWFColumnSpec("d", 13, 9, "date"),
+        ],
+        True,
+        "windows-1252",
+    )
+    rows = [
+        ["ab", "42", "123", "20200102"],
+        ["é", "", "-5", ""],
+        ["abcd", "1234", "12345", ""],
+        ["x", "7", "", ""],
+    ]
+    output_file = tmp_path / __rnd_filename(".txt")
+
+    # when
+    overflows = write_fwf_file(spec, iter(rows), output_file, batch_size=2)
+
+    # then values are padded and parsed back
+    assert output_file.read_text(encoding="windows-1252") == (
+        "s   i   f    d        \n"
+        "ab    420012320200102 \n"
+        "é       -0005         \n"
+        "abcd123412345         \n"
+        "x      7              \n"
+    )
+    assert [list(line) for line in parse_fwf_file(spec, output_file)] == [
+        ["ab", "42", "00123", "20200102"],
+        ["é", "", "-0005", ""],
+        ["abcd", "1234", "12345", ""],
+        ["x", "7", "", ""],
+    ]
+    assert [list(line)[2] for line in parse_fwf_file(spec, output_file, typed=True)] == [
+        Decimal("1.23"),
+        Decimal("-0.05"),
+        Decimal("123.45"),
+        None,
+    ]
+    assert overflows == []
+
+
+@pytest.mark.parametrize(
+    "overflow,expected_lines,expected_overflows",
+    [
+        ("truncate", ["abcé 1", "ab   22"], []),
+        (
+            "report",
+            ["abcé 1", "ab   22"],
+            [FWFOverflow(0, "s", "abcéé"), FWFOverflow(1, "i", "223")],
+        ),
+    ],
+)
+def test_write_fwf_file_overflow(overflow, expected_lines, expected_overflows, tmp_path) -> None:
+    # given utf-8 spec with byte widths, "é" is encoded as 2 bytes
+    spec = FWFSpec(
+        [FWFColumnSpec("s", 0, 5), FWFColumnSpec("i", 5, 2, "int")], False, "utf-8", "bytes"
+    )
+    rows = [["abcéé", "1"], ["ab", "223"]]
+    output_file = tmp_path / __rnd_filename(".txt")
+
+    # when
+    overflows = write_fwf_file(spec, rows, output_file, overflow)
+
+    # then values are truncated to byte lengths without splitting characters
+    assert output_file.read_text(encoding="utf-8").splitlines() == expected_lines
+    assert all(len(line.encode()) == 7 for line in expected_lines)
+    assert overflows == expected_overflows
+
+
+@pytest.mark.parametrize(
+    "rows,message",
+    [
+        (
+            [["ab", "1"], ["abcdef", "2"]],
+            "Value 'abcdef' of column s in record 1 is longer than 5",
+        ),
+        ([["ab", "1"], ["ab"]], "Record 1 has 1 values, expected 2 values"),
+        ([["ab", "1", "x"]], "Record 0 has 3 values, expected 2 values"),
+        ([["ab", "1"], ["a\nb", "2"]], "Record 1 contains a line terminator"),
+    ],
+    ids=["overflow", "missing value", "extra value", "line terminator"],
+)
+def test_write_fwf_file_invalid_rows(rows, message, tmp_path) -> None:
+    # given
+    spec = FWFSpec([FWFColumnSpec("s", 0, 5), FWFColumnSpec("i", 5, 2, "int")], False, "utf-8")
+
+    # then expect an exception
+    with pytest.raises(ValueError, match=message):
+        # when
+        write_fwf_file(spec, rows, tmp_path / __rnd_filename(".txt"))
+
+
+@pytest.mark.parametrize("width_unit", ["chars", "bytes"])
+def test_parse_fwf_file_dictionary(width_unit, tmp_path) -> None:
+    # given fwf file with low-cardinality country and status columns and a unique id
+    spec = FWFSpec(
+        [
+            FWFColumnSpec("country", 0, 3),
+            FWFColumnSpec("status", 3, 2, "int"),
+            FWFColumnSpec("id", 5, 5),
+        ],
+        True,
+        "utf-8",
+        width_unit,
+    )
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    with open(fwf_file, "wb") as f:
+        f.write(b"ctrststid  \n")
+        for i in range(50):
+            f.write(f"{['DE', 'FR', 'NO'][i % 3]:<3}{i % 2:>2}{i:<5}\n".encode())
+    expected = [list(line) for line in parse_fwf_file(spec, fwf_file, typed=True)]
+
+    # when
+    lines = [list(line) for line in parse_fwf_file(spec, fwf_file, typed=True, dictionary_size=10)]
+    filtered = [
+        list(line)
+        for line in parse_fwf_file(
+            spec, fwf_file, where={"status": equals_predicate("1")}, dictionary_size=4
+        )
+    ]
+
+    # then values are the same and equal values of low-cardinality columns are shared
+    assert lines == expected
+    assert lines[0][0] is lines[3][0]
+    assert [line[2] for line in filtered] == [str(i) for i in range(1, 50, 2)]
+
+
+def test_parse_fwf_batches_dictionary(tmp_path) -> None:
+    # given fwf file where the second column gets more distinct values in later lines
+    spec = FWFSpec([FWFColumnSpec("a", 0, 2), FWFColumnSpec("b", 2, 3)], False, "windows-1252")
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    with open(fwf_file, "w", encoding=spec.encoding) as f:
+        f.writelines(
+            f"{'é' if i % 2 else 'x':<2}{i // 10 if i < 20 else i:<3}\n" for i in range(40)
+        )
+
+    # when
+    batches = list(parse_fwf_batches(spec, fwf_file, batch_size=10, dictionary_size=5))
+
+    # then the first column is dictionary encoded, the second one falls back to lists
+    assert [[list(column) for column in batch] for batch in batches] == [
+        [list(column) for column in batch] for batch in parse_fwf_batches(spec, fwf_file, 10)
+    ]
+    first, last = batches[0][0], batches[-1][0]
+    assert all(isinstance(batch[0], DictionaryColumn) for batch in batches)
+    assert isinstance(first, DictionaryColumn) and isinstance(last, DictionaryColumn)
+    assert first.dictionary is last.dictionary
+    assert last.dictionary == ["x", "é"]
+    assert last.codes == [0, 1] * 5
+    assert last[1:3] == ["é", "x"]
+    assert [type(batch[1]) for batch in batches] == [DictionaryColumn] * 2 + [list] * 2
+
+
+def test_parse_fwf_file_dictionary_invalid_size(tmp_path) -> None:
+    # given
+    spec = FWFSpec([FWFColumnSpec("a", 0, 2)], False, "utf-8")
+    fwf_file = tmp_path / __rnd_filename(".txt")
+    fwf_file.write_text("ab\n")
+
+    # then expect exceptions
+    with pytest.raises(ValueError, match="dictionary_size should be > 0"):
+        # when
+        list(parse_fwf_batches(spec, fwf_file, dictionary_size=0))
+    with pytest.raises(ValueError, match="can not be interned with instrumentation"):
+        list(parse_fwf_file(spec, fwf_file, dictionary_size=8, instrumentation=Instrumentation()))
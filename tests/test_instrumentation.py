@@ -0,0 +1,65 @@
+import pstats
+import random as rnd
+import string
+import tracemalloc
+from typing import Any, List, cast
+
+from dck_problem1.instrumentation import (
+    MEMORY_SNAPSHOT_SUFFIX,
+    Instrumentation,
+    ThroughputStats,
+    capture_profile,
+    timed,
+)
+
+
+def __rnd_filename(ext, length=10) -> str:
+    return "".join(rnd.choice(string.ascii_lowercase) for _ in range(length)) + ext
+
+
+def test_instrumentation() -> None:
+    # given instrumentation which reports on every count
+    reports: List[ThroughputStats] = []
+    instrumentation = Instrumentation(reports.append, interval=0)
+
+    # when
+    with timed(instrumentation, "read"):
+        instrumentation.add_read(0, 2 * 1024 * 1024)
+    instrumentation.add_read(10, 0)
+    instrumentation.add_written(10, 1024 * 1024)
+    stats = instrumentation.finish()
+
+    # then
+    assert len(reports) == 4
+    assert reports[-1] is stats
+    assert (stats.rows_read, stats.rows_written, stats.rows) == (10, 10, 10)
+    assert (stats.bytes_read, stats.bytes_written) == (2 * 1024 * 1024, 1024 * 1024)
+    assert stats.stage_seconds["read"] > 0
+    assert stats.stage_seconds["write"] == 0
+
+
+def test_throughput_stats_format() -> None:
+    # given
+    stats = ThroughputStats(2.0, 100, 100, 4 * 1024 * 1024, 2 * 1024 * 1024, {"read": 0.5})
+
+    # when
+    line = stats.format()
+
+    # then
+    assert line == ("100 rows in 2.00 s, 50 rows/s, read 2.00 MB/s, write 1.00 MB/s (read 25%)")
+
+
+def test_capture_profile(tmp_path) -> None:
+    # given
+    profile_file = tmp_path / __rnd_filename(".prof")
+
+    # when
+    with capture_profile(profile_file, memory=True):
+        sorted(rnd.random() for _ in range(1000))
+
+    # then
+    # total_calls is not declared by the pstats stubs
+    assert cast(Any, pstats.Stats(str(profile_file))).total_calls > 0
+    snapshot = tracemalloc.Snapshot.load(str(profile_file) + MEMORY_SNAPSHOT_SUFFIX)
+    assert snapshot.traces is not None
+    assert not tracemalloc.is_tracing()
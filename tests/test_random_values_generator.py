@@ -0,0 +1,36 @@
+from collections import Counter
+import random as rnd
+import string
+
+import pytest
+
+from dck_problem1.random_values_generator import rnd_digit_bytes, rnd_lowercase_bytes
+
+
+@pytest.mark.parametrize(
+    "generate,alphabet",
+    [(rnd_lowercase_bytes, string.ascii_lowercase), (rnd_digit_bytes, string.digits)],
+    ids=["letters", "digits"],
+)
+def test_rnd_alphabet_bytes_uniform(generate, alphabet) -> None:
+    # given
+    size = 2_600_000
+
+    # when
+    values = generate(rnd.Random(42), size)
+
+    # then every character is equally likely, every count is within 1 % of the expected one
+    counts = Counter(values.decode("ascii"))
+    expected = size / len(alphabet)
+    assert len(values) == size
+    assert set(counts) == set(alphabet)
+    assert all(abs(count - expected) < expected * 0.01 for count in counts.values())
+
+
+def test_rnd_alphabet_bytes_seed() -> None:
+    # when
+    first, second = rnd_digit_bytes(rnd.Random(7), 100), rnd_digit_bytes(rnd.Random(7), 100)
+
+    # then
+    assert first == second
+    assert rnd_lowercase_bytes(rnd.Random(7), 0) == bytearray()
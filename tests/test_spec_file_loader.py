@@ -1,9 +1,18 @@
+import json
+import os
+import pathlib
+import subprocess
+import sys
 from typing import List
 
 import marshmallow
 import pytest
 
-from dck_problem1.spec_file_loader import load_csv_spec_json, load_fwf_spec_json
+from dck_problem1.spec_file_loader import (
+    load_csv_spec_json,
+    load_fwf_spec_json,
+    load_spec_file,
+)
 
 
 @pytest.mark.parametrize(
@@ -188,3 +197,229 @@ def test_invalid_csv_spec(spec_json: str, message: str) -> None:
     with pytest.raises(marshmallow.ValidationError, match=message):
         # when parser is called
         load_csv_spec_json(spec_json)
+
+
+def test_valid_fwf_spec_width_unit() -> None:
+    # given
+    spec_json = """{"ColumnNames":["f1","f2"],
+             "Offsets":[3,4],
+             "WidthUnit":"bytes",
+             "IncludeHeader":"True",
+             "FixedWidthEncoding":"utf-8"}"""
+
+    # when spec parser is called
+    spec = load_fwf_spec_json(spec_json)
+
+    # then offsets are byte offsets
+    assert spec.width_unit == "bytes"
+    assert spec.byte_widths
+    assert not load_fwf_spec_json(spec_json.replace('"WidthUnit":"bytes",', "")).byte_widths
+
+
+@pytest.mark.parametrize(
+    "spec_json,message",
+    [
+        (
+            """{"ColumnNames":["f1"],
+              "Offsets":[3],
+              "WidthUnit":"bits",
+              "IncludeHeader":"True",
+              "FixedWidthEncoding":"utf-8"}""",
+            r".*?WidthUnit.*",
+        ),
+        (
+            """{"ColumnNames":["f1"],
+              "Offsets":[3],
+              "WidthUnit":"bytes",
+              "IncludeHeader":"True",
+              "FixedWidthEncoding":"utf-16"}""",
+            r".*?requires an ascii compatible encoding.*",
+        ),
+    ],
+    ids=['test unknown "WidthUnit"', 'test "WidthUnit" bytes with utf-16'],
+)
+def test_invalid_fwf_spec_width_unit(spec_json: str, message: str) -> None:
+    # then ValidattionError with message is expected
+    with pytest.raises(marshmallow.ValidationError, match=message):
+        # when parser is called
+        load_fwf_spec_json(spec_json)
+
+
+def test_valid_fwf_spec_fixed_scale() -> None:
+    # given fixed column with fraction digits only
+    spec_json = """{"ColumnNames":["f1"],
+             "Offsets":[3],
+             "ColumnTypes":["fixed"],
+             "ColumnScales":[3],
+             "IncludeHeader":"True",
+             "FixedWidthEncoding":"windows-1252"}"""
+
+    # when spec parser is called
+    spec = load_fwf_spec_json(spec_json)
+
+    # then
+    assert spec.columns[0].scale == 3
+
+
+def test_valid_fwf_spec_column_types() -> None:
+    # given
+    spec_json = """{"ColumnNames":["f1","f2","f3"],
+             "Offsets":[3,8,6],
+             "ColumnTypes":["str","date","fixed"],
+             "ColumnScales":[0,0,2],
+             "IncludeHeader":"True",
+             "FixedWidthEncoding":"windows-1252"}"""
+
+    # when spec parser is called
+    spec = load_fwf_spec_json(spec_json)
+
+    # then
+    assert [col.dtype for col in spec.columns] == ["str", "date", "fixed"]
+    assert [col.scale for col in spec.columns] == [0, 0, 2]
+
+
+@pytest.mark.parametrize(
+    "spec_json,message",
+    [
+        (
+            """{"ColumnNames":["f1","f2"],
+                "Offsets":[3,4],
+                "ColumnTypes":["str"],
+                "IncludeHeader":"True",
+                "FixedWidthEncoding":"windows-1252"}""",
+            r".*?ColumnTypes length must be the same as ColumnNames length.*",
+        ),
+        (
+            """{"ColumnNames":["f1"],
+                "Offsets":[3],
+                "ColumnTypes":["blob"],
+                "IncludeHeader":"True",
+                "FixedWidthEncoding":"windows-1252"}""",
+            r".*?Must be one of.*",
+        ),
+        (
+            """{"ColumnNames":["f1"],
+                "Offsets":[6],
+                "ColumnTypes":["date"],
+                "IncludeHeader":"True",
+                "FixedWidthEncoding":"windows-1252"}""",
+            r".*?Date column f1 length must be >= 8.*",
+        ),
+        (
+            """{"ColumnNames":["f1"],
+                "Offsets":[3],
+                "ColumnTypes":["decimal"],
+                "ColumnScales":[2],
+                "IncludeHeader":"True",
+                "FixedWidthEncoding":"windows-1252"}""",
+            r".*?Decimal column f1 scale must be < length - 1.*",
+        ),
+        (
+            """{"ColumnNames":["f1"],
+                "Offsets":[3],
+                "ColumnTypes":["fixed"],
+                "ColumnScales":[4],
+                "IncludeHeader":"True",
+                "FixedWidthEncoding":"windows-1252"}""",
+            r".*?Fixed column f1 scale must be <= length.*",
+        ),
+        (
+            """{"ColumnNames":["f1"],
+                "Offsets":[3],
+                "ColumnTypes":["int"],
+                "ColumnScales":[1],
+                "IncludeHeader":"True",
+                "FixedWidthEncoding":"windows-1252"}""",
+            r".*?Column f1 of type int must have scale 0.*",
+        ),
+    ],
+    ids=[
+        'test "ColumnTypes" "ColumnNames" length mismatch',
+        'test incorrect "ColumnTypes"',
+        "test short date column",
+        "test too large decimal scale",
+        "test too large fixed scale",
+        "test int scale",
+    ],
+)
+def test_invalid_fwf_spec_column_types(spec_json: str, message: str) -> None:
+    # then ValidattionError with message is expected
+    with pytest.raises(marshmallow.ValidationError, match=message):
+        # when parser is called
+        load_fwf_spec_json(spec_json)
+
+
+def test_load_spec_file_cache(tmp_path) -> None:
+    # given spec file and cache directory
+    spec_file = tmp_path / "spec.json"
+    spec_file.write_text(open("tests/resources/spec.json").read())
+    cache_dir = tmp_path / "cache"
+
+    # when
+    specs = load_spec_file(spec_file)
+    cached_specs = load_spec_file(spec_file, cache_dir)
+    hit_specs = load_spec_file(spec_file, cache_dir)
+
+    # then
+    assert cached_specs == specs
+    assert hit_specs == specs
+    assert len(list(cache_dir.glob("*.json"))) == 1
+
+
+def test_load_spec_file_cache_changed_content(tmp_path) -> None:
+    # given cached spec file
+    spec_file = tmp_path / "spec.json"
+    spec_file.write_text("""{"ColumnNames":["f1"], "Offsets":[5], "IncludeHeader":"True",
+            "FixedWidthEncoding":"windows-1252", "DelimitedEncoding":"utf-8"}""")
+    cache_dir = tmp_path / "cache"
+    load_spec_file(spec_file, cache_dir)
+
+    # when
+    spec_file.write_text(spec_file.read_text().replace("[5]", "[7]"))
+    fwf_spec, _ = load_spec_file(spec_file, cache_dir)
+
+    # then
+    assert fwf_spec.columns[0].length == 7
+
+
+def test_load_spec_file_cache_stale_specs(tmp_path) -> None:
+    # given cache file of specs with a field the spec classes do not have
+    spec_file = pathlib.Path("tests/resources/spec.json")
+    cache_dir = tmp_path / "cache"
+    specs = load_spec_file(spec_file, cache_dir)
+    (cache_file,) = cache_dir.glob("*.json")
+    cached = json.loads(cache_file.read_text())
+    cached["specs"][0]["removed_field"] = 1
+    cache_file.write_text(json.dumps(cached))
+
+    # when
+    reloaded_specs = load_spec_file(spec_file, cache_dir)
+
+    # then the spec file is validated again and the cache file is replaced
+    assert reloaded_specs == specs
+    assert "removed_field" not in cache_file.read_text()
+
+
+def test_load_spec_file_cache_hit_without_marshmallow(tmp_path) -> None:
+    # given cached spec file
+    cache_dir = tmp_path / "cache"
+    spec_file = pathlib.Path("tests/resources/spec.json")
+    load_spec_file(spec_file, cache_dir)
+    script = (
+        "import pathlib, sys\n"
+        "from dck_problem1.spec_file_loader import load_spec_file\n"
+        f"load_spec_file(pathlib.Path({str(spec_file)!r}), pathlib.Path({str(cache_dir)!r}))\n"
+        "print('marshmallow' in sys.modules)\n"
+    )
+
+    # when
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        check=True,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    ).stdout
+
+    # then
+    assert output.strip() == "False"
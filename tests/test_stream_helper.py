@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+
+from dck_problem1.stream_helper import threaded_iterator
+
+
+def test_threaded_iterator() -> None:
+    # given
+    items = range(1000)
+
+    # when
+    result = list(threaded_iterator(items, queue_size=2))
+
+    # then
+    assert result == list(items)
+
+
+def test_threaded_iterator_exception() -> None:
+    # given
+    def items():
+        yield 1
+        raise KeyError("broken")
+
+    # when
+    iterator = threaded_iterator(items())
+
+    # then the exception is raised in the consumer thread
+    assert next(iterator) == 1
+    with pytest.raises(KeyError, match="broken"):
+        next(iterator)
+
+
+def test_threaded_iterator_stopped_consumer() -> None:
+    # given
+    finished = threading.Event()
+
+    def items():
+        try:
+            yield from range(1000)
+        finally:
+            finished.set()
+
+    # when consumer stops early
+    iterator = threaded_iterator(items(), queue_size=1)
+    assert next(iterator) == 0
+    iterator.close()
+
+    # then the producer does not stay blocked on the full queue
+    assert finished.wait(timeout=5)
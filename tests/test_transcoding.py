@@ -0,0 +1,59 @@
+import pytest
+
+from dck_problem1.transcoding import Transcoder
+
+
+@pytest.mark.parametrize(
+    "source,target",
+    [
+        ("windows-1252", "utf-8"),
+        ("windows-1252", "latin-1"),
+        ("latin-1", "windows-1252"),
+        ("utf-8", "windows-1252"),
+        ("utf-8", "utf-16"),
+        ("ascii", "utf-8"),
+    ],
+)
+def test_transcoder(source, target) -> None:
+    # given text encodable in both encodings split into blocks
+    text = "abc\ndéf\n" * 3 if source != "ascii" else "abc\n" * 3
+    data = text.encode(source)
+    transcoder = Transcoder(source, target)
+
+    # when
+    blocks = [data[i : i + 5] for i in range(0, len(data), 5)]
+    transcoded = b"".join(transcoder.transcode(block) for block in blocks)
+    transcoded += transcoder.transcode(b"", final=True)
+
+    # then
+    assert transcoded.decode(target) == text
+    assert Transcoder(source, target).decode(data, final=True) == text
+
+
+def test_transcoder_ascii_passthrough() -> None:
+    # given
+    transcoder = Transcoder("windows-1252", "utf-8")
+    block = b"abc   def\n"
+
+    # when
+    transcoded = transcoder.transcode(block)
+
+    # then the block is not copied
+    assert transcoder.ascii_passthrough
+    assert transcoded is block
+    assert not Transcoder("windows-1252", "utf-16").ascii_passthrough
+
+
+def test_transcoder_errors() -> None:
+    # given bytes without a character in windows-1252 and a truncated utf-8 character
+    cp1252 = Transcoder("windows-1252", "latin-1")
+    utf8 = Transcoder("utf-8", "windows-1252")
+
+    # when, then
+    with pytest.raises(UnicodeDecodeError):
+        cp1252.transcode(b"a\x81")
+    with pytest.raises(UnicodeEncodeError):
+        cp1252.transcode("€".encode("windows-1252"))
+    utf8.transcode(b"a\xc3")
+    with pytest.raises(UnicodeDecodeError):
+        utf8.transcode(b"", final=True)
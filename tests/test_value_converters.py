@@ -0,0 +1,67 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+
+from dck_problem1.models import FWFColumnSpec, FWFSpec
+from dck_problem1.random_values_generator import rnd_fwf_value
+from dck_problem1.value_converters import fwf_value_converter, fwf_value_converters
+
+
+@pytest.mark.parametrize(
+    "column_spec,value,expected",
+    [
+        (FWFColumnSpec("a", 0, 5), "abc", "abc"),
+        (FWFColumnSpec("a", 0, 5, "int"), "-0012", -12),
+        (FWFColumnSpec("a", 0, 6, "decimal"), "12.50", Decimal("12.50")),
+        (FWFColumnSpec("a", 0, 8, "date"), "20201231", datetime.date(2020, 12, 31)),
+        (FWFColumnSpec("a", 0, 6, "fixed", 2), "012345", Decimal("123.45")),
+        (FWFColumnSpec("a", 0, 5, "int"), "", None),
+        (FWFColumnSpec("a", 0, 8, "date"), "", None),
+    ],
+    ids=["str", "int", "decimal", "date", "fixed", "empty_int", "empty_date"],
+)
+def test_fwf_value_converter(column_spec, value, expected) -> None:
+    # when
+    converter = fwf_value_converter(column_spec)
+
+    # then
+    assert converter(value) == expected
+
+
+def test_fwf_value_converter_unexpected_dtype() -> None:
+    # then expect an exception
+    with pytest.raises(ValueError, match="Unexpected datatype"):
+        # when
+        fwf_value_converter(FWFColumnSpec("a", 0, 5, "blob"))
+
+
+def test_fwf_value_converters_random_values() -> None:
+    # given spec with all dtypes
+    spec = FWFSpec(
+        [
+            FWFColumnSpec("a", 0, 5),
+            FWFColumnSpec("b", 5, 6, "int"),
+            FWFColumnSpec("c", 11, 7, "decimal", 2),
+            FWFColumnSpec("d", 18, 8, "date"),
+            FWFColumnSpec("e", 26, 9, "fixed", 3),
+        ],
+        False,
+        "utf-8",
+    )
+    converters = fwf_value_converters(spec)
+
+    for _ in range(100):
+        # when random fixed width values are generated
+        values = [rnd_fwf_value(col) for col in spec.columns]
+
+        # then they have column length and can be converted
+        assert [len(value) for value in values] == [col.length for col in spec.columns]
+        typed_values = [convert(value.strip()) for convert, value in zip(converters, values)]
+        assert [type(value) for value in typed_values] == [
+            str,
+            int,
+            Decimal,
+            datetime.date,
+            Decimal,
+        ]